@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Read latency of the product listing while a load writes, for each SQLite storage mode (src/sqlite_storage.py).
+Per mode, a fresh database is seeded with --products synthetic products. --readers threads then run the index
+route's query (the newest 20 active products plus the total count, on a read-only session like the route) for
+--seconds, first with no writer and then, for each of --writers, while a writer thread repeatedly loads the
+products with a new price:
+  - bulk: the chunked set-based upserts of src/bulk_loader.py, committing per chunk;
+  - row_by_row: the original per-record load in one transaction (bench_db_load.row_by_row_load), which holds
+    the write lock for the whole load.
+Reports read latency percentiles, reads that failed on a lock, and how many products the writer loaded.
+
+Usage: python benchmarks/bench_db_concurrency.py [--products 50000] [--readers 4] [--seconds 10]
+                                                 [--writers bulk,row_by_row] [--json-out results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# --- Add project root to Python's path so src/ and the shared modules can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from flask import Flask
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+import product_index
+from bench_db_load import row_by_row_load
+from src.bulk_loader import bulk_load_products
+from src.models.models import Product, db
+from src.sqlite_storage import STORAGE_MODES, init_storage, prepare_storage, read_only_session
+
+WRITERS = ("bulk", "row_by_row")
+
+
+def synthetic_products(count, price_offset=0):
+    for i in range(count):
+        product_id = 1600000000000 + i
+        yield {
+            "name": f"Synthetic new arrival {i} wireless charger stand",
+            "product_url": f"https://www.alibaba.com/product-detail/Synthetic-Item-{i}_{product_id}.html",
+            "image_url": f"https://s.alicdn.com/@sc04/kf/H{product_id}.jpg",
+            "price": f"${(i % 500) / 10 + 1 + price_offset:.2f}",
+            "alibaba_category": f"Category {i % 12}",
+        }
+
+
+def listing_read(app):
+    """The index route's no-query page: newest 20 active products and the total, on a read-only session."""
+    with app.app_context():
+        session = read_only_session(db.session)
+        active = Product.is_active == True
+        session.execute(select(Product).where(active).order_by(Product.last_scraped_date.desc()).limit(20)).scalars().all()
+        session.execute(select(func.count()).select_from(Product).where(active)).scalar()
+
+
+def reader(app, stop, latencies, errors):
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        try:
+            listing_read(app)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        except OperationalError:
+            errors.append(time.perf_counter() - started_at)
+
+
+def writer(app, stop, writer_name, product_count, loaded, index_path):
+    price_offset = 1
+    with app.app_context(), product_index.KnownProductIndex(index_path) as loaded_index:
+        while not stop.is_set():
+            products = synthetic_products(product_count, price_offset)
+            if writer_name == "bulk":
+                stats = bulk_load_products(db.session, products)
+                loaded.append(stats["inserted"] + stats["updated"] + stats["unchanged"])
+            else:
+                stats = row_by_row_load(products, loaded_index)
+                loaded.append(stats["inserted"] + stats["updated"])
+            db.session.expunge_all()
+            price_offset += 1
+
+
+def measure_reads(app, reader_count, seconds, writer_name=None, product_count=None, index_path=None):
+    stop = threading.Event()
+    latencies, errors, loaded = [], [], []
+    threads = [threading.Thread(target=reader, args=(app, stop, latencies, errors)) for _ in range(reader_count)]
+    if writer_name:
+        threads.append(threading.Thread(target=writer, args=(app, stop, writer_name, product_count, loaded, index_path)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    percentile = lambda fraction: latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] if latencies else float("nan")
+    return {"reads": len(latencies), "failed_reads": len(errors), "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99), "max_ms": latencies[-1] if latencies else float("nan"),
+            "mean_ms": statistics.fmean(latencies) if latencies else float("nan"), "products_loaded": sum(loaded)}
+
+
+def run_mode(mode, writer_names, product_count, reader_count, seconds):
+    with tempfile.TemporaryDirectory(prefix="alibaba_bench_concurrency_") as work_dir:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        init_storage(app, db, mode)
+        prepare_storage(app, db)
+        with app.app_context():
+            db.create_all()
+            bulk_load_products(db.session, synthetic_products(product_count))
+            db.session.remove()
+        # The row-by-row load finds existing products through the loaded-products index, as it did in the app.
+        index_path = os.path.join(work_dir, "loaded_products_index.sqlite")
+        with product_index.KnownProductIndex(index_path) as loaded_index:
+            loaded_index.add_many(product["product_url"] for product in synthetic_products(product_count))
+        results = {"idle": measure_reads(app, reader_count, seconds)}
+        for writer_name in writer_names:
+            results[f"{writer_name}_load"] = measure_reads(app, reader_count, seconds, writer_name, product_count, index_path)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--modes", default=",".join(STORAGE_MODES), help="Comma-separated storage modes to compare.")
+    parser.add_argument("--writers", default=",".join(WRITERS), help=f"Comma-separated load paths to write with ({', '.join(WRITERS)}).")
+    parser.add_argument("--json-out")
+    args = parser.parse_args()
+    writer_names = args.writers.split(",")
+    unknown_writers = set(writer_names) - set(WRITERS)
+    if unknown_writers:
+        parser.error(f"Unknown writers: {', '.join(sorted(unknown_writers))}")
+
+    results = {mode: run_mode(mode, writer_names, args.products, args.readers, args.seconds) for mode in args.modes.split(",")}
+
+    print(f"\nRead latency during a load: {args.products} products, {args.readers} readers, {args.seconds:g}s per phase")
+    print(f"{'mode':<12}{'phase':<17}{'reads':>8}{'failed':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'loaded':>9}")
+    for mode, phases in results.items():
+        for phase, result in phases.items():
+            print(f"{mode:<12}{phase:<17}{result['reads']:>8}{result['failed_reads']:>8}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                  f"{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}{result['products_loaded']:>9}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"products": args.products, "readers": args.readers, "seconds": args.seconds, "writers": writer_names,
+                       "results": results}, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compares the bulk upsert loader (src/bulk_loader.py) with the per-record ORM loop that load_scraped_data_to_db
+used before it, on --products synthetic products in a fresh SQLite database per loader. Each loader runs two
+loads: an initial one into the empty table, then a reload of the same file with --changed-percent of the
+products repriced (the scheduled-load case, where almost every record already exists).
+
+Usage: python benchmarks/bench_db_load.py [--products 100000] [--changed-percent 10] [--chunk-size 1000] [--json-out results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# --- Add project root to Python's path so src/ and the shared modules can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from flask import Flask
+
+import product_index
+import product_urls
+from src.bulk_loader import DEFAULT_CHUNK_SIZE, bulk_load_products
+from src.models.models import Product, db
+
+
+def synthetic_products(count, changed_percent=0):
+    """count scraper-style records with unique product IDs; the first changed_percent of them get a new price."""
+    changed_count = count * changed_percent // 100
+    for i in range(count):
+        product_id = 1600000000000 + i
+        yield {
+            "name": f"Synthetic new arrival {i} wireless charger stand",
+            "product_url": f"https://www.alibaba.com/product-detail/Synthetic-Item-{i}_{product_id}.html",
+            "image_url": f"https://s.alicdn.com/@sc04/kf/H{product_id}.jpg",
+            "price": f"${(i % 500) / 10 + 1:.2f}" if i >= changed_count else f"${(i % 500) / 10 + 2:.2f}",
+            "alibaba_category": f"Category {i % 12}",
+        }
+
+
+def row_by_row_load(products, loaded_index):
+    """The per-record loop load_scraped_data_to_db ran before the bulk loader, kept here as the baseline."""
+    stats = {"inserted": 0, "updated": 0}
+    urls_added_this_load = []
+    dedupe_keys_added_this_load = set()
+    for prod_data in products:
+        prod_data = product_urls.canonicalize_product(prod_data)
+        existing_product = None
+        if prod_data["product_url"] in loaded_index or product_urls.product_dedupe_key(prod_data["product_url"]) in dedupe_keys_added_this_load:
+            if prod_data.get("alibaba_product_id"):
+                existing_product = Product.query.filter_by(alibaba_product_id=prod_data["alibaba_product_id"]).first()
+            existing_product = existing_product or Product.query.filter_by(product_url=prod_data["product_url"]).first()
+        if existing_product:
+            existing_product.name = prod_data.get("name", existing_product.name)
+            existing_product.price = prod_data.get("price", existing_product.price)
+            existing_product.image_url = prod_data.get("image_url", existing_product.image_url)
+            existing_product.alibaba_category = prod_data.get("alibaba_category", existing_product.alibaba_category)
+            existing_product.last_scraped_date = datetime.utcnow()
+            existing_product.is_active = True
+            stats["updated"] += 1
+        else:
+            db.session.add(Product(
+                name=prod_data.get("name"), product_url=prod_data["product_url"], alibaba_product_id=prod_data.get("alibaba_product_id"),
+                image_url=prod_data.get("image_url"), price=prod_data.get("price"), alibaba_category=prod_data.get("alibaba_category"),
+                arrival_date=datetime.utcnow(), last_scraped_date=datetime.utcnow(), is_active=True))
+            urls_added_this_load.append(prod_data["product_url"])
+            dedupe_keys_added_this_load.add(product_urls.product_dedupe_key(prod_data["product_url"]))
+            stats["inserted"] += 1
+    db.session.commit()
+    loaded_index.add_many(urls_added_this_load)
+    loaded_index.commit()
+    return stats
+
+
+def run_loader(loader_name, product_count, changed_percent, chunk_size):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="alibaba_bench_db_") as work_dir:
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            loaded_index = product_index.KnownProductIndex(os.path.join(work_dir, "loaded_products_index.sqlite")).open()
+            for load_name, load_changed_percent in (("initial", 0), ("reload", changed_percent)):
+                products = synthetic_products(product_count, load_changed_percent)
+                started_at = time.perf_counter()
+                if loader_name == "bulk":
+                    stats = bulk_load_products(db.session, products, chunk_size=chunk_size)
+                    stats.pop("seconds")
+                else:
+                    stats = row_by_row_load(products, loaded_index)
+                results[load_name] = {"seconds": time.perf_counter() - started_at, **stats}
+                db.session.expunge_all()
+            loaded_index.close()
+            db.session.remove()
+            db.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--changed-percent", type=int, default=10, help="Products repriced between the two loads.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--json-out")
+    args = parser.parse_args()
+
+    results = {loader_name: run_loader(loader_name, args.products, args.changed_percent, args.chunk_size)
+               for loader_name in ("row_by_row", "bulk")}
+
+    print(f"\nDB load benchmark: {args.products} products, {args.changed_percent}% changed on reload, bulk chunks of {args.chunk_size}")
+    print(f"{'load':<10}{'row_by_row s':>14}{'bulk s':>10}{'speedup':>9}  bulk inserted/updated/unchanged")
+    for load_name in ("initial", "reload"):
+        row_by_row, bulk = results["row_by_row"][load_name], results["bulk"][load_name]
+        speedup = row_by_row["seconds"] / bulk["seconds"] if bulk["seconds"] else float("inf")
+        print(f"{load_name:<10}{row_by_row['seconds']:>14.2f}{bulk['seconds']:>10.2f}{speedup:>8.1f}x  "
+              f"{bulk['inserted']}/{bulk['updated']}/{bulk['unchanged']}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"products": args.products, "changed_percent": args.changed_percent, "results": results}, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
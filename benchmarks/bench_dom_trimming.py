@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Memory/latency comparison of DOM trimming (scraper.DOM_TRIMMING) on a 30-pass category, replayed offline.
+A synthetic snapshot of the feed fixture page serves one category with 30 feed pages, so every scroll pass adds
+a page of tiles. The category is scraped once with trimming off and once with it on. For each run the report has
+DOM node count and JS heap after the last pass, peak browser RSS (needs psutil) and the extraction time of the
+first and last passes. The comparison goes into the trimmed run's report in --report-dir.
+
+Usage: python benchmarks/bench_dom_trimming.py [--passes 30] [--report-dir run_reports] [--json-out results.json]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+# --- Add project root to Python's path so scraper.py can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import run_tracing
+import scraper
+from bench_replay import PeakRssSampler
+from feed_fixture_server import FIXTURES_DIR, FEED_PATH_PREFIX
+from record_replay import run_replay_scrape, write_snapshot
+
+DEEP_CATEGORY_TOGGLES = {"Consumer Electronics": True}
+EDGE_PASS_COUNT = 5  # Passes averaged for the "first passes" / "last passes" extraction times
+
+
+def build_deep_fixture_snapshot(snapshot_dir, feed_pages, target_url=scraper.TARGET_URL):
+    """Snapshot of the fixture page whose first category has feed_pages pages of unique offers."""
+    with open(os.path.join(FIXTURES_DIR, "feed", "category_0_page_1.json"), "r", encoding="utf-8") as f:
+        template = json.load(f)
+    template_offers = template["data"]["result"]["offerList"]
+    page_origin = "{0.scheme}://{0.netloc}".format(urlparse(target_url))
+    with open(os.path.join(FIXTURES_DIR, "feed_page.html"), "rb") as f:
+        responses = [("GET", target_url, 200, {"Content-Type": "text/html; charset=utf-8"}, f.read())]
+    for page_no in range(1, feed_pages + 1):
+        payload = copy.deepcopy(template)
+        result = payload["data"]["result"]
+        result["pageNo"], result["hasMore"] = page_no, page_no < feed_pages
+        for offer_no, offer in enumerate(result["offerList"]):
+            product_id = f"{9000000000000 + page_no * 1000 + offer_no}"
+            offer["productId"] = product_id
+            offer["productUrl"] = f"//www.alibaba.com/product-detail/Deep-Scroll-Item-{page_no}-{offer_no}_{product_id}.html"
+            offer["subject"] = f"{template_offers[offer_no % len(template_offers)]['subject']} (page {page_no})"
+        responses.append(("GET", f"{page_origin}{FEED_PATH_PREFIX}1.0/?category=0&page={page_no}", 200,
+                          {"Content-Type": "application/json; charset=utf-8"}, json.dumps(payload).encode("utf-8")))
+    return write_snapshot(snapshot_dir, target_url, responses)
+
+
+def summarize_run(tracer, products, elapsed, peak_rss_mb):
+    pass_spans = [span for span in tracer.spans if span.name == "pass"]
+    extract_s = [span.duration_s for span in tracer.spans if span.name == "extract"]
+    last_pass = pass_spans[-1].attributes if pass_spans else {}
+    heaps = [span.attributes.get("js_heap_bytes") for span in pass_spans if span.attributes.get("js_heap_bytes")]
+    return {
+        "products": len(products),
+        "passes": len(pass_spans),
+        "seconds": elapsed,
+        "final_dom_nodes": last_pass.get("dom_nodes"),
+        "max_dom_nodes": max((span.attributes.get("dom_nodes") or 0 for span in pass_spans), default=None),
+        "final_js_heap_mb": last_pass["js_heap_bytes"] / (1024 * 1024) if last_pass.get("js_heap_bytes") else None,
+        "max_js_heap_mb": max(heaps) / (1024 * 1024) if heaps else None,
+        "peak_browser_rss_mb": peak_rss_mb,
+        "first_passes_extract_ms": statistics.mean(extract_s[:EDGE_PASS_COUNT]) * 1000 if extract_s else None,
+        "last_passes_extract_ms": statistics.mean(extract_s[-EDGE_PASS_COUNT:]) * 1000 if extract_s else None,
+        "tiles_trimmed": tracer.counter_total("dom_tiles_trimmed"),
+    }
+
+
+async def run_once(snapshot_dir, dom_trimming):
+    scraper.DOM_TRIMMING = dom_trimming
+    tracer = run_tracing.RunTracer(run_name="dom_trimming_trimmed" if dom_trimming else "dom_trimming_baseline")
+    with tempfile.TemporaryDirectory(prefix="alibaba_bench_trim_") as output_dir:
+        with PeakRssSampler() as rss_sampler:
+            started_at = time.perf_counter()
+            products, _, _ = await run_replay_scrape(snapshot_dir, output_dir, DEEP_CATEGORY_TOGGLES, scroll_delay=1,
+                                                     max_scroll_no_new=3, tracer=tracer)
+            elapsed = time.perf_counter() - started_at
+    return tracer, summarize_run(tracer, products, elapsed, rss_sampler.peak_mb)
+
+
+def format_value(value, precision=1):
+    return "n/a" if value is None else f"{value:.{precision}f}" if isinstance(value, float) else str(value)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passes", type=int, default=30, help="Feed pages in the synthetic category (one per scroll pass).")
+    parser.add_argument("--report-dir", default="run_reports")
+    parser.add_argument("--json-out")
+    args = parser.parse_args()
+
+    original_dom_trimming = scraper.DOM_TRIMMING
+    try:
+        with tempfile.TemporaryDirectory(prefix="alibaba_deep_snapshot_") as snapshot_dir:
+            build_deep_fixture_snapshot(snapshot_dir, args.passes)
+            _, baseline = await run_once(snapshot_dir, False)
+            trimmed_tracer, trimmed = await run_once(snapshot_dir, True)
+    finally:
+        scraper.DOM_TRIMMING = original_dom_trimming
+
+    comparison = {"feed_pages": args.passes, "baseline": baseline, "trimmed": trimmed}
+    report_path = trimmed_tracer.write_report(args.report_dir, dom_trimming_comparison=comparison)
+
+    print(f"\nDOM trimming benchmark: one category, {args.passes} feed pages")
+    print(f"{'metric':<28}{'baseline':>12}{'trimmed':>12}")
+    for metric in ("products", "passes", "seconds", "final_dom_nodes", "max_dom_nodes", "final_js_heap_mb", "max_js_heap_mb",
+                   "peak_browser_rss_mb", "first_passes_extract_ms", "last_passes_extract_ms", "tiles_trimmed"):
+        print(f"{metric:<28}{format_value(baseline[metric]):>12}{format_value(trimmed[metric]):>12}")
+    print(f"Comparison written to run report {report_path}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(comparison, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
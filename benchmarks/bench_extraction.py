@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Compares the "batched" (one page.evaluate per pass) and "per_handle" extraction modes of scraper.py
+against the saved grid fixture. The fixture tiles are cloned (with unique product IDs) to reach --tiles.
+
+With --growth-passes N it also simulates a grid that grows by --tiles per pass and compares per-pass
+extraction time with and without the processed-container marker (PROCESSED_CONTAINER_ATTRIBUTE).
+
+Usage: python benchmarks/bench_extraction.py --tiles 300 --repeat 3 [--growth-passes 30]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+# --- Add project root to Python's path so scraper.py can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from playwright.async_api import async_playwright, Page, ElementHandle
+
+import scraper
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "new_arrivals_grid.html")
+FIXTURE_BASE_URL = "https://sale.alibaba.com/p/db971rh77/index.html"
+
+# Every awaited call on these objects is one protocol round trip to the browser.
+COUNTED_METHODS = {
+    Page: ["evaluate", "query_selector", "query_selector_all"],
+    ElementHandle: ["query_selector", "query_selector_all", "get_attribute", "text_content", "evaluate"],
+}
+
+
+class CdpCallCounter:
+    """Counts protocol round trips by wrapping the Playwright Page/ElementHandle methods the scraper uses."""
+
+    def __init__(self):
+        self.calls = 0
+        self._originals = []
+
+    def __enter__(self):
+        for cls, method_names in COUNTED_METHODS.items():
+            for method_name in method_names:
+                original = getattr(cls, method_name)
+                self._originals.append((cls, method_name, original))
+                setattr(cls, method_name, self._wrap(original))
+        return self
+
+    def __exit__(self, *exc_info):
+        for cls, method_name, original in self._originals:
+            setattr(cls, method_name, original)
+        self._originals = []
+
+    def _wrap(self, original):
+        counter = self
+
+        async def counted(*args, **kwargs):
+            counter.calls += 1
+            return await original(*args, **kwargs)
+        return counted
+
+
+def build_fixture_html(tile_count, as_templates=False):
+    """
+    Returns the fixture page with its grid tiles cloned up to tile_count. With as_templates=True the tiles
+    are wrapped in <template class="pending-tile"> so run_growth can render them a batch at a time.
+    """
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        html = f.read()
+    grid_match = re.search(r'(<div class="hugo4-pc-grid">)(.*)(\n</div>\n</body>)', html, re.DOTALL)
+    tiles = re.findall(r'  <div class="hugo4-pc-grid-item">.*?\n  </div>\n', grid_match.group(2), re.DOTALL)
+
+    cloned_tiles = []
+    for i in range(tile_count):
+        tile = tiles[i % len(tiles)]
+        # Give every clone its own product ID so dedupe does not hide the extraction cost.
+        tile = re.sub(r"_(\d+)\.html", lambda m: f"_{int(m.group(1)) + i}.html", tile)
+        if as_templates:
+            tile = f'<template class="pending-tile">{tile}</template>\n'
+        cloned_tiles.append(tile)
+    return html[:grid_match.start(2)] + "\n" + "".join(cloned_tiles) + html[grid_match.end(2):]
+
+
+async def run_mode(page, mode):
+    known_product_urls = set()
+    with CdpCallCounter() as counter:
+        started_at = time.perf_counter()
+        if mode == "per_handle":
+            container_count, raw_records = await scraper.extract_raw_records_per_handle(page, known_product_urls)
+        else:
+            container_count, raw_records = await scraper.extract_raw_records_batched(page)
+        products = [p for p in (scraper.build_product_record(r, "Consumer Electronics", FIXTURE_BASE_URL) for r in raw_records) if p]
+        elapsed = time.perf_counter() - started_at
+    return {"mode": mode, "containers": container_count, "products": len(products), "seconds": elapsed, "cdp_calls": counter.calls, "records": products}
+
+
+async def run_growth(page, passes, tiles_per_pass, marker_attribute):
+    """Appends tiles_per_pass fresh tiles per pass and times a batched extraction of the growing grid."""
+    await page.set_content(build_fixture_html(tiles_per_pass * passes, as_templates=True))
+    pass_seconds = []
+    for _ in range(passes):
+        await page.evaluate("""(n) => {
+            const grid = document.querySelector('.hugo4-pc-grid');
+            Array.from(document.querySelectorAll('template.pending-tile')).slice(0, n).forEach((t) => {
+                grid.appendChild(t.content.cloneNode(true));
+                t.remove();
+            });
+        }""", tiles_per_pass)
+        started_at = time.perf_counter()
+        _, raw_records = await scraper.extract_raw_records_batched(page, marker_attribute=marker_attribute)
+        [scraper.build_product_record(r, "Consumer Electronics", FIXTURE_BASE_URL) for r in raw_records]
+        pass_seconds.append(time.perf_counter() - started_at)
+    return pass_seconds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiles", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--growth-passes", type=int, default=0)
+    args = parser.parse_args()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.route("**/*", lambda route: route.abort() if route.request.resource_type == "image" else route.continue_())
+        await page.goto("about:blank")
+        await page.set_content(build_fixture_html(args.tiles))
+
+        results = {"per_handle": [], "batched": []}
+        for _ in range(args.repeat):
+            for mode in results:
+                results[mode].append(await run_mode(page, mode))
+
+        growth_results = {}
+        if args.growth_passes:
+            growth_results["full re-extract"] = await run_growth(page, args.growth_passes, args.tiles, None)
+            growth_results["incremental"] = await run_growth(page, args.growth_passes, args.tiles, scraper.PROCESSED_CONTAINER_ATTRIBUTE)
+        await browser.close()
+
+    print(f"Extraction benchmark: {args.tiles} tiles, {args.repeat} repeats")
+    print(f"{'mode':<12}{'containers':>12}{'products':>10}{'best s':>10}{'mean s':>10}{'CDP calls':>12}")
+    for mode, runs in results.items():
+        best = min(r["seconds"] for r in runs)
+        mean = sum(r["seconds"] for r in runs) / len(runs)
+        print(f"{mode:<12}{runs[0]['containers']:>12}{runs[0]['products']:>10}{best:>10.3f}{mean:>10.3f}{runs[0]['cdp_calls']:>12}")
+
+    if results["per_handle"][0]["records"] != results["batched"][0]["records"]:
+        print("WARNING: the two modes produced different records.")
+    else:
+        print("Both modes produced identical records.")
+
+    for label, pass_seconds in growth_results.items():
+        print(f"\nGrowth ({label}, +{args.tiles} tiles/pass): first pass {pass_seconds[0]:.3f}s, "
+              f"last pass {pass_seconds[-1]:.3f}s, total {sum(pass_seconds):.3f}s")
+        print("  " + " ".join(f"{s:.3f}" for s in pass_seconds))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
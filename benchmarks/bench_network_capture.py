@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Offline throughput comparison of the "network" (FeedCapture) and "dom" ingestion modes of scraper.py,
+run against feed_fixture_server.py. Each mode walks both fixture categories, scrolling until the feed
+reports no more pages, and reports products/second plus how many records each source produced.
+
+Usage: python benchmarks/bench_network_capture.py [--repeat 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# --- Add project root to Python's path so scraper.py can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import scraper
+from feed_fixture_server import start_fixture_server, FEED_PATH_PREFIX
+
+
+async def ingest_current_tab(page, feed_capture, category_name, known_product_urls):
+    """Scrolls the current tab until no feed page arrives, ingesting after every page. Returns new products."""
+    products = []
+    while True:
+        raw_records = feed_capture.drain() if feed_capture else []
+        if not raw_records:
+            _, raw_records = await scraper.extract_raw_records_batched(page, marker_attribute=scraper.PROCESSED_CONTAINER_ATTRIBUTE)
+        for raw_record in raw_records:
+            product = scraper.build_product_record(raw_record, category_name, page.url)
+            if product and product["product_url"] not in known_product_urls:
+                known_product_urls.add(product["product_url"])
+                products.append(product)
+        try:
+            async with page.expect_response(lambda r: FEED_PATH_PREFIX in r.url, timeout=1500):
+                await page.evaluate("document.getElementById('sentinel').scrollIntoView()")
+        except PlaywrightTimeoutError:
+            return products
+        # Let the page render the page it just received (the DOM path needs the tiles, the feed path does not).
+        await page.wait_for_timeout(50)
+
+
+async def run_mode(browser, page_url, mode):
+    page = await browser.new_page()
+    feed_capture = scraper.FeedCapture(page).attach() if mode == "network" else None
+    known_product_urls = set()
+    started_at = time.perf_counter()
+    async with page.expect_response(lambda r: FEED_PATH_PREFIX in r.url):
+        await page.goto(page_url, wait_until="domcontentloaded")
+    await page.wait_for_timeout(50)
+
+    products = await ingest_current_tab(page, feed_capture, "Consumer Electronics", known_product_urls)
+    if feed_capture:
+        feed_capture.clear()
+    async with page.expect_response(lambda r: FEED_PATH_PREFIX in r.url):
+        await page.click("div.tab-item[data-category='1']")
+    await page.wait_for_timeout(50)
+    products += await ingest_current_tab(page, feed_capture, "Home & Garden", known_product_urls)
+
+    elapsed = time.perf_counter() - started_at
+    await page.close()
+    return {"mode": mode, "products": len(products), "seconds": elapsed,
+            "feed_stats": feed_capture.stats if feed_capture else None}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    server, page_url = start_fixture_server()
+    results = {"dom": [], "network": []}
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            for _ in range(args.repeat):
+                for mode in results:
+                    results[mode].append(await run_mode(browser, page_url, mode))
+            await browser.close()
+    finally:
+        server.shutdown()
+
+    print(f"Ingestion benchmark against {page_url} ({args.repeat} repeats)")
+    print(f"{'mode':<10}{'products':>10}{'best s':>10}{'products/s':>12}")
+    for mode, runs in results.items():
+        best = min(runs, key=lambda r: r["seconds"])
+        print(f"{mode:<10}{best['products']:>10}{best['seconds']:>10.3f}{best['products'] / best['seconds']:>12.1f}")
+    print(f"Feed capture stats (last run): {results['network'][-1]['feed_stats']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
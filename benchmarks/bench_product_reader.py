@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Peak memory of reading a product file with the streaming product_store reader against json.load, for growing
+file sizes. Synthetic JSON-array (and JSONL) files are written once per size, optionally gzip-compressed;
+each read runs in a fresh Python process, which reports its peak RSS (resource.ru_maxrss, so Unix only).
+The streaming reader should stay flat across sizes while json.load grows with the file.
+
+Usage: python benchmarks/bench_product_reader.py [--sizes 2000,200000,2000000] [--gzip] [--json-out results.json]
+"""
+import argparse
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process: read every product, then print the product count and peak RSS in MB.
+READ_SCRIPT = """
+import json, resource, sys
+sys.path.insert(0, {project_root!r})
+import product_store
+path, reader = sys.argv[1], sys.argv[2]
+if reader == "json.load":
+    with product_store.open_product_file(path) as f:
+        count = len(json.load(f))
+else:
+    count = sum(len(batch) for batch in product_store.iter_product_batches([path], batch_size=1000))
+print(count, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def synthetic_product(i):
+    product_id = 1600000000000 + i
+    return {"name": f"Synthetic new arrival {i} stainless steel insulated water bottle with handle",
+            "product_url": f"https://www.alibaba.com/product-detail/Synthetic-Item-{i}_{product_id}.html",
+            "image_url": f"https://s.alicdn.com/@sc04/kf/H{product_id}.jpg", "price": f"${(i % 500) / 10 + 1:.2f}",
+            "alibaba_category": f"Category {i % 12}", "scraped_timestamp": "2025-01-01T00:00:00"}
+
+
+def write_products(path, count, file_format):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        if file_format == "jsonl":
+            for i in range(count):
+                f.write(json.dumps(synthetic_product(i)) + "\n")
+            return
+        f.write("[\n")
+        for i in range(count):
+            f.write(("," if i else "") + json.dumps(synthetic_product(i), indent=2) + "\n")
+        f.write("]\n")
+
+
+def measure(path, reader):
+    started_at = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", READ_SCRIPT.format(project_root=project_root), path, reader],
+                            check=True, capture_output=True, text=True).stdout.split()
+    return {"products": int(output[0]), "peak_rss_mb": float(output[1]), "seconds": time.perf_counter() - started_at}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,200000", help="Comma-separated product counts.")
+    parser.add_argument("--gzip", action="store_true", help="Write and read .gz files.")
+    parser.add_argument("--json-out")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="alibaba_bench_reader_") as work_dir:
+        for size in (int(size) for size in args.sizes.split(",")):
+            for file_format in ("json", "jsonl"):
+                path = os.path.join(work_dir, f"products_{size}.{file_format}" + (".gz" if args.gzip else ""))
+                write_products(path, size, file_format)
+                readers = ("json.load", "stream") if file_format == "json" else ("stream",)
+                for reader in readers:
+                    result = {"size": size, "format": file_format, "reader": reader, "file_mb": os.path.getsize(path) / (1024 * 1024),
+                              **measure(path, reader)}
+                    results.append(result)
+                    print(f"{size:>9} {file_format:<6}{reader:<10} file {result['file_mb']:>8.1f} MB  peak RSS {result['peak_rss_mb']:>8.1f} MB  "
+                          f"{result['seconds']:.2f}s")
+                os.remove(path)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
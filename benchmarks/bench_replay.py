@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+End-to-end offline benchmark of scrape_alibaba_new_arrivals, replayed from a snapshot (see record_replay.py).
+For each run it reports products/second, scroll passes per category, Playwright protocol calls (every message
+the client sends to the browser driver), peak browser RSS (needs psutil) and the time the readiness waits took
+against their fixed-sleep budget. --fixed-sleeps runs with the old fixed sleeps for comparison.
+
+Usage: python benchmarks/bench_replay.py [--snapshot DIR] [--repeat 3] [--ingestion-mode dom|network]
+                                         [--concurrent-pages 1] [--fixed-sleeps] [--json-out results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# --- Add project root to Python's path so scraper.py can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from playwright._impl._connection import Connection
+
+import run_tracing
+import scrape_checkpoint
+from record_replay import build_fixture_snapshot, run_replay_scrape
+
+try:
+    import psutil
+except ImportError:  # peak RSS is reported as n/a without psutil
+    psutil = None
+
+# The fixture snapshot's two tabs; a recorded snapshot scrapes whatever CATEGORY_TOGGLES enables.
+FIXTURE_CATEGORY_TOGGLES = {"Consumer Electronics": True, "Home & Garden": True}
+
+
+class ProtocolMessageCounter:
+    """Counts every message the Playwright client sends to the driver (page calls, element calls, route replies...)."""
+
+    def __init__(self):
+        self.messages = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = Connection._send_message_to_server
+        counter = self
+
+        def counted(connection, *args, **kwargs):
+            counter.messages += 1
+            return counter._original(connection, *args, **kwargs)
+        Connection._send_message_to_server = counted
+        return self
+
+    def __exit__(self, *exc_info):
+        Connection._send_message_to_server = self._original
+
+
+class PeakRssSampler:
+    """Samples the summed RSS of this process's children (Playwright driver + Chromium) every interval seconds."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_mb = None
+        self._task = None
+
+    def sample(self):
+        total_bytes = 0
+        for child in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                total_bytes += child.memory_info().rss
+            except psutil.Error:
+                continue
+        rss_mb = total_bytes / (1024 * 1024)
+        self.peak_mb = rss_mb if self.peak_mb is None else max(self.peak_mb, rss_mb)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if psutil is not None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._task:
+            self._task.cancel()
+
+
+async def run_once(snapshot_dir, category_toggles, ingestion_mode, concurrent_pages, scroll_delay, fixed_sleeps=False):
+    with tempfile.TemporaryDirectory(prefix="alibaba_bench_replay_") as output_dir:
+        checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(os.path.join(output_dir, "scrape_checkpoint.json"), "replay")
+        tracer = run_tracing.RunTracer(run_name="replay_benchmark")
+        with ProtocolMessageCounter() as counter, PeakRssSampler() as rss_sampler:
+            started_at = time.perf_counter()
+            products, router, snapshot_stats = await run_replay_scrape(
+                snapshot_dir, output_dir, category_toggles, scroll_delay=scroll_delay,
+                ingestion_mode=ingestion_mode, concurrent_pages=concurrent_pages, checkpoint=checkpoint, tracer=tracer,
+                readiness_policy={"enabled": False} if fixed_sleeps else None)
+            elapsed = time.perf_counter() - started_at
+    return {
+        "products": len(products),
+        "seconds": elapsed,
+        "products_per_second": len(products) / elapsed if elapsed else 0.0,
+        "passes_per_category": {name: category["passes_completed"] for name, category in checkpoint.state["categories"].items()},
+        "protocol_messages": counter.messages,
+        "peak_browser_rss_mb": rss_sampler.peak_mb,
+        "fixed_sleep_s": tracer.counter_total("fixed_sleep_seconds"),
+        "readiness_wait_s": tracer.counter_total("readiness_wait_seconds"),
+        "readiness_time_saved_s": tracer.counter_total("readiness_time_saved_seconds"),
+        "router_stats": router.stats,
+        "snapshot_stats": snapshot_stats,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", help="Snapshot directory from record_replay.py record (default: feed fixtures).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ingestion-mode", choices=["dom", "network"], default=None)
+    parser.add_argument("--concurrent-pages", type=int, default=1)
+    parser.add_argument("--scroll-delay", type=int, default=1)
+    parser.add_argument("--fixed-sleeps", action="store_true", help="Disable the readiness waits (old fixed sleeps).")
+    parser.add_argument("--json-out")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="alibaba_snapshot_") as fixture_snapshot_dir:
+        snapshot_dir, category_toggles = args.snapshot, None
+        if not snapshot_dir:
+            build_fixture_snapshot(fixture_snapshot_dir)
+            snapshot_dir, category_toggles = fixture_snapshot_dir, FIXTURE_CATEGORY_TOGGLES
+        runs = [await run_once(snapshot_dir, category_toggles, args.ingestion_mode, args.concurrent_pages, args.scroll_delay, args.fixed_sleeps)
+                for _ in range(args.repeat)]
+
+    print(f"\nReplay benchmark: {args.snapshot or 'feed fixtures'}, ingestion={args.ingestion_mode or 'default'}, "
+          f"concurrent_pages={args.concurrent_pages}, waits={'fixed sleeps' if args.fixed_sleeps else 'readiness'}, {args.repeat} runs")
+    print(f"{'run':<5}{'products':>10}{'seconds':>10}{'products/s':>12}{'protocol msgs':>15}{'peak RSS MB':>13}{'slept s':>9}{'ready s':>9}{'saved s':>9}  passes per category")
+    for i, run in enumerate(runs, 1):
+        rss = f"{run['peak_browser_rss_mb']:.0f}" if run["peak_browser_rss_mb"] is not None else "n/a"
+        print(f"{i:<5}{run['products']:>10}{run['seconds']:>10.1f}{run['products_per_second']:>12.2f}{run['protocol_messages']:>15}{rss:>13}"
+              f"{run['fixed_sleep_s']:>9.1f}{run['readiness_wait_s']:>9.1f}{run['readiness_time_saved_s']:>9.1f}  {run['passes_per_category']}")
+    print(f"Snapshot lookups (last run): {runs[-1]['snapshot_stats']}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
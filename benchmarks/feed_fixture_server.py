@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Local replay server for the new-arrivals page. Serves fixtures/feed_page.html at the live page's path and
+answers its mtop feed requests with the recorded responses in fixtures/feed/category_<i>_page_<n>.json,
+so network-capture and DOM ingestion can run offline.
+
+Usage: python benchmarks/feed_fixture_server.py [--port 8765]
+"""
+import argparse
+import os
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_PATH = "/p/db971rh77/index.html"
+FEED_PATH_PREFIX = "/h5/mtop.alibaba.newarrival.feed/"
+EMPTY_FEED_BODY = b'{"data": {"result": {"offerList": [], "hasMore": false}}}'
+
+
+class FeedFixtureHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        if parsed_url.path == PAGE_PATH:
+            self._send_file(os.path.join(FIXTURES_DIR, "feed_page.html"), "text/html; charset=utf-8")
+        elif parsed_url.path.startswith(FEED_PATH_PREFIX):
+            query = parse_qs(parsed_url.query)
+            category = int(query.get("category", ["0"])[0])
+            page_no = int(query.get("page", ["1"])[0])
+            recorded_path = os.path.join(FIXTURES_DIR, "feed", f"category_{category}_page_{page_no}.json")
+            if os.path.exists(recorded_path):
+                self._send_file(recorded_path, "application/json; charset=utf-8")
+            else:
+                self._send_bytes(EMPTY_FEED_BODY, "application/json; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def _send_file(self, path, content_type):
+        with open(path, "rb") as f:
+            self._send_bytes(f.read(), content_type)
+
+    def _send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(port=0):
+    """Starts the server on a background thread. Returns (server, page_url); call server.shutdown() when done."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FeedFixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{PAGE_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FeedFixtureHandler)
+    print(f"Serving feed replay fixture at http://127.0.0.1:{args.port}{PAGE_PATH}")
+    server.serve_forever()
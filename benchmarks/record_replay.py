@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Offline record/replay harness for scraper.py.
+
+record: runs scrape_alibaba_new_arrivals against the live page with HAR recording on, then converts the HAR
+        into a snapshot directory (manifest.json + bodies/): the page, tab switches and scroll-triggered feed
+        responses. Needs the saved login state, like a normal run.
+replay: runs scrape_alibaba_new_arrivals end-to-end offline. A ReplayRouter on the browser context answers every
+        request from a local ReplayServer that serves the snapshot, so the page keeps its live URLs.
+serve:  only starts the ReplayServer (useful for poking at a snapshot in a browser).
+
+Without --snapshot, replay/serve use a snapshot built from the feed replay fixtures (fixtures/feed_page.html
+and fixtures/feed/), mapped onto the live page URL.
+
+Usage: python benchmarks/record_replay.py record --snapshot benchmarks/fixtures/replay/<name>
+       python benchmarks/record_replay.py replay [--snapshot DIR]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, quote
+
+# --- Add project root to Python's path so scraper.py can be imported ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import scraper
+from feed_fixture_server import FIXTURES_DIR, FEED_PATH_PREFIX
+
+# Query parameters that change on every request (timestamps, signatures, JSONP callback names) and are
+# ignored when matching a request to a recorded response.
+VOLATILE_QUERY_PARAMETERS = {"t", "_", "sign", "callback", "jsonp", "timestamp", "_ksts"}
+# Hop-by-hop or encoding headers that no longer apply once the body is stored decoded.
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+REPLAY_PATH = "/__replay__"
+
+
+def request_match_key(method, url, ignore_query=False):
+    parsed_url = urlparse(url)
+    query = "" if ignore_query else urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+        if key.lower() not in VOLATILE_QUERY_PARAMETERS))
+    return f"{method.upper()} {urlunparse(('', parsed_url.netloc.lower(), parsed_url.path, '', query, ''))}"
+
+
+class ReplaySnapshot:
+    """
+    Recorded responses loaded from a snapshot directory. Requests are matched on method + URL without volatile
+    query parameters, falling back to method + path; repeated matches are served in recorded order.
+    """
+
+    def __init__(self, snapshot_dir):
+        self.snapshot_dir = snapshot_dir
+        with open(os.path.join(snapshot_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._entries_by_key = {}
+        for entry in self.manifest["entries"]:
+            for ignore_query in (False, True):
+                self._entries_by_key.setdefault(request_match_key(entry["method"], entry["url"], ignore_query), []).append(entry)
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "path_only_hits": 0, "misses": 0}
+
+    @property
+    def target_url(self):
+        return self.manifest["target_url"]
+
+    def lookup(self, method, url):
+        """Returns (entry, body_bytes) for the best recorded response, or (None, None)."""
+        for ignore_query in (False, True):
+            key = request_match_key(method, url, ignore_query)
+            entries = self._entries_by_key.get(key)
+            if entries:
+                with self._lock:
+                    cursor = self._cursors.get(key, 0)
+                    self._cursors[key] = cursor + 1
+                    self.stats["path_only_hits" if ignore_query else "hits"] += 1
+                entry = entries[min(cursor, len(entries) - 1)]
+                with open(os.path.join(self.snapshot_dir, entry["body"]), "rb") as f:
+                    return entry, self._rewrite_jsonp_callback(entry, url, f.read())
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, None
+
+    @staticmethod
+    def _rewrite_jsonp_callback(entry, url, body):
+        """JSONP bodies are wrapped in the recorded callback name; swap in the one the page asked for this time."""
+        recorded_callback = dict(parse_qsl(urlparse(entry["url"]).query)).get("callback")
+        requested_callback = dict(parse_qsl(urlparse(url).query)).get("callback")
+        if recorded_callback and requested_callback and recorded_callback != requested_callback:
+            recorded_prefix = recorded_callback.encode() + b"("
+            stripped_body = body.lstrip()
+            if stripped_body.startswith(recorded_prefix):
+                return requested_callback.encode() + b"(" + stripped_body[len(recorded_prefix):]
+        return body
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """GET /__replay__?method=GET&url=<recorded url> answers with the recorded status, headers and body."""
+
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        if parsed_url.path != REPLAY_PATH:
+            self.send_error(404)
+            return
+        query = dict(parse_qsl(parsed_url.query))
+        entry, body = self.server.snapshot.lookup(query.get("method", "GET"), query.get("url", ""))
+        if entry is None:
+            self.send_response(404)
+            self.send_header("X-Replay-Miss", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(entry["status"])
+        for name, value in entry["headers"].items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(snapshot_dir, port=0):
+    """Starts a ReplayServer on a background thread. Returns (server, base_url); server.snapshot holds the stats."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReplayRequestHandler)
+    server.snapshot = ReplaySnapshot(snapshot_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Makes urllib return a 3xx as it is (as an HTTPError) instead of following its Location."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+# A recorded redirect must reach the browser unchanged: following it here would fetch the live Location URL.
+REPLAY_FETCH_OPENER = urllib.request.build_opener(NoRedirectHandler)
+
+
+class ReplayRouter(scraper.RequestRouter):
+    """RequestRouter that answers allowed requests from a ReplayServer instead of the network."""
+
+    def __init__(self, replay_base_url, blocking_policy=None, rate_limiter=None):
+        super().__init__(blocking_policy, rate_limiter)
+        self.replay_base_url = replay_base_url
+        self.stats.update({"replayed": 0, "replay_misses": 0})
+
+    @property
+    def is_active(self):
+        return True
+
+    def _fetch(self, method, url):
+        replay_url = f"{self.replay_base_url}{REPLAY_PATH}?method={quote(method)}&url={quote(url, safe='')}"
+        try:
+            with REPLAY_FETCH_OPENER.open(replay_url, timeout=30) as response:
+                return response.status, dict(response.headers.items()), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers.items()), e.read()
+
+    async def forward(self, route):
+        request = route.request
+        status, headers, body = await asyncio.to_thread(self._fetch, request.method, request.url)
+        if headers.get("X-Replay-Miss"):
+            self.stats["replay_misses"] += 1
+            await route.fulfill(status=404, body="")
+            return
+        self.stats["replayed"] += 1
+        headers = {name: value for name, value in headers.items() if name.lower() not in DROPPED_RESPONSE_HEADERS | {"server", "date"}}
+        await route.fulfill(status=status, headers=headers, body=body)
+
+
+def write_snapshot(snapshot_dir, target_url, responses):
+    """Writes responses [(method, url, status, headers, body_bytes)] as a snapshot directory."""
+    os.makedirs(os.path.join(snapshot_dir, "bodies"), exist_ok=True)
+    entries = []
+    for i, (method, url, status, headers, body) in enumerate(responses, 1):
+        body_file = f"bodies/{i:06d}.bin"
+        with open(os.path.join(snapshot_dir, body_file), "wb") as f:
+            f.write(body)
+        entries.append({"method": method, "url": url, "status": status, "body": body_file,
+                        "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_RESPONSE_HEADERS}})
+    manifest = {"target_url": target_url, "recorded_at": datetime.utcnow().isoformat(), "entries": entries}
+    with open(os.path.join(snapshot_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def convert_har_to_snapshot(har_path, snapshot_dir, target_url):
+    with open(har_path, "r", encoding="utf-8") as f:
+        har = json.load(f)
+    responses = []
+    for har_entry in har["log"]["entries"]:
+        response = har_entry["response"]
+        content = response.get("content", {})
+        if response.get("status", 0) <= 0 or "text" not in content:
+            continue  # aborted (e.g. blocked by the RequestRouter) or bodiless responses
+        body = base64.b64decode(content["text"]) if content.get("encoding") == "base64" else content["text"].encode("utf-8")
+        headers = {header["name"]: header["value"] for header in response.get("headers", [])}
+        responses.append((har_entry["request"]["method"], har_entry["request"]["url"], response["status"], headers, body))
+    return write_snapshot(snapshot_dir, target_url, responses)
+
+
+def build_fixture_snapshot(snapshot_dir, target_url=scraper.TARGET_URL):
+    """Snapshot of the feed replay fixtures (2 categories x 3 feed pages) served under the live page URL."""
+    page_origin = "{0.scheme}://{0.netloc}".format(urlparse(target_url))
+    with open(os.path.join(FIXTURES_DIR, "feed_page.html"), "rb") as f:
+        responses = [("GET", target_url, 200, {"Content-Type": "text/html; charset=utf-8"}, f.read())]
+    feed_dir = os.path.join(FIXTURES_DIR, "feed")
+    for file_name in sorted(os.listdir(feed_dir)):
+        category, page_no = file_name[len("category_"):-len(".json")].split("_page_")
+        with open(os.path.join(feed_dir, file_name), "rb") as f:
+            responses.append(("GET", f"{page_origin}{FEED_PATH_PREFIX}1.0/?category={category}&page={page_no}", 200,
+                              {"Content-Type": "application/json; charset=utf-8"}, f.read()))
+    return write_snapshot(snapshot_dir, target_url, responses)
+
+
+def write_empty_storage_state(directory):
+    """Replay runs need a storage-state file so scrape_alibaba_new_arrivals skips the interactive login flow."""
+    path = os.path.join(directory, "replay_storage_state.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"cookies": [], "origins": []}, f)
+    return path
+
+
+async def run_replay_scrape(snapshot_dir, output_dir, category_toggles=None, scroll_delay=1, max_scroll_no_new=2,
+                            ingestion_mode=None, concurrent_pages=1, checkpoint=None, tracer=None, readiness_policy=None):
+    """Runs scrape_alibaba_new_arrivals offline against snapshot_dir. Returns (products, router, snapshot stats)."""
+    server, base_url = start_replay_server(snapshot_dir)
+    try:
+        router = ReplayRouter(base_url, scraper.RESOURCE_BLOCKING_POLICY)
+        products = await scraper.scrape_alibaba_new_arrivals(
+            url=server.snapshot.target_url,
+            output_dir=output_dir,
+            category_toggles=category_toggles if category_toggles is not None else scraper.CATEGORY_TOGGLES,
+            known_product_urls=set(),
+            storage_state_path_for_login=write_empty_storage_state(output_dir),
+            scroll_delay=scroll_delay,
+            max_scroll_no_new=max_scroll_no_new,
+            concurrent_pages=concurrent_pages,
+            ingestion_mode=ingestion_mode,
+            checkpoint=checkpoint,
+            request_router=router,
+            tracer=tracer,
+            readiness_policy=readiness_policy
+        )
+        return products, router, dict(server.snapshot.stats)
+    finally:
+        server.shutdown()
+
+
+async def record(snapshot_dir, keep_har=False):
+    abs_output_dir = os.path.abspath(scraper.OUTPUT_DIRECTORY)
+    har_path = os.path.join(tempfile.mkdtemp(prefix="alibaba_record_"), "recording.har")
+    with tempfile.TemporaryDirectory(prefix="alibaba_record_output_") as scratch_output_dir:
+        # A throwaway output directory and an empty known-product set, so every scroll response gets recorded.
+        products = await scraper.scrape_alibaba_new_arrivals(
+            url=scraper.TARGET_URL,
+            output_dir=scratch_output_dir,
+            category_toggles=scraper.CATEGORY_TOGGLES,
+            known_product_urls=set(),
+            storage_state_path_for_login=os.path.join(abs_output_dir, scraper.AUTH_STORAGE_STATE_FILENAME),
+            scroll_delay=6,
+            max_scroll_no_new=2,
+            record_har_path=har_path
+        )
+    manifest = convert_har_to_snapshot(har_path, snapshot_dir, scraper.TARGET_URL)
+    print(f"Recorded {len(manifest['entries'])} responses ({len(products)} products scraped live) into {snapshot_dir}")
+    if keep_har:
+        print(f"HAR kept at {har_path}")
+    else:
+        shutil.rmtree(os.path.dirname(har_path), ignore_errors=True)
+
+
+async def replay(snapshot_dir, ingestion_mode):
+    with tempfile.TemporaryDirectory(prefix="alibaba_replay_") as output_dir:
+        products, router, snapshot_stats = await run_replay_scrape(snapshot_dir, output_dir, ingestion_mode=ingestion_mode)
+    print(f"Replay finished: {len(products)} products. Router: {router.stats}. Snapshot: {snapshot_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay", "serve"])
+    parser.add_argument("--snapshot", help="Snapshot directory (written by record; defaults to the feed fixtures for replay/serve).")
+    parser.add_argument("--ingestion-mode", choices=["dom", "network"], default=None)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--keep-har", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        if not args.snapshot:
+            parser.error("record needs --snapshot")
+        asyncio.run(record(args.snapshot, args.keep_har))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="alibaba_snapshot_") as fixture_snapshot_dir:
+        snapshot_dir = args.snapshot
+        if not snapshot_dir:
+            build_fixture_snapshot(fixture_snapshot_dir)
+            snapshot_dir = fixture_snapshot_dir
+        if args.mode == "replay":
+            asyncio.run(replay(snapshot_dir, args.ingestion_mode))
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", args.port), ReplayRequestHandler)
+            server.snapshot = ReplaySnapshot(snapshot_dir)
+            print(f"Serving {snapshot_dir} at http://127.0.0.1:{args.port}{REPLAY_PATH}?method=GET&url=<recorded url>")
+            server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
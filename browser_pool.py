@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Long-lived pool of warm Chromium browsers with pre-authenticated contexts, so back-to-back scraper runs
+skip Playwright start-up, browser launch and storage-state loading.
+
+Runs lease a browser with `async with pool.lease() as lease:` (lease.context, lease.page, lease.request_router)
+or simply pass the pool to scraper.main(browser_pool=pool) / scrape_alibaba_new_arrivals(..., browser_pool=pool).
+The pool health-checks browsers before each lease, recycles them after max_runs_per_browser runs or when
+Chromium's total RSS goes over max_rss_mb (needs psutil), and shuts down gracefully after the active runs finish.
+
+Usage: python browser_pool.py --size 1 --interval-minutes 60
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import signal
+import time
+
+from playwright.async_api import async_playwright
+
+import scraper
+
+try:
+    import psutil
+except ImportError:  # RSS-based recycling is skipped without psutil
+    psutil = None
+
+RELAUNCH_ATTEMPTS = 3
+RELAUNCH_BACKOFF_SECONDS = 2  # doubled after each failed attempt
+
+
+class PooledBrowser:
+    """One warm browser with its authenticated context, a reusable page and the context's RequestRouter."""
+
+    def __init__(self, browser_id, browser, context, page, request_router):
+        self.browser_id = browser_id
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.request_router = request_router
+        self.runs = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    def __init__(self, storage_state_path, size=1, max_runs_per_browser=25, max_rss_mb=2048, headless=True,
+                 resource_blocking_policy=None, session_state_save_path=None):
+        self.storage_state_path = storage_state_path
+        self.size = size
+        self.max_runs_per_browser = max_runs_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.headless = headless
+        self.resource_blocking_policy = resource_blocking_policy if resource_blocking_policy is not None else scraper.RESOURCE_BLOCKING_POLICY
+        self.session_state_save_path = session_state_save_path
+        self.stats = {"launches": 0, "leases": 0, "recycled_for_runs": 0, "recycled_for_rss": 0, "recycled_unhealthy": 0,
+                      "relaunch_failures": 0, "slots_dropped": 0}
+
+        self._playwright = None
+        self._storage_state = None
+        self._idle = asyncio.Queue()
+        self._active_leases = 0
+        self._next_browser_id = 1
+        self._closing = False
+
+    async def start(self):
+        started_at = time.perf_counter()
+        self._playwright = await async_playwright().start()
+        # Parsed once and shared by every context the pool creates, instead of re-reading the file per run.
+        self._storage_state = scraper.load_storage_state(self.storage_state_path)
+        for _ in range(self.size):
+            await self._idle.put(await self._launch())
+        print(f"BrowserPool: {self.size} warm browser(s) ready in {time.perf_counter() - started_at:.1f}s.")
+        return self
+
+    async def _launch(self):
+        browser = await scraper.launch_enhanced_browser(self._playwright, self.headless)
+        request_router = scraper.RequestRouter(self.resource_blocking_policy)
+        context = await scraper.new_enhanced_context(browser, self._storage_state, request_router=request_router)
+        page = await scraper.new_enhanced_page(context)
+        pooled = PooledBrowser(self._next_browser_id, browser, context, page, request_router)
+        self._next_browser_id += 1
+        self.stats["launches"] += 1
+        return pooled
+
+    async def _retire(self, pooled):
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            print(f"BrowserPool: error closing browser #{pooled.browser_id}: {e}")
+
+    async def _relaunch(self, pooled):
+        """
+        Retires pooled and launches its replacement, retrying with backoff. If every attempt fails the slot is
+        dropped (the pool shrinks) and None is returned; once no slot is left, waiting leases are woken to fail.
+        """
+        await self._retire(pooled)
+        for attempt in range(1, RELAUNCH_ATTEMPTS + 1):
+            try:
+                return await self._launch()
+            except Exception as e:
+                self.stats["relaunch_failures"] += 1
+                print(f"BrowserPool: relaunch {attempt}/{RELAUNCH_ATTEMPTS} for browser #{pooled.browser_id} failed: {e}")
+                if attempt < RELAUNCH_ATTEMPTS:
+                    await asyncio.sleep(RELAUNCH_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        self.size -= 1
+        self.stats["slots_dropped"] += 1
+        print(f"BrowserPool: dropped browser #{pooled.browser_id}'s slot; {self.size} browser(s) left.")
+        if self.size == 0:
+            self._idle.put_nowait(None)  # nothing will refill the queue, so wake a waiting lease to fail
+        return None
+
+    async def _is_healthy(self, pooled):
+        if not pooled.browser.is_connected() or pooled.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(pooled.page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    def chromium_rss_mb(self):
+        """Total RSS of this process's child processes (Playwright driver + Chromium), or None without psutil."""
+        if psutil is None:
+            return None
+        total_bytes = 0
+        for child in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                total_bytes += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total_bytes / (1024 * 1024)
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        if self._closing:
+            raise RuntimeError("BrowserPool is shutting down; no new leases.")
+        if self.size == 0:
+            raise RuntimeError("BrowserPool has no browsers left; every relaunch failed.")
+        wait_started_at = time.perf_counter()
+        pooled = await self._idle.get()
+        if pooled is None:
+            self._idle.put_nowait(None)  # pass the wake-up on to the next waiting lease
+            raise RuntimeError("BrowserPool has no browsers left; every relaunch failed.")
+        if not await self._is_healthy(pooled):
+            print(f"BrowserPool: browser #{pooled.browser_id} failed its health check; replacing it.")
+            self.stats["recycled_unhealthy"] += 1
+            pooled = await self._relaunch(pooled)
+            if pooled is None:
+                raise RuntimeError(f"BrowserPool could not replace an unhealthy browser; {self.size} browser(s) left.")
+        self._active_leases += 1
+        self.stats["leases"] += 1
+        print(f"BrowserPool: leased browser #{pooled.browser_id} (run {pooled.runs + 1}) in {(time.perf_counter() - wait_started_at) * 1000:.0f} ms.")
+        try:
+            yield pooled
+        finally:
+            self._active_leases -= 1
+            pooled.runs += 1
+            await self._release(pooled)
+
+    async def _release(self, pooled):
+        if pooled.request_router.installed:
+            print(f"Request router: {pooled.request_router.summary()}")
+        pooled.request_router.rate_limiter = None
+        for page in list(pooled.context.pages):
+            if page is not pooled.page:
+                await page.close()
+
+        if self.session_state_save_path and pooled.browser.is_connected():
+            try:
+                await pooled.context.storage_state(path=self.session_state_save_path)
+            except Exception as e:
+                print(f"BrowserPool: could not save session state: {e}")
+
+        recycle_reason = None
+        rss_mb = self.chromium_rss_mb()
+        if pooled.runs >= self.max_runs_per_browser:
+            recycle_reason = "recycled_for_runs"
+        elif rss_mb is not None and rss_mb > self.max_rss_mb:
+            recycle_reason = "recycled_for_rss"
+
+        if self._closing or recycle_reason:
+            if recycle_reason:
+                self.stats[recycle_reason] += 1
+                print(f"BrowserPool: recycling browser #{pooled.browser_id} after {pooled.runs} runs (Chromium RSS: {rss_mb if rss_mb is not None else 'n/a'} MB).")
+            if self._closing:
+                await self._retire(pooled)
+                return
+            pooled = await self._relaunch(pooled)
+            if pooled is None:
+                return
+        await self._idle.put(pooled)
+
+    async def shutdown(self, timeout=300):
+        """Stops new leases, waits up to timeout seconds for active runs, then closes every browser."""
+        self._closing = True
+        deadline = time.monotonic() + timeout
+        while self._active_leases and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            if pooled is not None:
+                await self._retire(pooled)
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        print(f"BrowserPool shut down. Stats: {self.stats}")
+
+
+async def run_scheduled(interval_minutes, size, max_runs_per_browser, max_rss_mb):
+    abs_output_dir = os.path.abspath(scraper.OUTPUT_DIRECTORY)
+    auth_storage_state_path = os.path.join(abs_output_dir, scraper.AUTH_STORAGE_STATE_FILENAME)
+    if not os.path.exists(auth_storage_state_path):
+        print(f"No login state at {auth_storage_state_path}. Run scraper.py once to log in before starting the pool.")
+        return
+
+    pool = await BrowserPool(auth_storage_state_path, size=size, max_runs_per_browser=max_runs_per_browser, max_rss_mb=max_rss_mb,
+                             session_state_save_path=os.path.join(abs_output_dir, "storage_state.json")).start()
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):  # add_signal_handler is unavailable on Windows
+            loop.add_signal_handler(sig, stop_requested.set)
+
+    try:
+        while not stop_requested.is_set():
+            run_started_at = time.perf_counter()
+            await scraper.main(browser_pool=pool)
+            print(f"Scheduled run finished in {time.perf_counter() - run_started_at:.1f}s. Next run in {interval_minutes} minutes.")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop_requested.wait(), timeout=interval_minutes * 60)
+    finally:
+        await pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1)
+    parser.add_argument("--interval-minutes", type=float, default=60)
+    parser.add_argument("--max-runs-per-browser", type=int, default=25)
+    parser.add_argument("--max-rss-mb", type=int, default=2048)
+    args = parser.parse_args()
+    asyncio.run(run_scheduled(args.interval_minutes, args.size, args.max_runs_per_browser, args.max_rss_mb))
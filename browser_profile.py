@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Persistent Chromium profiles for the scraper: one managed user-data directory per profile name, so the HTTP
+cache (JS bundles, CSS, sprites) and cookies survive between scheduled runs instead of being re-downloaded.
+
+Chromium caps the disk cache itself (--disk-cache-size from ManagedProfile.launch_args()); prepare() also clears
+a cache that has grown past the cap anyway, and cleanup_profiles() deletes profiles unused for max_idle_days.
+
+Playwright disables the HTTP cache of any context with a route handler, so profile runs do not block resources
+through RequestRouter's context.route. ProfileCacheMonitor blocks them per page with CDP Network.setBlockedURLs
+instead (URL globs from the blocking policy) and counts cache hits from the CDP Network events.
+"""
+import asyncio
+import json
+import os
+import shutil
+import time
+import weakref
+from datetime import datetime
+
+import run_tracing
+
+PROFILE_MARKER_FILENAME = ".scraper_profile.json"
+DEFAULT_MAX_CACHE_MB = 512
+DEFAULT_MAX_IDLE_DAYS = 14
+# Chromium trims the cache lazily, so only clear it ourselves once it is clearly past the cap.
+CACHE_CAP_SLACK = 1.2
+CACHE_SUBDIRECTORIES = [os.path.join("Default", "Cache"), os.path.join("Default", "Code Cache"), "GrShaderCache", "ShaderCache"]
+
+
+def directory_size_bytes(path):
+    total_bytes = 0
+    for directory, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                total_bytes += os.path.getsize(os.path.join(directory, file_name))
+            except OSError:
+                continue
+    return total_bytes
+
+
+class ManagedProfile:
+    """A Chromium user-data directory under profiles_dir, marked as ours so cleanup_profiles() may delete it."""
+
+    def __init__(self, profiles_dir, name="default", max_cache_mb=DEFAULT_MAX_CACHE_MB):
+        self.profiles_dir = profiles_dir
+        self.name = name
+        self.user_data_dir = os.path.join(profiles_dir, name)
+        self.max_cache_mb = max_cache_mb
+        self.is_new = False
+
+    @property
+    def marker_path(self):
+        return os.path.join(self.user_data_dir, PROFILE_MARKER_FILENAME)
+
+    def prepare(self):
+        """Creates the profile if needed, enforces the cache cap and records this use. Call before launching."""
+        self.is_new = not os.path.exists(self.marker_path)
+        os.makedirs(self.user_data_dir, exist_ok=True)
+        cache_mb = self.cache_size_mb()
+        if cache_mb > self.max_cache_mb * CACHE_CAP_SLACK:
+            print(f"Profile '{self.name}': cache is {cache_mb:.0f} MB (cap {self.max_cache_mb} MB); clearing it.")
+            self.clear_cache()
+        with open(self.marker_path, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "last_used": time.time(), "last_used_utc": datetime.utcnow().isoformat(),
+                       "max_cache_mb": self.max_cache_mb}, f)
+        return self
+
+    def launch_args(self):
+        return [f"--disk-cache-size={self.max_cache_mb * 1024 * 1024}"]
+
+    def cache_size_mb(self):
+        return sum(directory_size_bytes(os.path.join(self.user_data_dir, subdirectory)) for subdirectory in CACHE_SUBDIRECTORIES) / (1024 * 1024)
+
+    def clear_cache(self):
+        for subdirectory in CACHE_SUBDIRECTORIES:
+            shutil.rmtree(os.path.join(self.user_data_dir, subdirectory), ignore_errors=True)
+
+
+def cleanup_profiles(profiles_dir, max_idle_days=DEFAULT_MAX_IDLE_DAYS, keep=()):
+    """Deletes managed profiles (directories with our marker file) unused for max_idle_days. Returns their names."""
+    if not os.path.isdir(profiles_dir):
+        return []
+    removed = []
+    cutoff = time.time() - max_idle_days * 86400
+    for name in sorted(os.listdir(profiles_dir)):
+        marker_path = os.path.join(profiles_dir, name, PROFILE_MARKER_FILENAME)
+        if name in keep or not os.path.exists(marker_path):
+            continue
+        try:
+            with open(marker_path, "r", encoding="utf-8") as f:
+                last_used = json.load(f).get("last_used", 0)
+        except (OSError, ValueError):
+            last_used = os.path.getmtime(marker_path)
+        if last_used < cutoff:
+            shutil.rmtree(os.path.join(profiles_dir, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+# Context -> its ProfileCacheMonitor, so pages opened anywhere on the context can be attached before they navigate.
+_CONTEXT_MONITORS = weakref.WeakKeyDictionary()
+
+
+async def attach_new_page(context, page):
+    """Awaits the cache monitor's setup (URL blocking) of a page just opened on context, if the context has a monitor."""
+    monitor = _CONTEXT_MONITORS.get(context)
+    if monitor:
+        await monitor.attach_page(context, page)
+
+
+class ProfileCacheMonitor:
+    """
+    Opens a CDP session on every page of a context to block blocked_url_globs and count how many responses came
+    from the HTTP cache (disk or memory). Counts go to stats and http_responses{cache=hit|miss} on the tracer.
+    """
+
+    def __init__(self, blocked_url_globs=None, tracer=None):
+        self.blocked_url_globs = list(blocked_url_globs or [])
+        self.tracer = tracer or run_tracing.NULL_TRACER
+        self.stats = {"pages": 0, "responses": 0, "cache_hits": 0}
+        self._served_from_cache = set()
+        self._page_attachments = weakref.WeakKeyDictionary()
+
+    async def attach(self, context):
+        _CONTEXT_MONITORS[context] = self
+        for page in context.pages:
+            await self.attach_page(context, page)
+        # Pages opened with new_page() are attached and awaited by attach_new_page() before they navigate; the
+        # listener only covers pages the site opens itself (popups), whose first requests may go out unblocked.
+        context.on("page", lambda page: self._attachment(context, page))
+        return self
+
+    def _attachment(self, context, page):
+        """The (shared) task setting up page's CDP session, started on first request."""
+        if page not in self._page_attachments:
+            self._page_attachments[page] = asyncio.ensure_future(self._attach_page(context, page))
+        return self._page_attachments[page]
+
+    async def attach_page(self, context, page):
+        """Blocks blocked_url_globs and starts cache counting on page; returns once that is in effect."""
+        await self._attachment(context, page)
+
+    async def _attach_page(self, context, page):
+        try:
+            cdp_session = await context.new_cdp_session(page)
+            cdp_session.on("Network.requestServedFromCache", self._on_request_served_from_cache)
+            cdp_session.on("Network.responseReceived", self._on_response_received)
+            await cdp_session.send("Network.enable")
+            if self.blocked_url_globs:
+                await cdp_session.send("Network.setBlockedURLs", {"urls": self.blocked_url_globs})
+            self.stats["pages"] += 1
+        except Exception as e:
+            print(f"Could not attach cache monitor to page: {e}")
+
+    def _on_request_served_from_cache(self, params):
+        self._served_from_cache.add(params.get("requestId"))
+
+    def _on_response_received(self, params):
+        request_id = params.get("requestId")
+        from_cache = request_id in self._served_from_cache or params.get("response", {}).get("fromDiskCache", False)
+        self._served_from_cache.discard(request_id)
+        self.stats["responses"] += 1
+        if from_cache:
+            self.stats["cache_hits"] += 1
+        self.tracer.count("http_responses", cache="hit" if from_cache else "miss")
+
+    @property
+    def hit_ratio(self):
+        return self.stats["cache_hits"] / self.stats["responses"] if self.stats["responses"] else 0.0
+
+    def summary(self):
+        return f"{self.stats['cache_hits']}/{self.stats['responses']} responses from cache (hit ratio {self.hit_ratio:.1%})"
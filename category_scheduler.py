@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Yield-aware scheduling of category scrapes. CATEGORY_TOGGLES still decides which categories may be scraped;
+the scheduler decides which of those are due this run and how many scroll passes each gets.
+
+Every visit of a category is recorded (scroll passes, new products, records seen and so the duplicate ratio,
+seconds spent). From the visits the scheduler keeps a smoothed arrival rate (new products per hour since the
+previous visit) and records per pass, and derives:
+  - the refresh interval: how long until about target_new_per_visit new products have arrived, clamped to
+    [min_interval_hours, max_interval_hours], so busy categories are polled often and stale ones rarely;
+  - the scroll budget: enough passes to reach back over what arrived during one interval, plus a margin,
+    clamped to [min_scroll_passes, max_scroll_passes].
+A visit that used its whole budget while still finding new products means arrivals were missed: the next
+interval is halved and the next visit gets max_scroll_passes.
+
+State is a JSON file per output directory, rewritten atomically after every visit like the checkpoint.
+"""
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+DEFAULT_SCHEDULE_POLICY = {
+    "min_interval_hours": 2,
+    "max_interval_hours": 72,
+    "target_new_per_visit": 40,
+    "min_scroll_passes": 3,
+    "max_scroll_passes": 30,   # The old fixed total_scroll_limit
+    "pass_margin": 2,          # Passes beyond the expected depth of new arrivals
+    "smoothing": 0.5,          # Weight of the latest visit in the arrival-rate and records-per-pass averages
+    "history_size": 10,        # Visits kept per category
+}
+
+
+def _smoothed(previous, latest, weight):
+    return latest if previous is None else weight * latest + (1 - weight) * previous
+
+
+def _clamp(value, lowest, highest):
+    return max(lowest, min(highest, value))
+
+
+def plan_next_visit(arrival_rate, records_per_pass, reached_budget, policy):
+    """(interval_hours, scroll_budget) for a category's next visit from its smoothed history."""
+    if arrival_rate is None:
+        interval_hours = policy["min_interval_hours"]
+    elif arrival_rate <= 0:
+        interval_hours = policy["max_interval_hours"]
+    else:
+        interval_hours = _clamp(policy["target_new_per_visit"] / arrival_rate, policy["min_interval_hours"], policy["max_interval_hours"])
+
+    if reached_budget or arrival_rate is None or not records_per_pass:
+        scroll_budget = policy["max_scroll_passes"]
+    elif arrival_rate <= 0:
+        scroll_budget = policy["min_scroll_passes"]
+    else:
+        expected_passes = math.ceil(arrival_rate * interval_hours / records_per_pass)
+        scroll_budget = _clamp(expected_passes + policy["pass_margin"], policy["min_scroll_passes"], policy["max_scroll_passes"])
+    if reached_budget:
+        interval_hours = max(policy["min_interval_hours"], interval_hours / 2)
+    return interval_hours, scroll_budget
+
+
+class CategoryScheduler:
+    def __init__(self, path, state, policy=None):
+        self.path = path
+        self.state = state
+        self.policy = {**DEFAULT_SCHEDULE_POLICY, **(policy or {})}
+        self.decisions = {}
+
+    @classmethod
+    def load(cls, path, target_url, policy=None):
+        """The schedule saved at path for target_url, or an empty one (every category due) if there is none."""
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("target_url") == target_url:
+                    return cls(path, state, policy)
+                print(f"Category schedule {path} is for another URL; starting a fresh schedule.")
+            except (OSError, ValueError) as e:
+                print(f"Could not read category schedule {path}: {e}. Starting a fresh schedule.")
+        return cls(path, {"target_url": target_url, "categories": {}}, policy)
+
+    def _category(self, category_name):
+        return self.state["categories"].get(category_name)
+
+    def is_due(self, category_name, now=None):
+        """Whether the category's refresh interval has passed (always for a category never visited). Remembered for summary()."""
+        now = time.time() if now is None else now
+        category = self._category(category_name)
+        due = not category or now >= category.get("next_due_at", 0)
+        self.decisions[category_name] = "due" if due else "skipped"
+        return due
+
+    def next_due_in_hours(self, category_name, now=None):
+        category = self._category(category_name)
+        return max(0.0, (category["next_due_at"] - (time.time() if now is None else now)) / 3600) if category else 0.0
+
+    def scroll_budget(self, category_name):
+        """Scroll passes for the category's next visit (max_scroll_passes until it has a history)."""
+        category = self._category(category_name)
+        return category["scroll_budget"] if category else self.policy["max_scroll_passes"]
+
+    def record_visit(self, category_name, passes, new_products, records_seen, seconds, reached_budget=False, now=None):
+        """Adds a finished visit, recomputes the category's interval and scroll budget (plan_next_visit) and saves."""
+        now = time.time() if now is None else now
+        policy = self.policy
+        category = self.state["categories"].setdefault(category_name, {"visits": [], "arrival_rate_per_hour": None, "records_per_pass": None})
+
+        # The first visit only sees an unknown backlog, so the arrival rate is learned from the second one on.
+        if category.get("last_visit_at"):
+            hours_since_last_visit = max((now - category["last_visit_at"]) / 3600, 1 / 60)
+            category["arrival_rate_per_hour"] = _smoothed(category["arrival_rate_per_hour"], new_products / hours_since_last_visit, policy["smoothing"])
+        if passes and records_seen:
+            category["records_per_pass"] = _smoothed(category["records_per_pass"], records_seen / passes, policy["smoothing"])
+
+        interval_hours, scroll_budget = plan_next_visit(category["arrival_rate_per_hour"], category["records_per_pass"], reached_budget, policy)
+        if reached_budget:
+            print(f"Category '{category_name}' was still yielding new products at its scroll budget; polling it sooner.")
+
+        category["visits"] = (category["visits"] + [{
+            "visited_at": datetime.utcfromtimestamp(now).isoformat(),
+            "passes": passes,
+            "new_products": new_products,
+            "records_seen": records_seen,
+            "duplicate_ratio": round(1 - new_products / records_seen, 4) if records_seen else None,
+            "new_per_pass": round(new_products / passes, 2) if passes else 0.0,
+            "seconds": round(seconds, 2),
+            "reached_budget": reached_budget,
+        }])[-policy["history_size"]:]
+        category.update({"last_visit_at": now, "interval_hours": round(interval_hours, 3), "scroll_budget": scroll_budget,
+                         "next_due_at": now + interval_hours * 3600})
+        self.save()
+        print(f"Schedule for '{category_name}': next visit in {interval_hours:.1f}h with up to {scroll_budget} scroll passes.")
+
+    def mean_visit_seconds(self, category_name):
+        category = self._category(category_name)
+        visits = category["visits"] if category else []
+        return sum(visit["seconds"] for visit in visits) / len(visits) if visits else 0.0
+
+    def summary(self):
+        """This run's due/skipped categories and the browser time the skips are estimated to have saved."""
+        skipped = [name for name, decision in self.decisions.items() if decision == "skipped"]
+        return {
+            "due": [name for name, decision in self.decisions.items() if decision == "due"],
+            "skipped": skipped,
+            "estimated_seconds_saved": round(sum(self.mean_visit_seconds(name) for name in skipped), 1),
+            "categories": {name: {"interval_hours": category.get("interval_hours"), "scroll_budget": category.get("scroll_budget"),
+                                  "arrival_rate_per_hour": category.get("arrival_rate_per_hour")}
+                           for name, category in self.state["categories"].items()},
+        }
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
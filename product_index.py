@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk index of known products, keyed by the numeric Alibaba product ID in URLs such as
+`..._11000023994216.html`.
+
+KnownProductIndex behaves like the `known_product_urls` set the scraper used to build from the whole output
+file (`url in index`, `index.add(url)`, `len(index)`), but it lives in a small SQLite file, so start-up and
+memory stay flat however large the archive grows. It is seeded from the JSON/JSONL output once and then kept
+up to date by the scraper as it adds products. URLs without a numeric ID fall back to a table of canonical URLs
+(see product_urls.canonicalize_product_url).
+
+With read_only=True the index is opened for lookups only (e.g. by sharded worker processes, while their
+coordinator is the single writer).
+
+With use_bloom_filter=True a Bloom filter in front of the ID table answers most "not known" lookups without
+touching SQLite. The filter is persisted on close and rebuilt from the table if the last run did not close cleanly.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+
+import product_store
+from product_urls import extract_product_id, canonicalize_product_url
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001, bits=None):
+        self.bit_count = max(1024, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.bit_count + 7) // 8)
+        if len(self.bits) != (self.bit_count + 7) // 8:
+            raise ValueError("Stored Bloom filter bits do not match its capacity.")
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.bit_count for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class KnownProductIndex:
+    def __init__(self, path, use_bloom_filter=False, bloom_capacity=5_000_000, commit_every=500, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.use_bloom_filter = use_bloom_filter
+        self.bloom_capacity = bloom_capacity
+        self.commit_every = commit_every
+        self.stats = {"lookups": 0, "bloom_negatives": 0, "hits": 0, "added": 0}
+        self._bloom = None
+        self._uncommitted_count = 0
+        self._connection = None
+
+    def open(self):
+        if self._connection is not None:
+            return self
+        if self.read_only:
+            self._connection = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True)
+            return self
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS known_product_ids (product_id INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS known_product_urls (product_url TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value BLOB) WITHOUT ROWID;
+        """)
+        if self.use_bloom_filter:
+            self._load_bloom_filter()
+        return self
+
+    def _get_meta(self, key):
+        row = self._connection.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _load_bloom_filter(self):
+        stored_bits = self._get_meta("bloom_bits")
+        try:
+            if stored_bits is None or self._get_meta("bloom_clean") != 1:
+                raise ValueError("No cleanly stored Bloom filter.")
+            self._bloom = BloomFilter(self.bloom_capacity, bits=bytearray(stored_bits))
+        except ValueError:
+            self._bloom = BloomFilter(self.bloom_capacity)
+            for (product_id,) in self._connection.execute("SELECT product_id FROM known_product_ids"):
+                self._bloom.add(product_id)
+        # Marked clean again only by close(); a crash mid-run forces a rebuild instead of trusting stale bits.
+        self._set_meta("bloom_clean", 0)
+        self._connection.commit()
+
+    def is_seeded(self):
+        return self._get_meta("seeded") == 1
+
+    def seed_from_files(self, paths):
+        """One-off import of every product URL in the given JSON/JSONL files. Returns the number of URLs read."""
+        url_count = 0
+        for batch in product_store.iter_product_batches(paths, batch_size=10000):
+            batch_urls = [product["product_url"] for product in batch if product.get("product_url")]
+            self.add_many(batch_urls)
+            url_count += len(batch_urls)
+        self.mark_seeded()
+        return url_count
+
+    def mark_seeded(self):
+        self._set_meta("seeded", 1)
+        self.commit()
+
+    def __contains__(self, product_url):
+        self.stats["lookups"] += 1
+        product_id = extract_product_id(product_url)
+        if product_id is None:
+            found = self._connection.execute("SELECT 1 FROM known_product_urls WHERE product_url = ?", (canonicalize_product_url(product_url),)).fetchone() is not None
+        elif self._bloom is not None and product_id not in self._bloom:
+            self.stats["bloom_negatives"] += 1
+            return False
+        else:
+            found = self._connection.execute("SELECT 1 FROM known_product_ids WHERE product_id = ?", (product_id,)).fetchone() is not None
+        if found:
+            self.stats["hits"] += 1
+        return found
+
+    def add(self, product_url):
+        self.add_many([product_url])
+
+    def add_many(self, product_urls):
+        ids, urls = [], []
+        for product_url in product_urls:
+            product_id = extract_product_id(product_url)
+            if product_id is not None:
+                ids.append((product_id,))
+            elif product_url:
+                urls.append((canonicalize_product_url(product_url),))
+        self._connection.executemany("INSERT OR IGNORE INTO known_product_ids (product_id) VALUES (?)", ids)
+        self._connection.executemany("INSERT OR IGNORE INTO known_product_urls (product_url) VALUES (?)", urls)
+        if self._bloom is not None:
+            for (product_id,) in ids:
+                self._bloom.add(product_id)
+        self.stats["added"] += len(ids) + len(urls)
+        self._uncommitted_count += len(ids) + len(urls)
+        if self._uncommitted_count >= self.commit_every:
+            self.commit()
+
+    def clear(self):
+        self._connection.execute("DELETE FROM known_product_ids")
+        self._connection.execute("DELETE FROM known_product_urls")
+        self._connection.execute("DELETE FROM index_meta WHERE key IN ('seeded', 'bloom_bits')")
+        if self._bloom is not None:
+            self._bloom = BloomFilter(self.bloom_capacity)
+        self.commit()
+
+    def __len__(self):
+        id_count = self._connection.execute("SELECT COUNT(*) FROM known_product_ids").fetchone()[0]
+        url_count = self._connection.execute("SELECT COUNT(*) FROM known_product_urls").fetchone()[0]
+        return id_count + url_count
+
+    def commit(self):
+        self._connection.commit()
+        self._uncommitted_count = 0
+
+    def close(self):
+        if self._connection is None:
+            return
+        if self.read_only:
+            self._connection.close()
+            self._connection = None
+            return
+        if self._bloom is not None:
+            self._set_meta("bloom_bits", bytes(self._bloom.bits))
+            self._set_meta("bloom_clean", 1)
+        self.commit()
+        self._connection.close()
+        self._connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_known_product_index(index_path, seed_paths, use_bloom_filter=False, commit_every=500):
+    """Opens the index at index_path, seeding it from seed_paths (the scraper's output files) on first use."""
+    index = KnownProductIndex(index_path, use_bloom_filter=use_bloom_filter, commit_every=commit_every).open()
+    try:
+        if not index.is_seeded():
+            url_count = index.seed_from_files(seed_paths)
+            print(f"Built known-product index {index_path} from {url_count} archived product URLs.")
+    except BaseException:
+        # Left unseeded, so the next open seeds it again (adds are idempotent).
+        index.close()
+        raise
+    return index
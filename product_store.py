@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Product output storage shared by the scraper and its consumers.
+
+New products are appended to a JSONL file (one JSON object per line) as soon as they are scraped, so a run
+never rewrites earlier data. iter_products() reads both that format and the legacy JSON-array file
+(scraped_alibaba_new_arrivals_enhanced.json), so existing archives keep working unchanged.
+
+Reading is streamed: JSON arrays are parsed incrementally (iter_json_array), so memory is bounded by the
+largest product rather than the file, and consumers take fixed-size batches with iter_product_batches().
+Files ending in .gz or .zst are decompressed on the fly (.zst needs the zstandard package).
+"""
+import gzip
+import io
+import json
+import os
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst input
+    zstandard = None
+
+READ_CHUNK_CHARS = 1 << 16
+JSON_WHITESPACE = " \t\r\n"
+JSON_NUMBER_CHARS = "0123456789+-.eE"
+MAX_PENDING_CHARS = 8 << 20  # Unparsed text kept past the last complete array element before giving up
+
+
+class JsonlProductWriter:
+    """Appends products to a JSONL file, flushing every line and fsyncing every fsync_every lines."""
+
+    def __init__(self, path, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.written_count = 0
+        self._unsynced_count = 0
+        self._file = None
+
+    def open(self):
+        if self._file is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            needs_newline = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as existing:
+                    existing.seek(-1, os.SEEK_END)
+                    # A crash mid-write leaves a partial last line; start on a fresh one so it stays isolated.
+                    needs_newline = existing.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            if needs_newline:
+                self._file.write("\n")
+        return self
+
+    def write(self, product):
+        self.open()
+        self._file.write(json.dumps(product, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.written_count += 1
+        self._unsynced_count += 1
+        if self._unsynced_count >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._unsynced_count:
+            os.fsync(self._file.fileno())
+            self._unsynced_count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def is_compressed(path):
+    return path.endswith((".gz", ".zst"))
+
+
+def open_product_file(path):
+    """Opens a product file for reading as text, decompressing .gz and .zst files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package (pip install zstandard).")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def detect_format(path):
+    """Returns "json" for a JSON-array file, "jsonl" otherwise (including empty files)."""
+    with open_product_file(path) as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return "jsonl"
+            if not char.isspace():
+                return "json" if char == "[" else "jsonl"
+
+
+def iter_json_array(text_file, chunk_chars=READ_CHUNK_CHARS, max_pending_chars=MAX_PENDING_CHARS):
+    """
+    Yields the elements of the top-level JSON array in text_file, reading it chunk_chars at a time. Only the
+    unparsed tail of the current chunk is kept, so memory is bounded by the largest element; an element (or
+    garbage, e.g. an unterminated string) running on for more than max_pending_chars raises json.JSONDecodeError
+    instead of growing the buffer further. Malformed or truncated input (including a trailing comma) raises
+    json.JSONDecodeError, like json.load, once the bad element is reached.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, at_eof = "", 0, False
+    expecting = "["  # Then "value or ]" after '[', "value" after ',', ", or ]" after an element
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+            position += 1
+        if position < len(buffer):
+            char = buffer[position]
+            if expecting == "[":
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buffer, position)
+                expecting, position = "value or ]", position + 1
+                continue
+            if expecting == ", or ]":
+                if char not in ",]":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                if char == "]":
+                    return
+                expecting, position = "value", position + 1
+                continue
+            if char == "]":
+                if expecting == "value":
+                    raise json.JSONDecodeError("Trailing comma before ']'", buffer, position)
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if at_eof:
+                    raise
+            else:
+                # An element that reaches the end of the buffer, or a number followed by what could continue it
+                # (e.g. '2' of '2.5'), may go on in the next chunk.
+                if at_eof or (end < len(buffer) and not (isinstance(element, (int, float)) and buffer[end] in JSON_NUMBER_CHARS)):
+                    expecting, position = ", or ]", end
+                    yield element
+                    continue
+        elif at_eof:
+            raise json.JSONDecodeError("Unterminated JSON array", buffer, position)
+        if len(buffer) - position > max_pending_chars:
+            raise json.JSONDecodeError(f"JSON array element longer than {max_pending_chars} characters", buffer, position)
+        chunk = text_file.read(chunk_chars)
+        buffer, position, at_eof = buffer[position:] + chunk, 0, not chunk
+
+
+def iter_products(path):
+    """
+    Yields product dicts from a JSON-array or JSONL file (optionally .gz/.zst compressed), one at a time.
+    A truncated last JSONL line (e.g. from a crash mid-write) is skipped with a warning instead of failing
+    the whole read.
+    """
+    if detect_format(path) == "json":
+        with open_product_file(path) as f:
+            for product in iter_json_array(f):
+                if isinstance(product, dict):
+                    yield product
+        return
+
+    with open_product_file(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                product = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable line {line_number} in {path}.")
+                continue
+            if isinstance(product, dict):
+                yield product
+
+
+def iter_products_from_files(paths):
+    """iter_products over every path that exists, in order."""
+    for path in paths:
+        if path and os.path.exists(path):
+            yield from iter_products(path)
+
+
+def iter_batches(products, batch_size=1000):
+    """Groups an iterable of products into lists of at most batch_size."""
+    batch = []
+    for product in products:
+        batch.append(product)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_product_batches(paths, batch_size=1000):
+    """iter_products_from_files in lists of at most batch_size products."""
+    return iter_batches(iter_products_from_files(paths), batch_size)
+
+
+def load_known_product_urls(paths):
+    known_product_urls = set()
+    for product in iter_products_from_files(paths):
+        if product.get("product_url"):
+            known_product_urls.add(product["product_url"])
+    return known_product_urls
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Product URL canonicalisation shared by the scraper and the DB loader.
+
+The same product shows up with tracking query strings, fragments, protocol-relative (`//`) or http links and
+regional/mobile hosts. canonicalize_product_url() reduces all of them to one form, e.g.
+`https://www.alibaba.com/product-detail/<slug>_11000023994216.html`, and extract_product_id() pulls out the
+numeric ID that dedupe is keyed on. URLs without an ID keep their path and non-tracking query parameters.
+"""
+import re
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+PRODUCT_ID_PATTERN = re.compile(r"_(\d{6,})\.html?$")
+CANONICAL_PRODUCT_HOST = "www.alibaba.com"
+TRACKING_QUERY_PARAMETERS = {"spm", "scm", "pvid", "tracelog", "abtest", "ali_trackid", "ali_refid", "from", "src", "s", "fromwhere", "ecology_token"}
+
+
+def extract_product_id(product_url):
+    """Returns the numeric product ID from a product URL's path, or None if the URL does not carry one."""
+    if not product_url:
+        return None
+    match = PRODUCT_ID_PATTERN.search(urlparse(product_url.strip()).path)
+    return int(match.group(1)) if match else None
+
+
+def canonicalize_product_url(product_url):
+    """Returns the canonical form of an absolute or protocol-relative product URL (None for empty input)."""
+    if not product_url:
+        return None
+    product_url = product_url.strip()
+    if product_url.startswith("//"):
+        product_url = "https:" + product_url
+    parsed_url = urlparse(product_url)
+    hostname = parsed_url.hostname or ""
+    is_alibaba_host = hostname == "alibaba.com" or hostname.endswith(".alibaba.com")
+    scheme = "https" if is_alibaba_host or not parsed_url.scheme else parsed_url.scheme.lower()
+    host = parsed_url.netloc.lower()
+    path = re.sub(r"/{2,}", "/", parsed_url.path)
+
+    if PRODUCT_ID_PATTERN.search(path):
+        # The ID identifies the product; query strings and fragments on detail pages are only tracking/state.
+        return urlunparse((scheme, CANONICAL_PRODUCT_HOST if is_alibaba_host else host, path, "", "", ""))
+
+    query = urlencode([(key, value) for key, value in parse_qsl(parsed_url.query, keep_blank_values=True)
+                       if key.lower() not in TRACKING_QUERY_PARAMETERS and not key.lower().startswith("utm_")])
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+def product_dedupe_key(product_url):
+    """Dedupe key for a product URL: its numeric product ID when present, otherwise the canonical URL."""
+    product_id = extract_product_id(product_url)
+    return product_id if product_id is not None else canonicalize_product_url(product_url)
+
+
+def canonicalize_product(product):
+    """
+    Returns a copy of a product dict with product_url canonicalised and alibaba_product_id (a string, as in
+    the products table) filled in from the URL when it carries one.
+    """
+    canonical_product = dict(product)
+    canonical_product["product_url"] = canonicalize_product_url(product.get("product_url"))
+    product_id = extract_product_id(canonical_product["product_url"])
+    if product_id is not None:
+        canonical_product["alibaba_product_id"] = str(product_id)
+    return canonical_product
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Lightweight tracing for scraper runs: nested spans per phase (navigation, modal handling, tab clicks, per-category
+and per-pass scroll/settle/extract), counters (products, Playwright protocol calls, fixed sleep time, readiness
+wait time against its fixed budget) and histograms (settle and readiness wait time).
+
+A RunTracer is passed down through the scrape functions like the checkpoint; functions given tracer=None use
+NULL_TRACER, which records nothing. At the end of a run, write_report() writes a JSON run report and
+write_prometheus() a Prometheus text-format metrics file (e.g. for node_exporter's textfile collector).
+
+Protocol calls are counted by hooking Playwright's client connection, so they include every page, element and
+route call; they are attributed to the innermost open span. If the hook cannot be installed (Playwright's
+internals moved), or counting_protocol_calls() was not used, reports give protocol_calls as null rather than 0.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    from playwright._impl._connection import Connection as _PlaywrightConnection
+except ImportError:  # protocol call counting is skipped if Playwright's internals move
+    _PlaywrightConnection = None
+
+DEFAULT_HISTOGRAM_BUCKETS = (0.5, 1, 2, 3, 5, 8, 13, 21, 30, 60)
+METRIC_PREFIX = "scraper"
+
+_active_tracers = []
+_original_send_message = None
+
+
+def _install_protocol_hook():
+    """Hooks Playwright's client connection once; returns whether protocol calls can be counted."""
+    global _original_send_message
+    if _original_send_message is not None:
+        return True
+    if _PlaywrightConnection is None or not hasattr(_PlaywrightConnection, "_send_message_to_server"):
+        return False
+    _original_send_message = original = _PlaywrightConnection._send_message_to_server
+
+    def counted_send_message(connection, *args, **kwargs):
+        for tracer in _active_tracers:
+            tracer._on_protocol_call()
+        return original(connection, *args, **kwargs)
+    _PlaywrightConnection._send_message_to_server = counted_send_message
+    return True
+
+
+class Span:
+    def __init__(self, span_id, name, parent_id, attributes):
+        self.span_id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.started_at = time.perf_counter()
+        self.duration_s = None
+        self.protocol_calls = 0
+        self.sleep_s = 0.0
+
+    def as_dict(self, run_started_at, protocol_calls_counted=True):
+        return {"id": self.span_id, "name": self.name, "parent_id": self.parent_id, "attributes": self.attributes,
+                "start_offset_s": round(self.started_at - run_started_at, 4),
+                "duration_s": round(self.duration_s, 4) if self.duration_s is not None else None,
+                "sleep_s": round(self.sleep_s, 4), "protocol_calls": self.protocol_calls if protocol_calls_counted else None}
+
+
+class RunTracer:
+    enabled = True
+
+    def __init__(self, run_name="new_arrivals_scrape", histogram_buckets=DEFAULT_HISTOGRAM_BUCKETS):
+        self.run_name = run_name
+        self.run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        self.started_at_utc = datetime.utcnow().isoformat()
+        self.histogram_buckets = histogram_buckets
+        self.spans = []
+        self.counters = {}
+        self.histograms = {}
+        self.protocol_calls = 0
+        self.protocol_calls_counted = False # Set by counting_protocol_calls() once the connection hook is in place
+        self._run_started_at = time.perf_counter()
+        self._current_span = contextvars.ContextVar(f"current_span_{id(self)}", default=None)
+
+    # --- Recording ---
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        parent = self._current_span.get()
+        span = Span(len(self.spans) + 1, name, parent.span_id if parent else None, attributes)
+        self.spans.append(span)
+        token = self._current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.duration_s = time.perf_counter() - span.started_at
+            self._current_span.reset(token)
+
+    def record_span(self, name, started_at, finished_at, **attributes):
+        """Adds an already finished child span of the current span from two time.perf_counter() readings."""
+        parent = self._current_span.get()
+        span = Span(len(self.spans) + 1, name, parent.span_id if parent else None, attributes)
+        span.started_at, span.duration_s = started_at, finished_at - started_at
+        self.spans.append(span)
+        return span
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.setdefault(key, {"buckets": [0] * len(self.histogram_buckets), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(self.histogram_buckets):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    async def sleep(self, page, milliseconds, phase):
+        """page.wait_for_timeout that books the time as a fixed sleep of the given phase (and of the current span)."""
+        started_at = time.perf_counter()
+        await page.wait_for_timeout(milliseconds)
+        slept_s = time.perf_counter() - started_at
+        self.count("fixed_sleep_seconds", slept_s, phase=phase)
+        span = self._current_span.get()
+        if span:
+            span.sleep_s += slept_s
+
+    @contextlib.contextmanager
+    def counting_protocol_calls(self):
+        """Counts Playwright protocol calls while the block runs (if the connection can be hooked)."""
+        if not _install_protocol_hook():
+            print("Run tracing: Playwright's connection cannot be hooked; protocol calls will not be counted.")
+            yield self
+            return
+        self.protocol_calls_counted = True
+        _active_tracers.append(self)
+        try:
+            yield self
+        finally:
+            _active_tracers.remove(self)
+
+    def _on_protocol_call(self):
+        self.protocol_calls += 1
+        span = self._current_span.get()
+        self.count("protocol_calls", phase=span.name if span else "run")
+        if span:
+            span.protocol_calls += 1
+
+    # --- Output ---
+    def counter_total(self, name):
+        """Sum of a counter over all its label sets."""
+        return sum(value for (counter_name, _), value in self.counters.items() if counter_name == name)
+
+    def phase_totals(self):
+        totals = {}
+        for span in self.spans:
+            phase = totals.setdefault(span.name, {"count": 0, "total_s": 0.0, "sleep_s": 0.0,
+                                                  "protocol_calls": 0 if self.protocol_calls_counted else None})
+            phase["count"] += 1
+            phase["total_s"] += span.duration_s or 0.0
+            phase["sleep_s"] += span.sleep_s
+            if self.protocol_calls_counted:
+                phase["protocol_calls"] += span.protocol_calls
+        return totals
+
+    def report(self, **extra):
+        return {
+            "run_name": self.run_name,
+            "run_id": self.run_id,
+            "started_at": self.started_at_utc,
+            "duration_s": round(time.perf_counter() - self._run_started_at, 4),
+            "protocol_calls": self.protocol_calls if self.protocol_calls_counted else None,
+            "phases": self.phase_totals(),
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()],
+            "histograms": [{"name": name, "labels": dict(labels), "buckets": dict(zip(self.histogram_buckets, h["buckets"])),
+                            "sum": h["sum"], "count": h["count"]} for (name, labels), h in self.histograms.items()],
+            "spans": [span.as_dict(self._run_started_at, self.protocol_calls_counted) for span in self.spans],
+            **extra,
+        }
+
+    def write_report(self, directory, **extra):
+        """
+        Writes run_report_<run_name>_<run_id>.json into directory and returns its path. run_id only has second
+        resolution, so the run name keeps reports of runs started together (e.g. shards) apart.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"run_report_{self.run_name}_{self.run_id}.json")
+        _write_atomically(path, json.dumps(self.report(**extra), indent=2, ensure_ascii=False))
+        return path
+
+    def prometheus_text(self):
+        lines = []
+        run_labels = {"run": self.run_name}
+
+        def metric_line(name, labels, value):
+            label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in {**run_labels, **labels}.items())
+            return f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}"
+
+        lines += [f"# TYPE {METRIC_PREFIX}_run_duration_seconds gauge",
+                  metric_line("run_duration_seconds", {}, round(time.perf_counter() - self._run_started_at, 4)),
+                  f"# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge",
+                  metric_line("run_timestamp_seconds", {}, int(time.time()))]
+        lines.append(f"# TYPE {METRIC_PREFIX}_phase_seconds gauge")
+        for phase, totals in self.phase_totals().items():
+            lines.append(metric_line("phase_seconds", {"phase": phase}, round(totals["total_s"], 4)))
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            for (counter_name, labels), value in self.counters.items():
+                if counter_name == name:
+                    lines.append(metric_line(f"{name}_total", dict(labels), round(value, 4)))
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} histogram")
+            for (histogram_name, labels), histogram in self.histograms.items():
+                if histogram_name != name:
+                    continue
+                for bound, bucket_count in zip(self.histogram_buckets, histogram["buckets"]):
+                    lines.append(metric_line(f"{name}_bucket", {**dict(labels), "le": bound}, bucket_count))
+                lines.append(metric_line(f"{name}_bucket", {**dict(labels), "le": "+Inf"}, histogram["count"]))
+                lines.append(metric_line(f"{name}_sum", dict(labels), round(histogram["sum"], 4)))
+                lines.append(metric_line(f"{name}_count", dict(labels), histogram["count"]))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Replaces the metrics file atomically so a scraping collector never reads a half-written file."""
+        _write_atomically(path, self.prometheus_text())
+        return path
+
+
+class NullTracer:
+    """Tracer stand-in when tracing is off: records nothing, but sleep() still sleeps."""
+
+    enabled = False
+    protocol_calls = 0
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        yield None
+
+    def record_span(self, name, started_at, finished_at, **attributes):
+        return None
+
+    def count(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def counter_total(self, name):
+        return 0
+
+    async def sleep(self, page, milliseconds, phase):
+        await page.wait_for_timeout(milliseconds)
+
+
+NULL_TRACER = NullTracer()
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _write_atomically(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # Per writer, so concurrent writers never share it
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
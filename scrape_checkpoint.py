@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Crash-safe progress checkpoint for scraper runs.
+
+Products themselves are already durable (appended to the JSONL output as they are scraped); the checkpoint
+records which categories finished and how many scroll passes the current one got through, so
+`python scraper.py --resume` can skip finished categories and fast-forward the partial one.
+The file is rewritten atomically (temp file + os.replace) after every pass.
+"""
+import json
+import os
+from datetime import datetime
+
+
+class ScrapeCheckpoint:
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def start(cls, path, target_url, resume=False):
+        """
+        With resume=True, continues an unfinished checkpoint for the same target_url if one exists;
+        otherwise (or for a completed run) starts a fresh checkpoint.
+        """
+        if resume and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("status") != "complete" and state.get("target_url") == target_url:
+                    done = [name for name, cat in state["categories"].items() if cat["status"] == "done"]
+                    print(f"Resuming run started {state['started_at']}: {len(done)} categories already done.")
+                    return cls(path, state)
+                print("Previous checkpoint is complete or for another URL; starting a fresh run.")
+            except (ValueError, KeyError) as e:
+                print(f"Could not read checkpoint {path}: {e}. Starting a fresh run.")
+        elif resume:
+            print(f"No checkpoint found at {path}; starting a fresh run.")
+
+        checkpoint = cls(path, {
+            "target_url": target_url,
+            "started_at": datetime.utcnow().isoformat(),
+            "status": "running",
+            "categories": {}
+        })
+        checkpoint.save()
+        return checkpoint
+
+    def _category(self, category_name):
+        return self.state["categories"].setdefault(category_name, {"status": "pending", "passes_completed": 0, "products_scraped": 0})
+
+    def is_category_done(self, category_name):
+        return self.state["categories"].get(category_name, {}).get("status") == "done"
+
+    def passes_completed(self, category_name):
+        """Scroll passes already done for a category that was interrupted mid-way (0 if it never started)."""
+        category = self.state["categories"].get(category_name)
+        return category["passes_completed"] if category and category["status"] == "in_progress" else 0
+
+    def record_pass(self, category_name, passes_completed, products_scraped):
+        category = self._category(category_name)
+        category.update({
+            "status": "in_progress",
+            "passes_completed": max(passes_completed, category["passes_completed"]),
+            "products_scraped": products_scraped,
+            "updated_at": datetime.utcnow().isoformat()
+        })
+        self.save()
+
+    def mark_category_done(self, category_name, products_scraped):
+        category = self._category(category_name)
+        category.update({"status": "done", "products_scraped": products_scraped, "updated_at": datetime.utcnow().isoformat()})
+        self.save()
+
+    def mark_run_complete(self):
+        """Marks the run complete unless a category was left in progress (e.g. a failed worker). Returns whether it did."""
+        if any(cat["status"] == "in_progress" for cat in self.state["categories"].values()):
+            return False
+        self.state["status"] = "complete"
+        self.state["finished_at"] = datetime.utcnow().isoformat()
+        self.save()
+        return True
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
 import json
 import re
@@ -7,6 +8,15 @@ from playwright.async_api import async_playwright, TimeoutError as PlaywrightTim
 from urllib.parse import urlparse
 import time
 import random # For random delays, proxy choice, etc.
+import weakref
+
+import browser_profile
+import category_scheduler
+import product_index
+import product_store
+import product_urls
+import run_tracing
+import scrape_checkpoint
 
 # --- START: Configuration for Login (User specific) ---
 # IMPORTANT: For real use, consider environment variables or a secure config file
@@ -137,30 +147,144 @@ async def apply_stealth_techniques(page_or_context):
     print("Stealth techniques applied via add_init_script.")
 
 
-async def create_enhanced_browser_context(playwright, output_dir, storage_state_path=None, headless_mode=True, proxy_config=None):
-    """Creates an enhanced browser context, potentially loading a storage state."""
+# --- START: Request Routing (resource blocking and per-host rate cap) ---
+# We only read src/data-src attributes, so image bytes, fonts, media and analytics beacons are pure overhead.
+RESOURCE_BLOCKING_POLICY = {
+    "enabled": True,
+    "blocked_resource_types": ["image", "media", "font"],
+    "blocked_url_patterns": [
+        r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net", r"facebook\.(net|com)/tr",
+        r"hotjar\.com", r"mmstat\.com", r"arms-retcode", r"/beacon", r"/collect\?",
+    ],
+    # Let these through despite the blocked resource types (the URL patterns above still win): the product feed
+    # and the page's own JS, i.e. scripts served from Alibaba's hosts only, not third-party tags.
+    "allowed_url_patterns": [r"mtop\.", r"/openapi/", r"^https?://([^/?#]+\.)?(alibaba|alicdn)\.com(:\d+)?/[^?#]*\.js(\?|#|$)"],
+    # Used instead of the rules above where routing is off (persistent-profile runs, see browser_profile.py):
+    # CDP URL globs can only approximate resource types by file extension.
+    "blocked_url_globs": [
+        "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.woff*", "*.ttf*", "*.otf*", "*.mp4*", "*.webm*",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*", "*mmstat.com*",
+        "*arms-retcode*", "*/beacon*", "*/collect?*",
+    ],
+}
+
+# Rough transfer sizes used to estimate bytes saved by aborted requests (their real size is never known).
+ESTIMATED_BYTES_BY_RESOURCE_TYPE = {"image": 35000, "media": 400000, "font": 60000, "script": 25000, "xhr": 2000, "fetch": 2000, "other": 1500}
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/max_requests_per_second apart (shared by all pages of a context)."""
+
+    def __init__(self, max_requests_per_second):
+        self.min_interval = 1.0 / max_requests_per_second
+        self.next_slot_by_host = {}
+
+    async def wait(self, host):
+        now = time.monotonic()
+        slot = max(now, self.next_slot_by_host.get(host, now))
+        self.next_slot_by_host[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class RequestRouter:
+    """
+    Single context.route handler for a browser context: aborts requests the blocking policy rejects and
+    applies the optional per-host rate cap to the rest. Both features share one handler so blocked
+    requests are never delayed by the rate cap.
+    """
+
+    def __init__(self, blocking_policy=None, rate_limiter=None):
+        self.blocking_policy = blocking_policy if blocking_policy and blocking_policy.get("enabled") else None
+        self.rate_limiter = rate_limiter
+        self.installed = False
+        if self.blocking_policy:
+            self._blocked_types = set(self.blocking_policy.get("blocked_resource_types", []))
+            self._blocked_pattern = self._compile(self.blocking_policy.get("blocked_url_patterns"))
+            self._allowed_pattern = self._compile(self.blocking_policy.get("allowed_url_patterns"))
+        self.stats = {"requests_seen": 0, "requests_allowed": 0, "requests_blocked": 0,
+                      "estimated_bytes_saved": 0, "blocked_by_type": {}}
+
+    @staticmethod
+    def _compile(patterns):
+        return re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+
+    @property
+    def is_active(self):
+        return bool(self.blocking_policy or self.rate_limiter)
+
+    def should_block(self, request):
+        if not self.blocking_policy:
+            return False
+        if self._blocked_pattern and self._blocked_pattern.search(request.url):
+            return True
+        if self._allowed_pattern and self._allowed_pattern.search(request.url):
+            return False
+        return request.resource_type in self._blocked_types
+
+    async def install(self, context):
+        """Registers the route handler once; later calls (e.g. after enabling the rate cap) are no-ops."""
+        if self.installed or not self.is_active:
+            return
+        await context.route("**/*", self.handle)
+        self.installed = True
+
+    async def handle(self, route):
+        request = route.request
+        self.stats["requests_seen"] += 1
+        if self.should_block(request):
+            resource_type = request.resource_type
+            self.stats["requests_blocked"] += 1
+            self.stats["blocked_by_type"][resource_type] = self.stats["blocked_by_type"].get(resource_type, 0) + 1
+            self.stats["estimated_bytes_saved"] += ESTIMATED_BYTES_BY_RESOURCE_TYPE.get(resource_type, ESTIMATED_BYTES_BY_RESOURCE_TYPE["other"])
+            await route.abort("blockedbyclient")
+            return
+        self.stats["requests_allowed"] += 1
+        if self.rate_limiter:
+            await self.rate_limiter.wait(urlparse(request.url).netloc)
+        await self.forward(route)
+
+    async def forward(self, route):
+        """Sends an allowed request on to the network. Subclasses (e.g. the offline replay router) answer it themselves."""
+        await route.continue_()
+
+    def summary(self):
+        saved_mb = self.stats["estimated_bytes_saved"] / (1024 * 1024)
+        return (f"{self.stats['requests_blocked']}/{self.stats['requests_seen']} requests blocked "
+                f"(~{saved_mb:.1f} MB saved, by type: {self.stats['blocked_by_type']})")
+
+# --- END: Request Routing ---
+
+
+BROWSER_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--window-size=1920,1080',
+    '--start-maximized',
+    '--disable-notifications',
+    '--disable-extensions',
+]
+
+
+async def launch_enhanced_browser(playwright, headless_mode=True):
     print(f"Attempting to launch browser (headless: {headless_mode})")
-    browser_launch_args = [
-            '--disable-blink-features=AutomationControlled',
-            '--disable-features=IsolateOrigins,site-per-process',
-            '--disable-dev-shm-usage',
-            '--no-sandbox',
-            '--window-size=1920,1080',
-            '--start-maximized',
-            '--disable-notifications',
-            '--disable-extensions',
-        ]
+    browser_launch_args = list(BROWSER_LAUNCH_ARGS)
     if headless_mode:
         browser_launch_args.append('--hide-scrollbars')
 
-    browser = await playwright.chromium.launch(
+    return await playwright.chromium.launch(
         headless=headless_mode,
         args=browser_launch_args
     )
 
+
+def load_storage_state(storage_state_path):
+    """Reads a saved storage state JSON file. Returns None if no path was given or the file is missing/unreadable."""
     loaded_storage_state = None
     effective_storage_state_path_to_load = storage_state_path
-    
+
     # Corrected logic: Only try to load if a path is actually given for loading state
     if effective_storage_state_path_to_load and os.path.exists(effective_storage_state_path_to_load):
         try:
@@ -174,9 +298,12 @@ async def create_enhanced_browser_context(playwright, output_dir, storage_state_
          print(f"Storage state file not found at {effective_storage_state_path_to_load}. A new context will be created without loading state.")
     else: # No path provided at all (storage_state_path was None and no default was set)
         print("No storage state path provided for loading. A new context will be created without loading state for this instance.")
+    return loaded_storage_state
 
 
-    context_options = {
+def enhanced_context_options():
+    """Fingerprint/header settings shared by regular and persistent-profile contexts."""
+    return {
         "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
         "viewport": {"width": 1920, "height": 1080},
         "locale": "en-US",
@@ -203,20 +330,71 @@ async def create_enhanced_browser_context(playwright, output_dir, storage_state_
             "upgrade-insecure-requests": "1",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
         },
-        "storage_state": loaded_storage_state
     }
 
+
+async def new_enhanced_context(browser, loaded_storage_state=None, proxy_config=None, request_router=None, record_har_path=None):
+    """
+    Opens a context with the fingerprint/header settings, stealth scripts and (optionally) a RequestRouter.
+    With record_har_path, all traffic is recorded to that HAR file, which is written when the context is closed.
+    """
+    context_options = {**enhanced_context_options(), "storage_state": loaded_storage_state}
+
     if proxy_config:
         context_options["proxy"] = proxy_config
         print(f"Using proxy: {proxy_config['server']}")
+    if record_har_path:
+        context_options["record_har_path"] = record_har_path
+        print(f"Recording network traffic to {record_har_path}")
 
     context = await browser.new_context(**context_options)
     await apply_stealth_techniques(context)
+    if request_router:
+        await request_router.install(context)
+        if request_router.blocking_policy:
+            print(f"Resource blocking enabled for types {request_router.blocking_policy['blocked_resource_types']} and {len(request_router.blocking_policy['blocked_url_patterns'])} URL patterns.")
+
+    return context
 
-    page = await context.new_page()
 
+async def launch_persistent_enhanced_context(playwright, profile, loaded_storage_state=None, headless_mode=True, proxy_config=None):
+    """
+    Launches Chromium on a browser_profile.ManagedProfile's user-data dir (HTTP cache and cookies persist across
+    runs) with the same settings as new_enhanced_context. The saved login cookies are applied on every launch,
+    so the storage-state file stays the source of truth. The returned context has no separate browser object.
+    """
+    browser_launch_args = list(BROWSER_LAUNCH_ARGS) + profile.launch_args()
+    if headless_mode:
+        browser_launch_args.append('--hide-scrollbars')
+    context_options = enhanced_context_options()
+    if proxy_config:
+        context_options["proxy"] = proxy_config
+        print(f"Using proxy: {proxy_config['server']}")
+
+    print(f"Launching browser on persistent profile '{profile.name}' ({'new' if profile.is_new else 'reused'}, cache {profile.cache_size_mb():.0f} MB) at {profile.user_data_dir}")
+    context = await playwright.chromium.launch_persistent_context(profile.user_data_dir, headless=headless_mode, args=browser_launch_args, **context_options)
+    if loaded_storage_state and loaded_storage_state.get("cookies"):
+        await context.add_cookies(loaded_storage_state["cookies"])
+    await apply_stealth_techniques(context)
+    return context
+
+
+async def new_enhanced_page(context):
+    page = await context.new_page()
+    # On a persistent profile, per-page CDP resource blocking must be in place before the first navigation.
+    await browser_profile.attach_new_page(context, page)
     page.set_default_navigation_timeout(120000)
     page.set_default_timeout(60000)
+    return page
+
+
+async def create_enhanced_browser_context(playwright, output_dir, storage_state_path=None, headless_mode=True, proxy_config=None, request_router=None,
+                                          record_har_path=None):
+    """Creates an enhanced browser context, potentially loading a storage state and installing a RequestRouter."""
+    browser = await launch_enhanced_browser(playwright, headless_mode)
+    loaded_storage_state = load_storage_state(storage_state_path)
+    context = await new_enhanced_context(browser, loaded_storage_state, proxy_config, request_router, record_har_path)
+    page = await new_enhanced_page(context)
 
     original_general_storage_state_path = os.path.join(output_dir, "storage_state.json")
 
@@ -269,6 +447,7 @@ async def diagnose_page_version(page, output_dir, diagnosis_name="page_diagnosis
     try:
         metrics = await page.evaluate("""() => {
             return {
+                url: location.href,
                 windowInnerHeight: window.innerHeight,
                 windowInnerWidth: window.innerWidth,
                 documentHeight: document.body.scrollHeight,
@@ -387,20 +566,34 @@ async def perform_manual_login_and_save_state(playwright, output_dir, storage_st
             print("Browser closed after manual login attempt.")
 
 
+MODAL_MASK_SELECTOR = "div.baxia-dialog-mask"
+MODAL_CLOSE_BUTTON_SELECTORS = [
+    "div.baxia-dialog-header-close",
+    "button[aria-label='close']",
+    "button[class*='close']",
+    "span[class*='close']",
+    ".baxia-dialog-close",
+    ".next-dialog-close"
+]
+GENERIC_OVERLAY_SELECTOR = "div[class*='overlay'][style*='display: block'], div[class*='mask'][style*='display: block']"
+COOKIE_ACCEPT_BUTTON_TEXTS = ["Accept All", "Agree", "Accept", "OK", "Allow all cookies", "I understand"]
+COOKIE_ACCEPT_BUTTON_CSS_SELECTORS = ["button[id*='cookie-accept']", "button[class*='cookie-accept']"]
+COOKIE_ACCEPT_BUTTON_SELECTORS = [f"button:has-text('{text}')" for text in COOKIE_ACCEPT_BUTTON_TEXTS] + COOKIE_ACCEPT_BUTTON_CSS_SELECTORS
+# The watcher's handler stays armed for the whole run, so it only matches buttons whose whole label is the text.
+COOKIE_ACCEPT_BUTTON_EXACT_SELECTORS = [f"button:text-is('{text}')" for text in COOKIE_ACCEPT_BUTTON_TEXTS] + COOKIE_ACCEPT_BUTTON_CSS_SELECTORS
+
+# "watcher": a DialogWatcher per page dismisses dialogs when they get in the way (see below).
+# "probe": handle_modal_dialogs() probes for them before and after every tab click.
+DIALOG_HANDLING = "watcher"
+
+
 async def handle_modal_dialogs(page):
     """Checks for and attempts to close known modal dialogs."""
     print("Checking for modal dialogs...")
     try:
-        modal_mask_selector = "div.baxia-dialog-mask"
-        modal_close_button_selectors = [
-            "div.baxia-dialog-header-close",
-            "button[aria-label='close']",
-            "button[class*='close']",
-            "span[class*='close']",
-            ".baxia-dialog-close",
-            ".next-dialog-close"
-        ]
-        generic_overlay_selector = "div[class*='overlay'][style*='display: block'], div[class*='mask'][style*='display: block']"
+        modal_mask_selector = MODAL_MASK_SELECTOR
+        modal_close_button_selectors = MODAL_CLOSE_BUTTON_SELECTORS
+        generic_overlay_selector = GENERIC_OVERLAY_SELECTOR
 
         active_modal_element = None
         modal_mask = await page.query_selector(modal_mask_selector)
@@ -414,12 +607,7 @@ async def handle_modal_dialogs(page):
                 active_modal_element = generic_overlay
             else:
                 print("No obvious modal dialogs detected by primary selectors.")
-                cookie_accept_buttons = [
-                    "button:has-text('Accept All')", "button:has-text('Agree')", "button:has-text('Accept')",
-                    "button:has-text('OK')", "button[id*='cookie-accept']", "button[class*='cookie-accept']",
-                    "button:has-text('Allow all cookies')", "button:has-text('I understand')"
-                ]
-                for btn_selector in cookie_accept_buttons:
+                for btn_selector in COOKIE_ACCEPT_BUTTON_SELECTORS:
                     try:
                         button = page.locator(btn_selector).first
                         if await button.is_visible(timeout=1500):
@@ -491,36 +679,867 @@ async def handle_modal_dialogs(page):
         print(f"Error during modal handling: {e}")
     return False
 
-async def scrape_products_from_current_page(page, scroll_delay, max_products_per_category, current_category_name, known_product_urls, max_scroll_attempts_no_new_content=3, output_dir="."):
+
+# One round trip that reports whether an overlay or a cookie banner is showing.
+DIALOG_SWEEP_SCRIPT = """
+(args) => {
+    const visible = (el) => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+    const overlay = [...document.querySelectorAll(args.overlaySelector)].some(visible);
+    const cookie = [...document.querySelectorAll(args.cookieCssSelector)].some(visible) ||
+        [...document.querySelectorAll('button')].some((button) =>
+            args.cookieButtonTexts.includes(button.textContent.replace(/\s+/g, ' ').trim()) && visible(button));
+    return {overlay, cookie};
+}
+"""
+
+
+class DialogWatcher:
+    """
+    Installed once per page in place of calling handle_modal_dialogs() around every tab click. Playwright locator
+    handlers close an overlay or accept a cookie banner whenever one is visible before a click or other action,
+    so nothing is probed while no dialog is present. sweep() covers the stretches without actions (a page load,
+    a tab's grid appearing) with a single evaluate. Counters: stats, and dialogs_handled{kind,outcome} on the tracer.
+    """
+
+    def __init__(self, page, tracer=None):
+        self.page = page
+        self.tracer = tracer or run_tracing.NULL_TRACER
+        self.overlay_locator = page.locator(f"{MODAL_MASK_SELECTOR}, {GENERIC_OVERLAY_SELECTOR} >> visible=true")
+        self.cookie_locator = page.locator(", ".join(COOKIE_ACCEPT_BUTTON_EXACT_SELECTORS) + " >> visible=true")
+        self.stats = {"overlays_closed": 0, "overlays_closed_with_escape": 0, "overlays_left_open": 0, "cookie_banners_accepted": 0,
+                      "sweeps": 0, "sweeps_with_dialog": 0}
+
+    async def install(self):
+        # no_wait_after: an overlay that will not close must not stall the action behind it.
+        await self.page.add_locator_handler(self.overlay_locator, self.close_overlay, no_wait_after=True)
+        await self.page.add_locator_handler(self.cookie_locator, self.accept_cookie_banner, no_wait_after=True)
+        return self
+
+    async def uninstall(self):
+        for locator in (self.overlay_locator, self.cookie_locator):
+            try:
+                await self.page.remove_locator_handler(locator)
+            except Exception as e:
+                print(f"Could not remove dialog handler: {e}")
+
+    async def close_overlay(self):
+        outcome = "left_open"
+        for selector in MODAL_CLOSE_BUTTON_SELECTORS:
+            close_button = self.page.locator(selector).first
+            try:
+                if await close_button.is_visible():
+                    await close_button.click(timeout=5000)
+                    await self.page.wait_for_timeout(500)
+                    if not await self.overlay_locator.count():
+                        outcome = "closed"
+                        break
+            except Exception as e:
+                print(f"Error clicking close button {selector}: {e}")
+        if outcome == "left_open":
+            await self.page.keyboard.press("Escape")
+            await self.page.wait_for_timeout(500)
+            if not await self.overlay_locator.count():
+                outcome = "closed_with_escape"
+        self.stats[f"overlays_{outcome}"] += 1
+        self.tracer.count("dialogs_handled", kind="overlay", outcome=outcome)
+        print(f"Dialog watcher: overlay {outcome.replace('_', ' ')}.")
+
+    async def accept_cookie_banner(self):
+        try:
+            await self.cookie_locator.first.click(timeout=3000)
+        except Exception as e:
+            print(f"Dialog watcher: could not click cookie consent button: {e}")
+            self.tracer.count("dialogs_handled", kind="cookie_banner", outcome="failed")
+            return
+        self.stats["cookie_banners_accepted"] += 1
+        self.tracer.count("dialogs_handled", kind="cookie_banner", outcome="accepted")
+        print("Dialog watcher: cookie consent accepted.")
+
+    async def sweep(self):
+        """Dismisses whatever dialog is showing right now. Returns True if there was one."""
+        self.stats["sweeps"] += 1
+        try:
+            showing = await self.page.evaluate(DIALOG_SWEEP_SCRIPT, {
+                "overlaySelector": f"{MODAL_MASK_SELECTOR}, {GENERIC_OVERLAY_SELECTOR}",
+                "cookieCssSelector": ", ".join(COOKIE_ACCEPT_BUTTON_CSS_SELECTORS),
+                "cookieButtonTexts": COOKIE_ACCEPT_BUTTON_TEXTS,
+            })
+            if not (showing["overlay"] or showing["cookie"]):
+                return False
+            self.stats["sweeps_with_dialog"] += 1
+            if showing["cookie"]:
+                await self.accept_cookie_banner()
+            if showing["overlay"]:
+                await self.close_overlay()
+            return True
+        except Exception as e:
+            print(f"Error during dialog sweep: {e}")
+            return False
+
+
+async def dismiss_dialogs(page, dialog_watcher=None):
+    """A DialogWatcher sweep if the page has a watcher, otherwise the full handle_modal_dialogs() probe."""
+    if dialog_watcher:
+        return await dialog_watcher.sweep()
+    return await handle_modal_dialogs(page)
+
+# --- START: Product Extraction Helpers ---
+PRODUCT_CONTAINER_SELECTOR = "div.hugo4-pc-grid-item"
+PRODUCT_LINK_SELECTORS = ["a[href*='/product-detail/']", "a[href]"]
+PRODUCT_IMAGE_SELECTOR = "img[data-src], img[src]"
+NAME_SELECTORS_RELATIVE = [
+    "h2", "h3", ".product-title", ".item-title", ".title", ".name",
+    "div[class*='title'] span", "div[class*='subject'] span", "a[title]"
+]
+PRICE_SELECTORS_RELATIVE = [
+    ".price", ".product-price", ".item-price",
+    "div[class*='price']", "span[class*='price']"
+]
+PROMO_URL_KEYWORDS = ['promotion', 'campaign', 'service', 'solution', 'about', 'contact', 'policy', 'news', 'blog', 'category', 'search', 'company_profile', 'list', 'collection', 'supplier']
+
+NON_PRODUCT_TITLES = [
+    "safe & easy payments", "money-back policy", "shipping & logistics services",
+    "after-sales protections", "rising search trends", "trade assurance",
+    "on-time delivery", "product monitoring & inspection services", "logistics service",
+    "payment solution", "view more", "learn more", "shop now", "explore",
+    "alibaba.com selects", "source now", "send inquiry", "chat now", "contact supplier",
+    "get a quote", "supplier assessment"
+]
+
+# Containers are stamped with this attribute (value = the tile's href) once fully extracted, so later
+# passes only pay for newly rendered tiles. Storing the href rather than a flag means a recycled grid
+# node showing a different product is picked up again. Set to None to re-extract everything every pass.
+PROCESSED_CONTAINER_ATTRIBUTE = "data-scraped-href"
+
+# Deep scrolls keep every tile in the DOM, so node count and renderer memory grow with each pass. With DOM_TRIMMING,
+# tiles that were fully extracted (stamped with PROCESSED_CONTAINER_ATTRIBUTE, or any tile in network mode) and are
+# well above the viewport are emptied into fixed-height placeholders after each pass. The container node stays with
+# its class and height, so scroll height, container counts and the site's lazy loading are unaffected, while its
+# subtree (and decoded image) is released. Placeholders are excluded from extraction.
+DOM_TRIMMING = False
+DOM_TRIM_MARGIN_PX = 2000 # Only tiles at least this far above the viewport are trimmed
+TRIMMED_CONTAINER_ATTRIBUTE = "data-scraper-trimmed"
+
+# "batched" reads every container in one page.evaluate round trip per pass.
+# "per_handle" is the original element-by-element walk (many CDP calls per tile), kept for comparison/fallback.
+EXTRACTION_MODE = "batched"
+
+# Mirrors the per-handle lookups below (link -> image -> name fallbacks -> price) so both modes
+# feed identical raw values into build_product_record.
+BATCHED_EXTRACTION_SCRIPT = """
+(args) => {
+    const containers = document.querySelectorAll(args.containerSelector);
+    const marker = args.markerAttribute;
+    const records = [];
+    let skippedCount = 0;
+    for (const container of containers) {
+        let link = null;
+        for (const sel of args.linkSelectors) {
+            link = container.querySelector(sel);
+            if (link) break;
+        }
+        if (!link) continue;
+        const href = link.getAttribute('href');
+        if (marker && href && container.getAttribute(marker) === href) {
+            skippedCount++;
+            continue;
+        }
+
+        const img = container.querySelector(args.imageSelector);
+        const imageUrl = img ? (img.getAttribute('data-src') || img.getAttribute('src')) : null;
+
+        let name = link.getAttribute('title');
+        if (!name || name.trim().length < 5) name = link.textContent;
+        if (!name || name.trim().length < 10) {
+            for (const sel of args.nameSelectors) {
+                const nameEl = container.querySelector(sel);
+                if (!nameEl) continue;
+                const candidate = nameEl.getAttribute('title') || nameEl.textContent;
+                if (candidate && candidate.trim().length > ((name || '').length || 5)) {
+                    name = candidate;
+                    if (name.trim().length > 10) break;
+                }
+            }
+        }
+
+        let price = null;
+        for (const sel of args.priceSelectors) {
+            const priceEl = container.querySelector(sel);
+            if (!priceEl) continue;
+            const candidate = priceEl.textContent;
+            if (candidate && /[$€£¥]/.test(candidate)) {
+                price = candidate;
+                break;
+            }
+        }
+
+        // Incomplete tiles (lazy image/price not rendered yet) stay unmarked and are retried next pass.
+        if (marker && imageUrl && name && price) container.setAttribute(marker, href);
+        records.push({
+            product_url: href,
+            image_url: imageUrl,
+            name: name,
+            price: price
+        });
+    }
+    return {containerCount: containers.length, skippedCount: skippedCount, records: records};
+}
+"""
+
+
+def resolve_absolute_url(raw_url, page_url):
+    """Turns an href/src found on the page into an absolute URL, or None if it is not usable."""
+    if not raw_url:
+        return None
+    parsed_url = urlparse(raw_url)
+    if parsed_url.scheme and parsed_url.netloc:
+        return raw_url
+    if raw_url.startswith("//"):
+        return "https:" + raw_url
+    if raw_url.startswith("/"):
+        page_url_parts = urlparse(page_url)
+        return f"{page_url_parts.scheme}://{page_url_parts.netloc}{raw_url}"
+    if "http" in raw_url:
+        return raw_url
+    return None
+
+
+def resolve_image_url(img_src, page_url):
+    if not img_src:
+        return None
+    if img_src.startswith("//"):
+        return "https:" + img_src
+    if img_src.startswith("/"):
+        base_url_parts = urlparse(page_url)
+        return f"{base_url_parts.scheme}://{base_url_parts.netloc}{img_src}"
+    if img_src.startswith("http"):
+        return img_src
+    return None
+
+
+def is_probable_product_url(product_url):
+    if re.search(r"/product-detail/|/p-detail/|/product_detail\.htm|item_detail\.htm", product_url, re.IGNORECASE) or \
+            ".html" in product_url.lower():
+        return True
+    return not any(kw in product_url.lower() for kw in PROMO_URL_KEYWORDS)
+
+
+def clean_product_name(name_text_content):
+    """Strips order/price/stock noise from a tile title. Returns None for promo tiles or implausible names."""
+    if not name_text_content:
+        return None
+    cleaned_name = name_text_content.strip()
+    cleaned_name = re.sub(r'Min\.\s*order:.*', '', cleaned_name, flags=re.IGNORECASE | re.DOTALL).strip()
+    cleaned_name = re.sub(r'\$\s?[\d,.]+(\.\d{1,2})?\s*(-\s*\$\s?[\d,.]+(\.\d{1,2})?)?(/\s*\w+)?', '', cleaned_name).strip()
+    cleaned_name = re.sub(r'\d+(\.\d+)?\s*(pieces|sets|pairs|units|meters|kgs?|tons?|pcs|Yards?).*', '', cleaned_name, flags=re.IGNORECASE | re.DOTALL).strip()
+    cleaned_name = re.sub(r'(Ready to Ship|In stock|Listed in last \d+ days|Hot sale|New arrival)', '', cleaned_name, flags=re.IGNORECASE).strip()
+    cleaned_name = re.sub(r'\s{2,}', ' ', cleaned_name).strip()
+
+    if any(non_prod_title.lower() in cleaned_name.lower() for non_prod_title in NON_PRODUCT_TITLES if len(cleaned_name.split()) < 7):
+        return None
+    if len(cleaned_name) < 10 or len(cleaned_name) > 250:
+        return None
+    if ("alibaba.com" in cleaned_name.lower() or "supplier" in cleaned_name.lower() or "wholesale" in cleaned_name.lower()) and len(cleaned_name.split()) < 7:
+        return None
+    return cleaned_name
+
+
+def clean_price(price_text_found):
+    if price_text_found and re.search(r"\d", price_text_found):
+        match = re.search(r"([$€£¥\s?[\d,]+(\.\d{1,2})?)", price_text_found)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def build_product_record(raw_record, current_category_name, page_url):
+    """
+    Applies the URL/name/price cleaning rules to a raw {name, product_url, image_url, price} record
+    (as returned by either extraction mode). The URL is canonicalised and alibaba_product_id filled in from it.
+    Returns None if the tile is not a complete product.
+    """
+    product_url = resolve_absolute_url(raw_record.get("product_url"), page_url)
+    if not product_url or "javascript:void(0)" in product_url:
+        return None
+    if not is_probable_product_url(product_url):
+        return None
+
+    product_data = product_urls.canonicalize_product({
+        "name": clean_product_name(raw_record.get("name")),
+        "product_url": product_url,
+        "image_url": resolve_image_url(raw_record.get("image_url"), page_url),
+        "price": clean_price(raw_record.get("price")),
+        "alibaba_category": current_category_name
+    })
+    if product_data["name"] and product_data["product_url"] and product_data["image_url"] and product_data["price"]:
+        return product_data
+    return None
+
+
+async def count_product_containers(page, product_container_selector=PRODUCT_CONTAINER_SELECTOR):
+    return await page.evaluate("(sel) => document.querySelectorAll(sel).length", product_container_selector)
+
+
+async def extract_raw_records_batched(page, product_container_selector=PRODUCT_CONTAINER_SELECTOR, marker_attribute=None):
+    """
+    Reads every product container in a single page.evaluate call. With marker_attribute set, containers
+    already stamped in an earlier pass are skipped in-page. Returns (container_count, raw_records).
+    """
+    result = await page.evaluate(BATCHED_EXTRACTION_SCRIPT, {
+        "containerSelector": product_container_selector,
+        "linkSelectors": PRODUCT_LINK_SELECTORS,
+        "imageSelector": PRODUCT_IMAGE_SELECTOR,
+        "nameSelectors": NAME_SELECTORS_RELATIVE,
+        "priceSelectors": PRICE_SELECTORS_RELATIVE,
+        "markerAttribute": marker_attribute,
+    })
+    return result["containerCount"], result["records"]
+
+
+TRIM_EXTRACTED_TILES_SCRIPT = """
+(args) => {
+    let trimmedCount = 0;
+    if (args.trim) {
+        for (const container of document.querySelectorAll(args.containerSelector)) {
+            if (container.hasAttribute(args.trimmedAttribute)) continue;
+            if (args.markerAttribute && !container.hasAttribute(args.markerAttribute)) continue;
+            const rect = container.getBoundingClientRect();
+            if (rect.bottom > -args.marginPx) continue;
+            container.style.boxSizing = 'border-box';
+            container.style.height = rect.height + 'px';
+            container.replaceChildren();
+            container.setAttribute(args.trimmedAttribute, '1');
+            trimmedCount++;
+        }
+    }
+    return {
+        trimmedCount: trimmedCount,
+        placeholderCount: document.querySelectorAll('[' + args.trimmedAttribute + ']').length,
+        domNodeCount: document.getElementsByTagName('*').length,
+        jsHeapBytes: performance.memory ? performance.memory.usedJSHeapSize : null
+    };
+}
+"""
+
+
+async def trim_extracted_tiles(page, trim=True, product_container_selector=PRODUCT_CONTAINER_SELECTOR, marker_attribute=PROCESSED_CONTAINER_ATTRIBUTE):
+    """
+    Replaces extracted tiles above the viewport with placeholders (see DOM_TRIMMING); marker_attribute=None trims
+    every tile scrolled past. With trim=False it only measures. Returns trimmedCount, placeholderCount,
+    domNodeCount and jsHeapBytes (Chromium only, else None) in one round trip.
+    """
+    return await page.evaluate(TRIM_EXTRACTED_TILES_SCRIPT, {
+        "trim": trim,
+        "containerSelector": product_container_selector,
+        "markerAttribute": marker_attribute,
+        "trimmedAttribute": TRIMMED_CONTAINER_ATTRIBUTE,
+        "marginPx": DOM_TRIM_MARGIN_PX,
+    })
+
+
+PENDING_CONTAINERS_SCRIPT = """
+([containers, linkSelectors, marker]) => containers.map((container) => {
+    let link = null;
+    for (const sel of linkSelectors) {
+        link = container.querySelector(sel);
+        if (link) break;
+    }
+    return !(link && container.getAttribute(marker) === link.getAttribute('href'));
+})
+"""
+
+MARK_CONTAINERS_SCRIPT = """
+([containers, hrefs, marker]) => containers.forEach((container, i) => container.setAttribute(marker, hrefs[i]))
+"""
+
+
+async def extract_raw_records_per_handle(page, known_product_urls, product_container_selector=PRODUCT_CONTAINER_SELECTOR, marker_attribute=None):
+    """
+    Original extraction path: walks each container ElementHandle from Python.
+    Tiles whose URL is already known are skipped before the image/name/price lookups.
+    With marker_attribute set, one evaluate filters out containers stamped in earlier passes and
+    one more stamps the containers handled this pass. Returns (container_count, raw_records).
+    """
+    container_elements = await page.query_selector_all(product_container_selector)
+    pending_elements = container_elements
+    if marker_attribute and container_elements:
+        pending_flags = await page.evaluate(PENDING_CONTAINERS_SCRIPT, [container_elements, PRODUCT_LINK_SELECTORS, marker_attribute])
+        pending_elements = [el for el, is_pending in zip(container_elements, pending_flags) if is_pending]
+
+    raw_records = []
+    elements_to_mark, hrefs_to_mark = [], []
+    for container_el in pending_elements:
+        try:
+            link_el = None
+            for link_selector in PRODUCT_LINK_SELECTORS:
+                link_el = await container_el.query_selector(link_selector)
+                if link_el:
+                    break
+            if not link_el:
+                continue
+
+            raw_product_url = await link_el.get_attribute("href")
+            resolved_url = resolve_absolute_url(raw_product_url, page.url)
+            if not resolved_url:
+                continue
+            if product_urls.canonicalize_product_url(resolved_url) in known_product_urls:
+                elements_to_mark.append(container_el)
+                hrefs_to_mark.append(raw_product_url)
+                continue
+
+            img_src = None
+            img_el_candidate = await container_el.query_selector(PRODUCT_IMAGE_SELECTOR)
+            if img_el_candidate:
+                img_src = await img_el_candidate.get_attribute("data-src") or await img_el_candidate.get_attribute("src")
+
+            name_text_content = await link_el.get_attribute("title")
+            if not name_text_content or len(name_text_content.strip()) < 5:
+                name_text_content = await link_el.text_content()
+
+            if not name_text_content or len(name_text_content.strip()) < 10:
+                for sel in NAME_SELECTORS_RELATIVE:
+                    name_el = await container_el.query_selector(sel)
+                    if name_el:
+                        name_text_content_candidate = await name_el.get_attribute("title") or await name_el.text_content()
+                        if name_text_content_candidate and len(name_text_content_candidate.strip()) > (len(name_text_content or "") or 5):
+                            name_text_content = name_text_content_candidate
+                            if len(name_text_content.strip()) > 10: break
+
+            price_text_found = None
+            for sel in PRICE_SELECTORS_RELATIVE:
+                price_el = await container_el.query_selector(sel)
+                if price_el:
+                    price_text_found_candidate = await price_el.text_content()
+                    if price_text_found_candidate and re.search(r"[$€£¥]", price_text_found_candidate):
+                        price_text_found = price_text_found_candidate
+                        break
+
+            raw_records.append({
+                "product_url": raw_product_url, "image_url": img_src,
+                "name": name_text_content, "price": price_text_found
+            })
+            if img_src and name_text_content and price_text_found:
+                elements_to_mark.append(container_el)
+                hrefs_to_mark.append(raw_product_url)
+        except Exception:
+            continue
+
+    if marker_attribute and elements_to_mark:
+        await page.evaluate(MARK_CONTAINERS_SCRIPT, [elements_to_mark, hrefs_to_mark, marker_attribute])
+    return len(container_elements), raw_records
+
+# --- END: Product Extraction Helpers ---
+
+
+# --- START: Network Feed Capture ---
+# "dom" rebuilds products from rendered tiles. "network" parses the JSON feed responses that fill the grid
+# and only falls back to DOM extraction on passes where no feed records arrived.
+INGESTION_MODE = "dom"
+
+# A JSON/JSONP response is treated as a product feed if its URL matches one of these.
+FEED_URL_PATTERNS = [
+    r"mtop\.", r"/openapi/", r"recommend", r"new[-_]?arrival", r"/feed", r"offer[-_]?list", r"product[-_]?list"
+]
+
+# Feed objects use different key names depending on the endpoint; first alias present wins.
+FEED_FIELD_ALIASES = {
+    "product_url": ["productUrl", "detailUrl", "productDetailUrl", "itemUrl", "action", "url"],
+    "name": ["subject", "title", "productTitle", "displayTitle", "name"],
+    "image_url": ["imageUrl", "imgUrl", "mainImage", "productImage", "picUrl", "image"],
+    "price": ["price", "priceText", "displayPrice", "promotionPrice", "localPrice", "fobPrice"],
+}
+
+JSONP_WRAPPER_PATTERN = re.compile(r"^\s*[\w$.]+\s*\(\s*(.*)\s*\)\s*;?\s*$", re.DOTALL)
+
+
+def parse_feed_payload(body_text):
+    """Parses a JSON or JSONP (mtopjsonp1({...})) response body. Returns None if it is neither."""
+    if not body_text:
+        return None
+    try:
+        return json.loads(body_text)
+    except ValueError:
+        pass
+    jsonp_match = JSONP_WRAPPER_PATTERN.match(body_text)
+    if jsonp_match:
+        try:
+            return json.loads(jsonp_match.group(1))
+        except ValueError:
+            return None
+    return None
+
+
+def _feed_price_text(price_value):
+    if isinstance(price_value, (int, float)):
+        return f"${price_value}"
+    if isinstance(price_value, dict):
+        for key in ("formatPrice", "text", "priceText", "price", "min"):
+            if price_value.get(key) is not None:
+                return _feed_price_text(price_value[key])
+        return None
+    if isinstance(price_value, str):
+        return price_value if re.search(r"[$€£¥]", price_value) else f"${price_value.strip()}"
+    return None
+
+
+def feed_item_to_raw_record(item):
+    """Maps one feed object onto the raw {name, product_url, image_url, price} shape, or None if it is not a product."""
+    raw_record = {}
+    for field, aliases in FEED_FIELD_ALIASES.items():
+        raw_record[field] = next((item[key] for key in aliases if item.get(key) not in (None, "")), None)
+    if not isinstance(raw_record["product_url"], str) or not isinstance(raw_record["name"], str):
+        return None
+    if not re.search(r"/product-detail/|/p-detail/|_\d+\.html", raw_record["product_url"]):
+        return None
+    if isinstance(raw_record["image_url"], list):
+        raw_record["image_url"] = raw_record["image_url"][0] if raw_record["image_url"] else None
+    if not isinstance(raw_record["image_url"], str):
+        raw_record["image_url"] = None
+    raw_record["price"] = _feed_price_text(raw_record["price"])
+    return raw_record
+
+
+def find_feed_products(payload):
+    """Walks a decoded feed payload and returns raw records for every product-like object in it."""
+    raw_records = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            raw_record = feed_item_to_raw_record(node)
+            if raw_record:
+                raw_records.append(raw_record)
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return raw_records
+
+
+class FeedCapture:
+    """
+    Listens to a page's responses and keeps the raw product records parsed from feed payloads until
+    drain() is called. Attach it before the navigation/tab click whose feed you want to capture.
+    """
+
+    def __init__(self, page, url_patterns=None):
+        self.page = page
+        self.url_pattern = re.compile("|".join(url_patterns or FEED_URL_PATTERNS), re.IGNORECASE)
+        self.pending_records = []
+        self.stats = {"responses_seen": 0, "feed_responses": 0, "records_captured": 0, "parse_errors": 0}
+
+    def attach(self):
+        self.page.on("response", self._on_response)
+        return self
+
+    def detach(self):
+        self.page.remove_listener("response", self._on_response)
+
+    def clear(self):
+        self.pending_records = []
+
+    def drain(self):
+        records, self.pending_records = self.pending_records, []
+        return records
+
+    async def _on_response(self, response):
+        self.stats["responses_seen"] += 1
+        if response.request.resource_type not in ("xhr", "fetch", "script"):
+            return
+        if not self.url_pattern.search(response.url):
+            return
+        try:
+            payload = parse_feed_payload(await response.text())
+        except Exception:
+            self.stats["parse_errors"] += 1
+            return
+        if payload is None:
+            return
+        raw_records = find_feed_products(payload)
+        if raw_records:
+            self.stats["feed_responses"] += 1
+            self.stats["records_captured"] += len(raw_records)
+            self.pending_records.extend(raw_records)
+
+# --- END: Network Feed Capture ---
+
+
+# --- START: Adaptive Readiness ---
+# Replaces the fixed waits after navigation, tab clicks and scroll passes with waits that end as soon as the page
+# is ready: the product grid changed or grew (counted by an in-page MutationObserver), the feed requests have gone
+# quiet, and a sentinel tile (the first one after a load, the last one after a scroll) is in the viewport.
+# The old fixed delay is still drawn and used as the fixed budget the wait is measured against; min_delay_ms is a
+# politeness floor no wait goes below.
+READINESS_POLICY = {
+    "enabled": True,
+    "min_delay_ms": 1500,  # Politeness floor for every wait
+    "network_quiet_ms": 700,  # Feed requests must have been idle this long
+    "no_growth_grace_ms": 2500,  # After a scroll, stop once the feed is quiet and nothing grew for this long
+    "stale_request_ms": 10000,  # In-flight feed requests older than this (long polls) no longer block readiness
+    "poll_interval_ms": 200,
+}
+
+READINESS_OBSERVER_SCRIPT = """
+(containerSelector) => {
+    if (window.__scraperReadiness) return;
+    const state = {containerCount: 0, changesSinceMark: 0, lastChangeAt: performance.now(), firstVisible: false, lastVisible: false};
+    window.__scraperReadiness = state;
+    let first = null, last = null, scheduled = false;
+    const visibility = new IntersectionObserver((entries) => {
+        for (const entry of entries) {
+            if (entry.target === first) state.firstVisible = entry.isIntersecting;
+            if (entry.target === last) state.lastVisible = entry.isIntersecting;
+        }
+    });
+    const refresh = () => {
+        scheduled = false;
+        const containers = document.querySelectorAll(containerSelector);
+        const nextFirst = containers[0] || null;
+        const nextLast = containers[containers.length - 1] || null;
+        if (containers.length !== state.containerCount || nextFirst !== first) {
+            state.containerCount = containers.length;
+            state.changesSinceMark += 1;
+            state.lastChangeAt = performance.now();
+        }
+        if (nextFirst !== first || nextLast !== last) {
+            visibility.disconnect();
+            first = nextFirst;
+            last = nextLast;
+            state.firstVisible = state.lastVisible = false;
+            if (first) visibility.observe(first);
+            if (last && last !== first) visibility.observe(last);
+        }
+    };
+    new MutationObserver(() => {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(refresh, 50);
+        }
+    }).observe(document, {childList: true, subtree: true});
+    refresh();
+}
+"""
+
+READINESS_STATE_SCRIPT = """
+() => {
+    const state = window.__scraperReadiness;
+    return state ? {...state, msSinceChange: performance.now() - state.lastChangeAt} : null;
+}
+"""
+
+READINESS_MARK_SCRIPT = "() => { if (window.__scraperReadiness) window.__scraperReadiness.changesSinceMark = 0; }"
+
+# Scrolls so the last product tile (the infinite-scroll sentinel) comes into view, with a real wheel event.
+SCROLL_TO_SENTINEL_SCRIPT = """
+(containerSelector) => {
+    const containers = document.querySelectorAll(containerSelector);
+    const last = containers[containers.length - 1];
+    const target = last ? last.getBoundingClientRect().bottom - window.innerHeight * 0.6 : window.innerHeight * 0.85;
+    return Math.max(Math.round(target), Math.round(window.innerHeight * 0.5));
+}
+"""
+
+
+# Page -> container selectors whose readiness observer init script the page already has.
+_READINESS_OBSERVED_PAGES = weakref.WeakKeyDictionary()
+
+
+class ReadinessWaiter:
+    """
+    Per-page readiness signals and the waits built on them. Attach it before the page's first navigation, like
+    FeedCapture; the observer script is then re-installed on every document the page loads.
+    Every wait books its duration, its fixed budget and the time saved on the tracer (readiness_* counters).
+    """
+
+    def __init__(self, page, policy=None, tracer=None, container_selector=PRODUCT_CONTAINER_SELECTOR, url_patterns=None):
+        self.page = page
+        self.policy = {**READINESS_POLICY, **(policy or {})}
+        self.tracer = tracer or run_tracing.NULL_TRACER
+        self.container_selector = container_selector
+        self.url_pattern = re.compile("|".join(url_patterns or FEED_URL_PATTERNS), re.IGNORECASE)
+        self._inflight_feed_requests = {}
+        self._last_feed_activity_at = 0.0
+        self._feed_responses_since_mark = 0
+        self._marked_at = time.perf_counter()
+        self.stats = {"waits": 0, "ready": 0, "budget_exhausted": 0, "waited_s": 0.0, "fixed_budget_s": 0.0, "time_saved_s": 0.0}
+
+    async def attach(self):
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_request_done)
+        self.page.on("requestfailed", self._on_request_done)
+        # Init scripts cannot be removed, so a pooled page gets the observer once per container selector.
+        observed_selectors = _READINESS_OBSERVED_PAGES.setdefault(self.page, set())
+        if self.container_selector not in observed_selectors:
+            await self.page.add_init_script(script=f"({READINESS_OBSERVER_SCRIPT})({json.dumps(self.container_selector)})")
+            observed_selectors.add(self.container_selector)
+        return self
+
+    def detach(self):
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("requestfinished", self._on_request_done)
+        self.page.remove_listener("requestfailed", self._on_request_done)
+
+    def _is_feed_request(self, request):
+        return request.resource_type in ("xhr", "fetch", "script") and bool(self.url_pattern.search(request.url))
+
+    def _on_request(self, request):
+        if self._is_feed_request(request):
+            self._inflight_feed_requests[request] = self._last_feed_activity_at = time.perf_counter()
+
+    def _on_request_done(self, request):
+        if self._inflight_feed_requests.pop(request, None) is not None:
+            self._last_feed_activity_at = time.perf_counter()
+            self._feed_responses_since_mark += 1
+
+    def feed_is_quiet(self, now=None):
+        now = now or time.perf_counter()
+        stale_s = self.policy["stale_request_ms"] / 1000
+        if any(now - started_at < stale_s for started_at in self._inflight_feed_requests.values()):
+            return False
+        return now - self._last_feed_activity_at >= self.policy["network_quiet_ms"] / 1000
+
+    async def read_state(self):
+        state = await self.page.evaluate(READINESS_STATE_SCRIPT)
+        if state is None:
+            # Document loaded before attach() (or the init script was blocked): install the observer now.
+            await self.page.evaluate(READINESS_OBSERVER_SCRIPT, self.container_selector)
+            state = await self.page.evaluate(READINESS_STATE_SCRIPT)
+        return state
+
+    async def mark(self):
+        """Starts a new observation window; call it right before the click or scroll whose effect is awaited."""
+        self._feed_responses_since_mark = 0
+        self._marked_at = time.perf_counter()
+        await self.page.evaluate(READINESS_MARK_SCRIPT)
+
+    async def scroll_to_sentinel(self):
+        """Brings the last product tile into view in one wheel scroll (replaces the PageDown loop)."""
+        distance = await self.page.evaluate(SCROLL_TO_SENTINEL_SCRIPT, self.container_selector)
+        await self.page.mouse.wheel(0, distance)
+
+    def _ready_reason(self, expect, state, baseline_count, now):
+        if state is None or not self.feed_is_quiet(now):
+            return None
+        if expect == "growth":
+            if state["containerCount"] > baseline_count:
+                return "grew"
+            if now - self._marked_at >= self.policy["no_growth_grace_ms"] / 1000:
+                return "end_of_feed" if state["lastVisible"] else "no_growth"
+            return None
+        if expect == "change" and not (state["changesSinceMark"] or self._feed_responses_since_mark):
+            return None
+        if state["containerCount"] > 0 and (state["firstVisible"] or state["msSinceChange"] >= self.policy["network_quiet_ms"]):
+            return "content"
+        return None
+
+    async def wait(self, phase, fixed_budget_ms, expect="content", baseline_count=0, max_wait_ms=None):
+        """
+        Waits until the page is ready and returns (reason, state); reason is None if max_wait_ms (default: the
+        fixed budget) ran out first. expect is "content" (grid present and settled), "change" (grid replaced since
+        mark(), e.g. after a tab click) or "growth" (more than baseline_count tiles since mark(), after a scroll;
+        also ends early with "end_of_feed"/"no_growth" once the feed is quiet and nothing arrived).
+        """
+        started_at = time.perf_counter()
+        max_wait_s = (max_wait_ms if max_wait_ms is not None else fixed_budget_ms) / 1000
+        await self.page.wait_for_timeout(min(self.policy["min_delay_ms"], fixed_budget_ms))
+        while True:
+            now = time.perf_counter()
+            state = await self.read_state()
+            reason = self._ready_reason(expect, state, baseline_count, now)
+            if reason or now - started_at >= max_wait_s:
+                break
+            await self.page.wait_for_timeout(self.policy["poll_interval_ms"])
+
+        waited_s = time.perf_counter() - started_at
+        self.record(phase, fixed_budget_ms, waited_s, reason or "budget_exhausted")
+        return reason, state
+
+    def record(self, phase, fixed_budget_ms, waited_s, outcome):
+        fixed_budget_s = fixed_budget_ms / 1000
+        time_saved_s = max(0.0, fixed_budget_s - waited_s)
+        self.stats["waits"] += 1
+        self.stats["budget_exhausted" if outcome == "budget_exhausted" else "ready"] += 1
+        self.stats["waited_s"] += waited_s
+        self.stats["fixed_budget_s"] += fixed_budget_s
+        self.stats["time_saved_s"] += time_saved_s
+        self.tracer.count("readiness_waits", phase=phase, outcome=outcome)
+        self.tracer.count("readiness_wait_seconds", waited_s, phase=phase)
+        self.tracer.count("readiness_fixed_budget_seconds", fixed_budget_s, phase=phase)
+        self.tracer.count("readiness_time_saved_seconds", time_saved_s, phase=phase)
+        self.tracer.observe("readiness_wait_seconds", waited_s, phase=phase)
+
+    def summary(self):
+        return {key: round(value, 2) if isinstance(value, float) else value for key, value in self.stats.items()}
+
+
+def pagedown_scroll_budget_ms():
+    """What the fixed scroll sequence (scrollBy, 8-15 PageDowns, trailing pause) would have slept, in ms."""
+    return random.randint(400, 700) + sum(random.randint(250, 450) for _ in range(random.randint(8, 15))) + random.randint(1200, 2000)
+
+# --- END: Adaptive Readiness ---
+
+
+async def scrape_products_from_current_page(page, scroll_delay, max_products_per_category, current_category_name, known_product_urls, max_scroll_attempts_no_new_content=3, output_dir=".", extraction_mode=None, feed_capture=None, product_writer=None,
+                                            checkpoint=None, fast_forward_passes=0, tracer=None, readiness=None, dom_trimming=None, category_scheduler=None):
+    """
+    Scrolls the current category grid and returns its new products. With a checkpoint, progress is recorded after
+    every pass; fast_forward_passes (from a resumed checkpoint) makes the first passes scroll with a short settle
+    and not count towards max_scroll_attempts_no_new_content, since their products are already known.
+    With a tracer, the category gets a span with scroll/settle/extract child spans per pass.
+    With a ReadinessWaiter, a pass scrolls to the last tile and settles until new tiles land (or the feed goes
+    quiet without any) instead of sleeping the fixed scroll_delay.
+    dom_trimming (default DOM_TRIMMING) turns extracted tiles into placeholders after each pass; with a tracer,
+    each pass span carries the page's DOM node count and JS heap either way.
+    A category_scheduler.CategoryScheduler sets the category's scroll budget (instead of the fixed 30 passes)
+    and gets the visit's passes, new products, records seen and duration once the category finishes.
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    with tracer.span("category", category=current_category_name):
+        return await _scrape_category_passes(page, scroll_delay, max_products_per_category, current_category_name, known_product_urls,
+                                             max_scroll_attempts_no_new_content, extraction_mode, feed_capture, product_writer,
+                                             checkpoint, fast_forward_passes, tracer, readiness,
+                                             DOM_TRIMMING if dom_trimming is None else dom_trimming, category_scheduler)
+
+
+async def _scrape_category_passes(page, scroll_delay, max_products_per_category, current_category_name, known_product_urls,
+                                  max_scroll_attempts_no_new_content, extraction_mode, feed_capture, product_writer,
+                                  checkpoint, fast_forward_passes, tracer, readiness, dom_trimming, category_scheduler):
+    category_started_at = time.perf_counter()
     products_in_category_for_return = []
     print(f"Starting scrape for category: {current_category_name}")
+    if fast_forward_passes:
+        print(f"  Resuming: fast-forwarding through {fast_forward_passes} passes completed before the interruption.")
 
+    extraction_mode = extraction_mode or EXTRACTION_MODE
     scroll_attempts_no_new_content = 0
-    total_scroll_limit = 30
+    total_scroll_limit = category_scheduler.scroll_budget(current_category_name) if category_scheduler else 30
     scroll_count = 0
+    records_seen = 0
+    actual_newly_added_this_pass_count = 0
 
-    product_container_selector = "div.hugo4-pc-grid-item"
-
-    NON_PRODUCT_TITLES = [
-        "safe & easy payments", "money-back policy", "shipping & logistics services",
-        "after-sales protections", "rising search trends", "trade assurance",
-        "on-time delivery", "product monitoring & inspection services", "logistics service",
-        "payment solution", "view more", "learn more", "shop now", "explore",
-        "alibaba.com selects", "source now", "send inquiry", "chat now", "contact supplier",
-        "get a quote", "supplier assessment"
-    ]
+    product_container_selector = PRODUCT_CONTAINER_SELECTOR
+    # Counting and settling use every container (placeholders keep the grid's count); extraction skips placeholders.
+    extraction_container_selector = f"{product_container_selector}:not([{TRIMMED_CONTAINER_ATTRIBUTE}])" if dom_trimming else product_container_selector
+    pass_timings = []
 
     while scroll_count < total_scroll_limit:
         scroll_count += 1
+        pass_started_at = time.perf_counter()
+        protocol_calls_at_pass_start = tracer.protocol_calls
         print(f"Processing product extraction pass {scroll_count} for category '{current_category_name}'...")
 
-        container_elements_before_scroll = await page.query_selector_all(product_container_selector)
-        count_before_scroll = len(container_elements_before_scroll)
+        count_before_scroll = await count_product_containers(page, product_container_selector)
         print(f"  Product container count before scroll/extraction (pass {scroll_count}): {count_before_scroll}")
 
         current_body_scroll_height = await page.evaluate("document.body.scrollHeight")
 
-        if scroll_count > 1:
+        if scroll_count > 1 and readiness:
+            await readiness.mark()
+            scroll_started_at = time.perf_counter()
+            await readiness.scroll_to_sentinel()
+            readiness.record("scroll", pagedown_scroll_budget_ms(), time.perf_counter() - scroll_started_at, "scrolled_to_sentinel")
+            print("  Scrolled to the last product tile.")
+        elif scroll_count > 1:
             print("  Attempting to focus body and scroll...")
             try:
                 await page.focus("body")
@@ -531,179 +1550,136 @@ async def scrape_products_from_current_page(page, scroll_delay, max_products_per
             js_scroll_distance = await page.evaluate("window.innerHeight * 0.85")
             print(f"  Attempting JavaScript scroll by {js_scroll_distance}px")
             await page.evaluate(f"window.scrollBy(0, {js_scroll_distance})")
-            await page.wait_for_timeout(random.randint(400, 700))
+            await tracer.sleep(page, random.randint(400, 700), "scroll")
 
             print("  Attempting PageDown key presses...")
             for i in range(random.randint(8, 15)):
                 await page.keyboard.press("PageDown")
-                await page.wait_for_timeout(random.randint(250, 450))
+                await tracer.sleep(page, random.randint(250, 450), "scroll")
                 if (i + 1) % 5 == 0:
                     print(f"     ... {i+1} PageDowns done")
-            await page.wait_for_timeout(random.randint(1200, 2000))
+            await tracer.sleep(page, random.randint(1200, 2000), "scroll")
             print("  Finished scroll attempts.")
         else:
             print(f"  Initial product extraction pass (scroll_count=1), using pre-loaded content.")
 
+        scroll_finished_at = time.perf_counter()
         effective_wait_after_scroll_actions = scroll_delay + random.randint(1, 4)
-        print(f"  Waiting for ~{effective_wait_after_scroll_actions} seconds for content to potentially load/settle after scroll/initial load...")
-        await page.wait_for_timeout(effective_wait_after_scroll_actions * 1000)
-
+        if scroll_count <= fast_forward_passes:
+            effective_wait_after_scroll_actions = random.randint(2, 3)
         new_content_appeared_in_dom = False
-        if scroll_count > 1:
+        if readiness:
+            print(f"  Waiting for content to land (fixed budget ~{effective_wait_after_scroll_actions}s)...")
+            # The cap keeps the old worst case: the fixed settle plus the 10s container-count wait.
+            ready_reason, readiness_state = await readiness.wait(
+                "settle", effective_wait_after_scroll_actions * 1000, expect="growth" if scroll_count > 1 else "content",
+                baseline_count=count_before_scroll, max_wait_ms=effective_wait_after_scroll_actions * 1000 + (10000 if scroll_count > 1 else 0))
+            new_content_appeared_in_dom = scroll_count > 1 and ready_reason == "grew"
+            print(f"  Settled after {time.perf_counter() - scroll_finished_at:.1f}s ({ready_reason or 'budget exhausted'}, "
+                  f"{readiness_state['containerCount'] if readiness_state else '?'} containers).")
+        else:
+            print(f"  Waiting for ~{effective_wait_after_scroll_actions} seconds for content to potentially load/settle after scroll/initial load...")
+            await tracer.sleep(page, effective_wait_after_scroll_actions * 1000, "settle")
+
+        if scroll_count > 1 and not readiness:
             print(f"  Checking if new product containers appeared in DOM (start count: {count_before_scroll}). Max wait 10s...")
             try:
                 await page.wait_for_function(
                     f"document.querySelectorAll('{product_container_selector}').length > {count_before_scroll}",
                     timeout=10000
                 )
-                new_total_container_count = len(await page.query_selector_all(product_container_selector))
+                new_total_container_count = await count_product_containers(page, product_container_selector)
                 print(f"  SUCCESS: Product container count increased to {new_total_container_count}.")
                 new_content_appeared_in_dom = True
             except PlaywrightTimeoutError:
-                new_total_container_count = len(await page.query_selector_all(product_container_selector))
+                new_total_container_count = await count_product_containers(page, product_container_selector)
                 print(f"  TIMEOUT/INFO: Product container count did not increase after scroll. Current count: {new_total_container_count}.")
             except Exception as e:
                 print(f"  Error during wait_for_function for product container count: {e}")
 
-        current_container_elements = await page.query_selector_all(product_container_selector)
-        print(f"  Extracting product information from {len(current_container_elements)} found containers for category: {current_category_name} (Pass {scroll_count})...")
+        extraction_started_at = time.perf_counter()
+        raw_records = feed_capture.drain() if feed_capture else []
+        record_source = "network feed"
+        if raw_records:
+            current_container_count = await count_product_containers(page, product_container_selector)
+        elif extraction_mode == "per_handle":
+            record_source = "DOM, per_handle"
+            current_container_count, raw_records = await extract_raw_records_per_handle(page, known_product_urls, extraction_container_selector, PROCESSED_CONTAINER_ATTRIBUTE)
+        else:
+            record_source = "DOM, batched"
+            current_container_count, raw_records = await extract_raw_records_batched(page, extraction_container_selector, PROCESSED_CONTAINER_ATTRIBUTE)
+        print(f"  Extracting product information from {current_container_count} found containers for category: {current_category_name} (Pass {scroll_count}, source: {record_source})...")
 
         new_products_found_this_scroll_pass = []
-
-        for i, container_el in enumerate(current_container_elements):
-            product_data = {
-                "name": None, "product_url": None, "image_url": None, "price": None,
-                "alibaba_category": current_category_name
-            }
-            try:
-                link_el = await container_el.query_selector("a[href*='/product-detail/']")
-                if not link_el:
-                    link_el = await container_el.query_selector("a[href]")
-                if not link_el:
-                    continue
-
-                raw_product_url = await link_el.get_attribute("href")
-                if raw_product_url:
-                    parsed_url = urlparse(raw_product_url)
-                    if parsed_url.scheme and parsed_url.netloc:
-                        product_data["product_url"] = raw_product_url
-                    elif raw_product_url.startswith("//"):
-                        product_data["product_url"] = "https:" + raw_product_url
-                    elif raw_product_url.startswith("/"):
-                        current_page_url_parts = urlparse(page.url)
-                        product_data["product_url"] = f"{current_page_url_parts.scheme}://{current_page_url_parts.netloc}{raw_product_url}"
-                    elif "http" in raw_product_url:
-                         product_data["product_url"] = raw_product_url
-                    else:
-                        continue
-                else:
-                    continue
-
-                if not product_data["product_url"] or "javascript:void(0)" in product_data["product_url"]:
-                    continue
-
-                if product_data["product_url"] in known_product_urls:
-                    continue
-
-                is_duplicate_this_pass_batch = any(
-                    p_temp["product_url"] == product_data["product_url"] for p_temp in new_products_found_this_scroll_pass
-                )
-                if is_duplicate_this_pass_batch:
-                    continue
-
-                if not (re.search(r"/product-detail/|/p-detail/|/product_detail\.htm|item_detail\.htm", product_data["product_url"], re.IGNORECASE) or
-                            ".html" in product_data["product_url"].lower()):
-                    promo_keywords = ['promotion', 'campaign', 'service', 'solution', 'about', 'contact', 'policy', 'news', 'blog', 'category', 'search', 'company_profile', 'list', 'collection', 'supplier']
-                    if any(kw in product_data["product_url"].lower() for kw in promo_keywords):
-                        continue
-
-                img_el_candidate = await container_el.query_selector("img[data-src], img[src]")
-                if img_el_candidate:
-                    img_src = await img_el_candidate.get_attribute("data-src") or await img_el_candidate.get_attribute("src")
-                    if img_src:
-                        if img_src.startswith("//"): product_data["image_url"] = "https:" + img_src
-                        elif img_src.startswith("/"):
-                            base_url_parts = urlparse(page.url)
-                            product_data["image_url"] = f"{base_url_parts.scheme}://{base_url_parts.netloc}{img_src}"
-                        elif img_src.startswith("http"): product_data["image_url"] = img_src
-
-                name_text_content = None
-                name_selectors_relative = [
-                    "h2", "h3", ".product-title", ".item-title", ".title", ".name",
-                    "div[class*='title'] span", "div[class*='subject'] span", "a[title]"
-                ]
-                name_el_to_check = link_el
-                if name_el_to_check:
-                        name_text_content = await name_el_to_check.get_attribute("title")
-                        if not name_text_content or len(name_text_content.strip()) < 5:
-                            name_text_content = await name_el_to_check.text_content()
-
-                if not name_text_content or len(name_text_content.strip()) < 10 :
-                    for sel in name_selectors_relative:
-                        name_el = await container_el.query_selector(sel)
-                        if name_el:
-                            name_text_content_candidate = await name_el.get_attribute("title") or await name_el.text_content()
-                            if name_text_content_candidate and len(name_text_content_candidate.strip()) > (len(name_text_content or "") or 5):
-                                name_text_content = name_text_content_candidate
-                                if len(name_text_content.strip()) > 10: break
-
-                if name_text_content:
-                    cleaned_name = name_text_content.strip()
-                    cleaned_name = re.sub(r'Min\.\s*order:.*', '', cleaned_name, flags=re.IGNORECASE | re.DOTALL).strip()
-                    cleaned_name = re.sub(r'\$\s?[\d,.]+(\.\d{1,2})?\s*(-\s*\$\s?[\d,.]+(\.\d{1,2})?)?(/\s*\w+)?', '', cleaned_name).strip()
-                    cleaned_name = re.sub(r'\d+(\.\d+)?\s*(pieces|sets|pairs|units|meters|kgs?|tons?|pcs|Yards?).*', '', cleaned_name, flags=re.IGNORECASE | re.DOTALL).strip()
-                    cleaned_name = re.sub(r'(Ready to Ship|In stock|Listed in last \d+ days|Hot sale|New arrival)', '', cleaned_name, flags=re.IGNORECASE).strip()
-                    cleaned_name = re.sub(r'\s{2,}', ' ', cleaned_name).strip()
-
-                    if any(non_prod_title.lower() in cleaned_name.lower() for non_prod_title in NON_PRODUCT_TITLES if len(cleaned_name.split()) < 7):
-                        cleaned_name = None
-                    elif len(cleaned_name) < 10 or len(cleaned_name) > 250:
-                        cleaned_name = None
-                    elif ("alibaba.com" in cleaned_name.lower() or "supplier" in cleaned_name.lower() or "wholesale" in cleaned_name.lower()) and len(cleaned_name.split()) < 7 :
-                        cleaned_name = None
-                    product_data["name"] = cleaned_name
-
-                price_text_found = None
-                price_selectors_relative = [
-                    ".price", ".product-price", ".item-price",
-                    "div[class*='price']", "span[class*='price']"
-                ]
-                for sel in price_selectors_relative:
-                    price_el = await container_el.query_selector(sel)
-                    if price_el:
-                        price_text_found_candidate = await price_el.text_content()
-                        if price_text_found_candidate and re.search(r"[$€£¥]", price_text_found_candidate):
-                            price_text_found = price_text_found_candidate
-                            break
-                if price_text_found and re.search(r"\d", price_text_found):
-                    match = re.search(r"([$€£¥\s?[\d,]+(\.\d{1,2})?)", price_text_found)
-                    if match: product_data["price"] = match.group(1).strip()
-
-                if product_data["name"] and product_data["product_url"] and product_data["image_url"] and product_data["price"]:
-                    new_products_found_this_scroll_pass.append(product_data)
-
-            except Exception as e:
+        dedupe_keys_seen_this_pass = set()
+        page_url = page.url
+        for raw_record in raw_records:
+            product_data = build_product_record(raw_record, current_category_name, page_url)
+            if not product_data:
                 continue
+            dedupe_key = product_urls.product_dedupe_key(product_data["product_url"])
+            if product_data["product_url"] in known_product_urls or dedupe_key in dedupe_keys_seen_this_pass:
+                continue
+            dedupe_keys_seen_this_pass.add(dedupe_key)
+            new_products_found_this_scroll_pass.append(product_data)
+        extraction_finished_at = time.perf_counter()
+        records_seen += len(raw_records)
+        pass_timings.append({
+            "pass": scroll_count,
+            "containers": current_container_count,
+            "records_extracted": len(raw_records),
+            "scroll_s": scroll_finished_at - pass_started_at,
+            "settle_s": extraction_started_at - scroll_finished_at,
+            "extract_s": extraction_finished_at - extraction_started_at,
+        })
+        tracer.record_span("scroll", pass_started_at, scroll_finished_at, category=current_category_name, pass_number=scroll_count)
+        tracer.record_span("settle", scroll_finished_at, extraction_started_at, category=current_category_name, pass_number=scroll_count)
+        tracer.record_span("extract", extraction_started_at, extraction_finished_at, category=current_category_name, pass_number=scroll_count,
+                           source=record_source, records=len(raw_records))
+        tracer.observe("settle_seconds", extraction_started_at - scroll_finished_at)
+        tracer.count("records_extracted", len(raw_records), source=record_source)
+        print(f"  Pass {scroll_count} timings: scroll={scroll_finished_at - pass_started_at:.2f}s settle={extraction_started_at - scroll_finished_at:.2f}s "
+              f"extract={extraction_finished_at - extraction_started_at:.3f}s ({len(raw_records)} of {current_container_count} containers extracted).")
 
         actual_newly_added_this_pass_count = 0
-        if not new_products_found_this_scroll_pass and len(current_container_elements) > 0 and scroll_count == 1:
-            print(f"  INFO: Found {len(current_container_elements)} containers, but extracted 0 new unique products with current sub-selectors on pass 1.")
+        if not new_products_found_this_scroll_pass and current_container_count > 0 and scroll_count == 1:
+            print(f"  INFO: Found {current_container_count} containers, but extracted 0 new unique products with current sub-selectors on pass 1.")
 
         for p_new in new_products_found_this_scroll_pass:
             products_in_category_for_return.append(p_new)
             known_product_urls.add(p_new["product_url"])
+            if product_writer:
+                product_writer.write(p_new)
             actual_newly_added_this_pass_count += 1
             print(f"Scraped new product {len(products_in_category_for_return)}/'{max_products_per_category if max_products_per_category else 'all new'}' for '{current_category_name}': Name='{p_new['name'][:30]}...' Price='{p_new['price']}'")
 
+        dom_stats = {}
+        if dom_trimming or tracer.enabled:
+            # Network-fed tiles are never stamped, so in that mode every tile scrolled past counts as extracted.
+            dom_stats = await trim_extracted_tiles(page, dom_trimming, product_container_selector,
+                                                   None if record_source == "network feed" else PROCESSED_CONTAINER_ATTRIBUTE)
+            tracer.count("dom_tiles_trimmed", dom_stats["trimmedCount"], category=current_category_name)
+            if dom_trimming:
+                print(f"  DOM trimming: {dom_stats['trimmedCount']} tiles trimmed this pass, {dom_stats['placeholderCount']} placeholders, {dom_stats['domNodeCount']} DOM nodes.")
+
+        tracer.count("products_extracted", actual_newly_added_this_pass_count, category=current_category_name)
+        tracer.record_span("pass", pass_started_at, time.perf_counter(), category=current_category_name, pass_number=scroll_count,
+                           new_products=actual_newly_added_this_pass_count, protocol_calls=tracer.protocol_calls - protocol_calls_at_pass_start,
+                           dom_nodes=dom_stats.get("domNodeCount"), js_heap_bytes=dom_stats.get("jsHeapBytes"), placeholders=dom_stats.get("placeholderCount"))
+        if checkpoint:
+            checkpoint.record_pass(current_category_name, scroll_count, len(products_in_category_for_return))
+
         if max_products_per_category and len(products_in_category_for_return) >= max_products_per_category:
             print(f"Reached max_products_per_category limit of {max_products_per_category} for '{current_category_name}'.")
             break
 
         new_body_scroll_height_after_extraction = await page.evaluate("document.body.scrollHeight")
-        if actual_newly_added_this_pass_count == 0:
+        if actual_newly_added_this_pass_count == 0 and scroll_count <= fast_forward_passes:
+            print(f"  Fast-forward pass {scroll_count}/{fast_forward_passes}: no new products expected, not counted as an empty pass.")
+        elif actual_newly_added_this_pass_count == 0:
             condition_no_new_dom_and_height = (scroll_count > 1 and not new_content_appeared_in_dom and new_body_scroll_height_after_extraction <= current_body_scroll_height + 20)
-            condition_initial_fail_with_containers = (scroll_count == 1 and len(current_container_elements) > 0 and not new_products_found_this_scroll_pass)
-            condition_initial_no_containers = (scroll_count == 1 and len(current_container_elements) == 0)
+            condition_initial_fail_with_containers = (scroll_count == 1 and current_container_count > 0 and not new_products_found_this_scroll_pass)
+            condition_initial_no_containers = (scroll_count == 1 and current_container_count == 0)
 
             if condition_no_new_dom_and_height or condition_initial_fail_with_containers or condition_initial_no_containers:
                 scroll_attempts_no_new_content += 1
@@ -731,17 +1707,564 @@ async def scrape_products_from_current_page(page, scroll_delay, max_products_per
             print(f"Reached total scroll limit of {total_scroll_limit} for category '{current_category_name}'.")
             break
 
+    if pass_timings:
+        total_extract_s = sum(t["extract_s"] for t in pass_timings)
+        print(f"  Extraction time for '{current_category_name}': {total_extract_s:.3f}s over {len(pass_timings)} passes "
+              f"(first pass {pass_timings[0]['extract_s']:.3f}s, last pass {pass_timings[-1]['extract_s']:.3f}s).")
+    if category_scheduler:
+        # Still finding new products on the last allowed pass means the budget cut the category short.
+        category_scheduler.record_visit(current_category_name, scroll_count, len(products_in_category_for_return), records_seen,
+                                        time.perf_counter() - category_started_at,
+                                        reached_budget=scroll_count >= total_scroll_limit and actual_newly_added_this_pass_count > 0)
     print(f"Finished scraping for category: {current_category_name}. Found {len(products_in_category_for_return)} new unique products this session.")
     return products_in_category_for_return
 
 
-async def scrape_alibaba_new_arrivals(url, output_dir, category_toggles, known_product_urls, storage_state_path_for_login, max_products_per_category=None, scroll_delay=5, max_scroll_no_new=3, use_proxy=False, force_login_flow=False):
+# --- START: Category Tab Helpers ---
+PRIMARY_CATEGORY_TAB_SELECTOR = "div.hugo-dotelement.tab-item"
+
+
+def category_tabs_from_names(tab_names):
+    """
+    Turns the raw text of each tab (None where it could not be read) into the category list used by the run:
+    [{"name_for_toggle", "name_on_page" (unique within the page), "original_index"}].
+    """
+    category_names_and_indices = []
+    for i, raw_name in enumerate(tab_names):
+        if raw_name is None:
+            continue
+        cat_name = raw_name.strip()
+        cat_name = re.sub(r"^\d+\s*-\s*", "", cat_name).strip()
+        cat_name = re.sub(r"\s{2,}", " ", cat_name).strip()
+
+        if cat_name:
+            base_name = cat_name
+            occurrence = 1
+            temp_check_name = cat_name
+            while any(c["name_on_page"] == temp_check_name for c in category_names_and_indices):
+                occurrence += 1
+                temp_check_name = f"{base_name}_{occurrence}"
+
+            category_names_and_indices.append({
+                "name_for_toggle": base_name,
+                "name_on_page": temp_check_name,
+                "original_index": i
+            })
+            print(f"Identified category tab: '{base_name}' (Unique ID for run: '{temp_check_name}', Original Index: {i})")
+        else:
+            print(f"Warning: Tab at original index {i} has no discernible text name. Skipping.")
+    return category_names_and_indices
+
+
+async def discover_category_tabs(page):
+    """
+    Finds the category tab strip on the new-arrivals page.
+    Returns (category_tab_selector, category_names_and_indices); the list is empty if no usable tabs were found.
+    """
+    category_tab_selector = PRIMARY_CATEGORY_TAB_SELECTOR
+    initial_category_tabs_elements = await page.query_selector_all(category_tab_selector)
+
+    if not initial_category_tabs_elements:
+        print("No category tabs found using primary selector. Trying alternative selectors...")
+        potential_tab_selectors = [
+            "div[role='tab']", "li[role='tab']", "a[role='tab']",
+            "div[class*='tab-item']", "div[class*='category-tab']",
+            ".scc-tab-item", ".rax-scrollview-horizontal > div > div"
+        ]
+        for sel in potential_tab_selectors:
+            print(f"  Trying alternative tab selector: {sel}")
+            candidate_tabs = await page.query_selector_all(sel)
+            if candidate_tabs:
+                temp_tabs = []
+                for tab_el in candidate_tabs:
+                    try:
+                        if not await tab_el.is_visible(timeout=1000): continue
+                        text_content = (await tab_el.text_content() or "").strip()
+                        if text_content and len(text_content) > 1 and len(text_content) < 50:
+                            bounding_box = await tab_el.bounding_box()
+                            if bounding_box and bounding_box['width'] > 10 and bounding_box['height'] > 5:
+                                temp_tabs.append(tab_el)
+                    except Exception: pass
+                if temp_tabs:
+                    initial_category_tabs_elements = temp_tabs
+                    print(f"Found {len(initial_category_tabs_elements)} potential tabs with selector: {sel}")
+                    category_tab_selector = sel
+                    break
+
+    if not initial_category_tabs_elements:
+        return category_tab_selector, []
+
+    print(f"Found {len(initial_category_tabs_elements)} category tabs using selector '{category_tab_selector}'.")
+    tab_names = []
+    for i, tab_element in enumerate(initial_category_tabs_elements):
+        try:
+            cat_name_candidate_element = await tab_element.query_selector(".text") or \
+                                         await tab_element.query_selector("span") or \
+                                         tab_element
+            tab_names.append(await cat_name_candidate_element.text_content() or "")
+        except Exception as e:
+            print(f"Error getting name for tab at original index {i}: {e}")
+            tab_names.append(None)
+    return category_tab_selector, category_tabs_from_names(tab_names)
+
+
+# Reads the text of every tab matched by a selector in one round trip, the way discover_category_tabs does
+# element by element. filterCandidates applies the visibility/text/size checks used for the fallback selectors.
+TAB_NAMES_SCRIPT = """
+(args) => {
+    const tabs = [...document.querySelectorAll(args.selector)].filter((tab) => {
+        if (!args.filterCandidates) return true;
+        const rect = tab.getBoundingClientRect();
+        const text = (tab.textContent || '').trim();
+        const visible = tab.checkVisibility ? tab.checkVisibility() : tab.getClientRects().length > 0;
+        return visible && text.length > 1 && text.length < 50 && rect.width > 10 && rect.height > 5;
+    });
+    return tabs.map((tab) => (tab.querySelector('.text') || tab.querySelector('span') || tab).textContent || '');
+}
+"""
+
+
+def normalize_category_name(category_name):
+    return category_name.lower().replace('&', 'and')
+
+
+def build_toggle_lookup(category_toggles):
+    """Normalised name -> toggle key for every enabled toggle, so matching a tab is one dict lookup."""
+    return {normalize_category_name(toggle_key): toggle_key for toggle_key, toggle_value in category_toggles.items() if toggle_value}
+
+
+def is_category_enabled(category_name, category_toggles, toggle_lookup=None):
+    if category_toggles.get(category_name, False):
+        return True
+    toggle_key = (toggle_lookup if toggle_lookup is not None else build_toggle_lookup(category_toggles)).get(normalize_category_name(category_name))
+    if toggle_key:
+        print(f"Matched '{category_name}' to toggle '{toggle_key}' via flexible matching.")
+        return True
+    return False
+
+
+def _toggles_fingerprint(category_toggles):
+    return sorted(toggle_key for toggle_key, toggle_value in category_toggles.items() if toggle_value)
+
+
+def load_tab_discovery_cache(cache_path, target_url):
+    """The cached discovery for target_url, or None if there is none (or it is unreadable)."""
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable tab discovery cache {cache_path}: {e}")
+        return None
+    return cache if cache.get("target_url") == target_url and cache.get("selector") else None
+
+
+def save_tab_discovery_cache(cache_path, target_url, category_tab_selector, category_names_and_indices, category_toggles, toggle_lookup):
+    cache = {
+        "target_url": target_url,
+        "selector": category_tab_selector,
+        "tabs": category_names_and_indices,
+        "enabled_toggles": _toggles_fingerprint(category_toggles),
+        "toggle_lookup": toggle_lookup,
+        "saved_at": time.time(),
+    }
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, cache_path)
+
+
+async def discover_category_tabs_cached(page, target_url, category_toggles, cache_path=None, tracer=None):
+    """
+    discover_category_tabs with a per-URL cache of the winning selector, the tab list and the normalised toggle
+    lookup. A cached selector is validated with a single evaluate that also re-reads the tab names; full
+    discovery only runs when it no longer matches any tab. Returns (category_tab_selector,
+    category_names_and_indices, toggle_lookup) and counts tab_discovery{outcome=hit|changed|miss} on the tracer.
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    cache = load_tab_discovery_cache(cache_path, target_url)
+    category_tab_selector, category_names_and_indices, outcome = None, [], "miss"
+    if cache:
+        try:
+            tab_names = await page.evaluate(TAB_NAMES_SCRIPT, {"selector": cache["selector"],
+                                                              "filterCandidates": cache["selector"] != PRIMARY_CATEGORY_TAB_SELECTOR})
+        except Exception as e:
+            print(f"Cached tab selector '{cache['selector']}' could not be checked: {e}")
+            tab_names = []
+        if tab_names:
+            category_tab_selector = cache["selector"]
+            category_names_and_indices = category_tabs_from_names(tab_names)
+            outcome = "hit" if category_names_and_indices == cache["tabs"] else "changed"
+            print(f"Tab discovery cache {outcome}: {len(category_names_and_indices)} tabs with cached selector '{category_tab_selector}'.")
+        else:
+            print(f"Cached tab selector '{cache['selector']}' matches nothing any more. Running full tab discovery...")
+    if not category_names_and_indices:
+        category_tab_selector, category_names_and_indices = await discover_category_tabs(page)
+    tracer.count("tab_discovery", outcome=outcome)
+
+    toggles_unchanged = bool(cache) and cache.get("enabled_toggles") == _toggles_fingerprint(category_toggles)
+    toggle_lookup = cache["toggle_lookup"] if toggles_unchanged else build_toggle_lookup(category_toggles)
+    if cache_path and category_names_and_indices and (outcome != "hit" or not toggles_unchanged):
+        save_tab_discovery_cache(cache_path, target_url, category_tab_selector, category_names_and_indices, category_toggles, toggle_lookup)
+    return category_tab_selector, category_names_and_indices, toggle_lookup
+
+
+async def open_category_tab(page, category_tab_selector, cat_info, is_first_category, feed_capture=None, tracer=None, readiness=None, dialog_watcher=None):
+    """
+    Clicks the tab for cat_info (unless already selected) and waits for its grid. Returns True if the category can be scraped.
+    Feed records still pending from the previous category are dropped just before the click.
+    With a ReadinessWaiter the wait ends once the grid has been replaced and the feed is quiet. With a DialogWatcher
+    nothing is probed before the click (its handlers cover it) and only one sweep runs after the grid loads.
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    current_category_name_on_page = cat_info["name_on_page"]
+    original_tab_index = cat_info["original_index"]
+
+    if not dialog_watcher:
+        with tracer.span("modal_dialogs"):
+            await handle_modal_dialogs(page)
+
+    current_tabs_on_page = await page.query_selector_all(category_tab_selector)
+    if original_tab_index >= len(current_tabs_on_page):
+        print(f"Tab for '{current_category_name_on_page}' (index {original_tab_index}) no longer found. DOM might have changed. Skipping.")
+        return False
+
+    tab_to_click = current_tabs_on_page[original_tab_index]
+    try:
+        await tab_to_click.scroll_into_view_if_needed(timeout=10000)
+        await tracer.sleep(page, random.randint(800,1500), "tab_open")
+
+        class_attr = (await tab_to_click.get_attribute("class") or "").lower()
+        aria_selected = (await tab_to_click.get_attribute("aria-selected") or "").lower()
+        is_selected_class_names = ["item-selected", "active", "current", "is-active", "is-selected", "tab-active"]
+        is_selected = any(sel_class in class_attr for sel_class in is_selected_class_names) or aria_selected == "true"
+
+        action_taken = False
+        if not (original_tab_index == 0 and is_first_category and is_selected) and not is_selected :
+            print(f"Attempting to click tab: '{current_category_name_on_page}'")
+            if feed_capture:
+                feed_capture.clear()
+            if readiness:
+                await readiness.mark()
+            await tab_to_click.click(timeout=20000, force=True)
+            print(f"Clicked '{current_category_name_on_page}'. Waiting for content to load...")
+            action_taken = True
+        elif is_selected:
+            print(f"Tab '{current_category_name_on_page}' appears to be already selected.")
+        else:
+            print(f"First tab '{current_category_name_on_page}' assumed selected or will be processed without click.")
+
+        if readiness:
+            fixed_budget_ms = random.randint(7000, 12000) if action_taken else random.randint(4000, 7000)
+            # After a click, allow up to the fixed delay plus 10s for the grid swap, as networkidle used to.
+            ready_reason, _ = await readiness.wait("tab_open", fixed_budget_ms, expect="change" if action_taken else "content",
+                                                   max_wait_ms=fixed_budget_ms + (10000 if action_taken else 0))
+            print(f"Tab content ready ({ready_reason or 'budget exhausted'}).")
+        elif action_taken:
+            print("Waiting after tab click (networkidle and fixed delay)...")
+            try:
+                await page.wait_for_load_state('networkidle', timeout=35000)
+            except PlaywrightTimeoutError:
+                print("Network idle timed out after tab click, proceeding with fixed wait.")
+            await tracer.sleep(page, random.randint(7000, 12000), "tab_open")
+        else:
+            print("Tab was pre-selected/first or did not require click. Performing a shorter wait...")
+            await tracer.sleep(page, random.randint(4000, 7000), "tab_open")
+
+        with tracer.span("modal_dialogs"):
+            await dismiss_dialogs(page, dialog_watcher)
+        return True
+
+    except PlaywrightTimeoutError as te:
+        print(f"Timeout error during tab interaction or loading for '{current_category_name_on_page}': {te}. Attempting page reload.")
+        try:
+            await page.reload(wait_until="domcontentloaded", timeout=60000)
+            await page.wait_for_timeout(random.randint(8000,12000))
+            await dismiss_dialogs(page, dialog_watcher)
+        except Exception as rle:
+            print(f"Error during reload/modal handling after tab click timeout: {rle}")
+        print(f"Skipping category '{current_category_name_on_page}' due to persistent click/load issues.")
+        return False
+    except Exception as e:
+        print(f"Non-timeout error during tab interaction for '{current_category_name_on_page}': {e}. Skipping category.")
+        return False
+
+# --- END: Category Tab Helpers ---
+
+
+# --- START: Concurrent Category Scraping ---
+# Worker pages scroll in parallel, but at most this many may be loading the page or switching tabs at once.
+MAX_PARALLEL_PAGE_LOADS = 2
+
+
+async def open_worker_page(context, url, ingestion_mode=None, tracer=None, readiness_policy=None, dialog_handling=None):
+    """
+    Opens an extra page in the shared context and loads the new-arrivals page on it.
+    Returns (page, feed_capture, readiness, dialog_watcher); readiness is None unless readiness_policy is given and
+    enabled, dialog_watcher unless dialog_handling (default DIALOG_HANDLING) is "watcher".
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    page = await new_enhanced_page(context)
+    feed_capture = FeedCapture(page).attach() if (ingestion_mode or INGESTION_MODE) == "network" else None
+    readiness = await ReadinessWaiter(page, readiness_policy, tracer).attach() if readiness_policy and readiness_policy.get("enabled") else None
+    dialog_watcher = await DialogWatcher(page, tracer).install() if (dialog_handling or DIALOG_HANDLING) == "watcher" else None
+    with tracer.span("navigation", worker_page=True):
+        await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+    if readiness:
+        await readiness.wait("initial_load", random.randint(10000, 18000))
+    else:
+        await tracer.sleep(page, random.randint(10000, 18000), "initial_load")
+    with tracer.span("modal_dialogs"):
+        await dismiss_dialogs(page, dialog_watcher)
+    return page, feed_capture, readiness, dialog_watcher
+
+
+async def scrape_categories_concurrently(context, first_page, url, category_tab_selector, enabled_categories, known_product_urls, concurrent_pages,
+                                         max_products_per_category=None, scroll_delay=5, max_scroll_no_new=3, output_dir=".", ingestion_mode=None, first_feed_capture=None,
+                                         product_writer=None, checkpoint=None, tracer=None, first_readiness=None, first_dialog_watcher=None,
+                                         category_scheduler=None):
+    """
+    Splits enabled_categories round-robin across concurrent_pages pages of one browser context.
+    first_page (already on the new-arrivals page) is reused as worker 0; the others are opened here, with the
+    readiness policy of first_readiness if one is given and a DialogWatcher if first_page has one.
+    Page loads and tab switches are bounded by MAX_PARALLEL_PAGE_LOADS; scrolling/extraction is not.
+    All workers share known_product_urls; since the dedupe check-and-add in scrape_products_from_current_page
+    has no await in between, two pages cannot both claim the same product.
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    worker_count = max(1, min(concurrent_pages, len(enabled_categories)))
+    category_slices = [enabled_categories[i::worker_count] for i in range(worker_count)]
+    page_load_slots = asyncio.Semaphore(MAX_PARALLEL_PAGE_LOADS)
+    products_by_worker = [[] for _ in range(worker_count)]
+
+    async def run_worker(worker_index, categories):
+        page, feed_capture, readiness, dialog_watcher = first_page, first_feed_capture, first_readiness, first_dialog_watcher
+        try:
+            if worker_index > 0:
+                # Stagger worker start-up so the page loads do not all hit the site at once.
+                await asyncio.sleep(worker_index * random.uniform(1.5, 3.5))
+                async with page_load_slots:
+                    page, feed_capture, readiness, dialog_watcher = await open_worker_page(
+                        context, url, ingestion_mode, tracer, first_readiness.policy if first_readiness else None,
+                        "watcher" if first_dialog_watcher else "probe")
+            for position, cat_info in enumerate(categories):
+                print(f"\n[worker {worker_index}] Processing category: '{cat_info['name_on_page']}' (Original Tab Index: {cat_info['original_index']})...")
+                async with page_load_slots:
+                    with tracer.span("tab_open", category=cat_info["name_on_page"], worker=worker_index):
+                        tab_opened = await open_category_tab(page, category_tab_selector, cat_info, worker_index == 0 and position == 0, feed_capture, tracer, readiness,
+                                                             dialog_watcher)
+                if not tab_opened:
+                    continue
+                products_from_category = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, cat_info["name_on_page"], known_product_urls, max_scroll_no_new, output_dir,
+                                                                                 feed_capture=feed_capture, product_writer=product_writer, checkpoint=checkpoint,
+                                                                                 fast_forward_passes=checkpoint.passes_completed(cat_info["name_on_page"]) if checkpoint else 0,
+                                                                                 tracer=tracer, readiness=readiness, category_scheduler=category_scheduler)
+                products_by_worker[worker_index].extend(products_from_category)
+                if checkpoint:
+                    checkpoint.mark_category_done(cat_info["name_on_page"], len(products_from_category))
+                print(f"[worker {worker_index}] '{cat_info['name_on_page']}' done: {len(products_from_category)} new products.")
+        except Exception as e:
+            print(f"[worker {worker_index}] stopped with error: {e}")
+        finally:
+            if page is not first_page:
+                if readiness:
+                    readiness.detach()
+                if dialog_watcher:
+                    print(f"[worker {worker_index}] Dialog watcher: {dialog_watcher.stats}")
+                await page.close()
+
+    started_at = time.perf_counter()
+    print(f"Scraping {len(enabled_categories)} categories with {worker_count} concurrent pages...")
+    await asyncio.gather(*(run_worker(i, category_slice) for i, category_slice in enumerate(category_slices)))
+    print(f"Concurrent category scraping finished in {time.perf_counter() - started_at:.1f}s.")
+    return [product for worker_products in products_by_worker for product in worker_products]
+
+# --- END: Concurrent Category Scraping ---
+
+
+async def run_new_arrivals_session(context, page, url, category_toggles, known_product_urls, all_new_products_this_session, request_router,
+                                   max_products_per_category=None, scroll_delay=5, max_scroll_no_new=3, abs_output_dir=".",
+                                   concurrent_pages=1, max_requests_per_host_per_second=None, ingestion_mode=None, product_writer=None,
+                                   checkpoint=None, tracer=None, readiness_policy=None, tab_discovery_cache_path=None, category_scheduler=None):
+    """
+    Page-level part of a scrape on an already prepared context/page: navigate, verify login, walk the categories.
+    New products are appended to all_new_products_this_session as each category finishes, so the caller keeps
+    partial results if this raises. readiness_policy (default READINESS_POLICY) controls the adaptive waits.
+    With tab_discovery_cache_path, the category tabs found are cached there and re-validated on the next run.
+    With a category_scheduler, enabled categories that are not due yet are skipped and the rest get its scroll budgets.
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
+    readiness_policy = readiness_policy if readiness_policy is not None else READINESS_POLICY
+    feed_capture = readiness = dialog_watcher = None
+    # Listeners and locator handlers come off again in the finally: a pooled page outlives this run, failed or not.
+    try:
+        if (ingestion_mode or INGESTION_MODE) == "network":
+            feed_capture = FeedCapture(page).attach()
+            print("Network feed capture attached; DOM extraction will be used as a fallback.")
+        readiness = await ReadinessWaiter(page, readiness_policy, tracer).attach() if readiness_policy.get("enabled") else None
+        dialog_watcher = await DialogWatcher(page, tracer).install() if DIALOG_HANDLING == "watcher" else None
+
+        print(f"Navigating to {url} with potentially logged-in context...")
+        with tracer.span("navigation"):
+            await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+        print("Page loaded. Waiting for initial dynamic content and potential modals...")
+        if readiness:
+            ready_reason, _ = await readiness.wait("initial_load", random.randint(10000, 18000))
+            print(f"Initial content ready ({ready_reason or 'budget exhausted'}).")
+        else:
+            await tracer.sleep(page, random.randint(10000, 18000), "initial_load")
+        if tracer.enabled:
+            # Lets run reports compare first paint between cold runs and runs on a warm persistent-profile cache.
+            first_paint_ms = await page.evaluate("() => { const entry = performance.getEntriesByName('first-contentful-paint')[0]; return entry ? entry.startTime : null; }")
+            if first_paint_ms is not None:
+                tracer.observe("first_contentful_paint_seconds", first_paint_ms / 1000)
+
+        # Verification step (optional, can be commented out once confirmed working)
+        print("--- VERIFYING LOGIN STATE ---")
+        login_button_selector_verify = "a:has-text('Sign In')" 
+        account_element_selector_verify = "div.tnh-ma"
+
+        with tracer.span("login_check"):
+            is_login_button_visible = await page.is_visible(login_button_selector_verify, timeout=3000)
+            is_account_element_visible = await page.is_visible(account_element_selector_verify, timeout=3000)
+
+        if is_account_element_visible and not is_login_button_visible:
+            print("VERIFICATION: Logged-in state appears CONFIRMED (account element found, Sign In button not found).")
+        elif is_login_button_visible:
+            print("VERIFICATION: Logged-out state detected (Sign In button is visible). Login might have failed or session expired.")
+        else:
+            print("VERIFICATION: Login state UNCERTAIN (neither definitive login nor logout element clearly found by simple check).")
+        print("--- END LOGIN VERIFICATION ---")
+
+        with tracer.span("modal_dialogs"):
+            await dismiss_dialogs(page, dialog_watcher)
+        await tracer.sleep(page, random.randint(1500, 3500), "initial_load")
+
+        with tracer.span("tab_discovery"):
+            category_tab_selector, category_names_and_indices, toggle_lookup = await discover_category_tabs_cached(
+                page, url, category_toggles, tab_discovery_cache_path, tracer)
+
+        if not category_names_and_indices:
+            print("No usable category tabs found. Scraping current view as 'All' category.")
+            if checkpoint and checkpoint.is_category_done("All"):
+                print("Category 'All' already finished in the checkpoint. Skipping.")
+            elif category_toggles.get("All", False) and category_scheduler and not category_scheduler.is_due("All"):
+                print(f"Category 'All' is not due for another {category_scheduler.next_due_in_hours('All'):.1f}h. Skipping.")
+            elif category_toggles.get("All", False):
+                products_from_page = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, "All", known_product_urls, max_scroll_no_new, abs_output_dir,
+                                                                             feed_capture=feed_capture, product_writer=product_writer, checkpoint=checkpoint,
+                                                                             fast_forward_passes=checkpoint.passes_completed("All") if checkpoint else 0,
+                                                                             tracer=tracer, readiness=readiness, category_scheduler=category_scheduler)
+                all_new_products_this_session.extend(products_from_page)
+                if checkpoint:
+                    checkpoint.mark_category_done("All", len(products_from_page))
+            else:
+                print("Category 'All' is not enabled in toggles. Skipping.")
+        else:
+            enabled_categories = []
+            for cat_info in category_names_and_indices:
+                if not is_category_enabled(cat_info["name_for_toggle"], category_toggles, toggle_lookup):
+                    print(f"Category '{cat_info['name_for_toggle']}' (from page: '{cat_info['name_on_page']}') is not enabled in toggles or no match found. Skipping.")
+                elif checkpoint and checkpoint.is_category_done(cat_info["name_on_page"]):
+                    print(f"Category '{cat_info['name_on_page']}' already finished in the checkpoint. Skipping.")
+                elif category_scheduler and not category_scheduler.is_due(cat_info["name_on_page"]):
+                    print(f"Category '{cat_info['name_on_page']}' is not due for another {category_scheduler.next_due_in_hours(cat_info['name_on_page']):.1f}h. Skipping.")
+                    tracer.count("categories_skipped_by_schedule")
+                else:
+                    enabled_categories.append(cat_info)
+
+            if concurrent_pages > 1 and len(enabled_categories) > 1:
+                if max_requests_per_host_per_second:
+                    request_router.rate_limiter = HostRateLimiter(max_requests_per_host_per_second)
+                    await request_router.install(context)
+                    print(f"Per-host request rate cap enabled: {max_requests_per_host_per_second} requests/second.")
+                all_new_products_this_session.extend(await scrape_categories_concurrently(
+                    context, page, url, category_tab_selector, enabled_categories, known_product_urls, concurrent_pages,
+                    max_products_per_category, scroll_delay, max_scroll_no_new, abs_output_dir, ingestion_mode, feed_capture,
+                    product_writer, checkpoint, tracer, readiness, dialog_watcher, category_scheduler
+                ))
+            else:
+                for position, cat_info in enumerate(enabled_categories):
+                    print(f"\nProcessing category: '{cat_info['name_on_page']}' (Original Tab Index: {cat_info['original_index']})...")
+                    with tracer.span("tab_open", category=cat_info["name_on_page"]):
+                        tab_opened = await open_category_tab(page, category_tab_selector, cat_info, position == 0, feed_capture, tracer, readiness, dialog_watcher)
+                    if not tab_opened:
+                        continue
+
+                    products_from_category = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, cat_info["name_on_page"], known_product_urls, max_scroll_no_new, abs_output_dir,
+                                                                                     feed_capture=feed_capture, product_writer=product_writer, checkpoint=checkpoint,
+                                                                                     fast_forward_passes=checkpoint.passes_completed(cat_info["name_on_page"]) if checkpoint else 0,
+                                                                                     tracer=tracer, readiness=readiness, category_scheduler=category_scheduler)
+                    all_new_products_this_session.extend(products_from_category)
+                    if checkpoint:
+                        checkpoint.mark_category_done(cat_info["name_on_page"], len(products_from_category))
+                    print(f"Total new unique products scraped so far this session: {len(all_new_products_this_session)}")
+
+        if checkpoint and not checkpoint.mark_run_complete():
+            print(f"Some categories did not finish; run with --resume to continue them. Checkpoint: {checkpoint.path}")
+    finally:
+        if feed_capture:
+            print(f"Network feed capture stats: {feed_capture.stats}")
+            feed_capture.detach()
+        if readiness:
+            print(f"Readiness waits: {readiness.summary()}")
+            readiness.detach()
+        if dialog_watcher:
+            print(f"Dialog watcher: {dialog_watcher.stats}")
+            await dialog_watcher.uninstall()
+
+
+async def scrape_alibaba_new_arrivals(url, output_dir, category_toggles, known_product_urls, storage_state_path_for_login, max_products_per_category=None, scroll_delay=5, max_scroll_no_new=3, use_proxy=False, force_login_flow=False,
+                                      concurrent_pages=1, max_requests_per_host_per_second=None, ingestion_mode=None, resource_blocking_policy=None,
+                                      browser_pool=None, product_writer=None, checkpoint=None, request_router=None, record_har_path=None, tracer=None,
+                                      readiness_policy=None, persistent_profile=None, tab_discovery_cache_path=None, category_scheduler=None,
+                                      save_session_state=True):
+    """
+    Runs one scrape of the new-arrivals page and returns the new products. request_router replaces the RequestRouter
+    built from resource_blocking_policy (the offline replay harness passes its own), and record_har_path records
+    the run's traffic to a HAR file (benchmarks/record_replay.py turns it into a replay snapshot).
+    A run_tracing.RunTracer, if given, collects phase spans and counters for the run report.
+    readiness_policy overrides READINESS_POLICY; {"enabled": False} restores the fixed sleeps.
+    persistent_profile (a prepared browser_profile.ManagedProfile) runs Chromium on that profile so its HTTP cache
+    carries over between runs; resources are then blocked per page over CDP, since routing would bypass the cache.
+    tab_discovery_cache_path caches the discovered category tabs between runs (see discover_category_tabs_cached).
+    category_scheduler (a category_scheduler.CategoryScheduler) skips categories that are not due and sets scroll budgets.
+    save_session_state=False skips saving the session to storage_state.json at the end (shard workers run side by side).
+    """
+    tracer = tracer or run_tracing.NULL_TRACER
     all_new_products_this_session = []
     browser = None
     context = None
     page = None
     abs_output_dir = os.path.abspath(output_dir)
 
+    if browser_pool:
+        # Warm path: the pool owns Playwright, the browser, the authenticated context and its RequestRouter.
+        try:
+            async with browser_pool.lease() as lease:
+                await run_new_arrivals_session(
+                    lease.context, lease.page, url, category_toggles, known_product_urls, all_new_products_this_session, lease.request_router,
+                    max_products_per_category, scroll_delay, max_scroll_no_new, abs_output_dir,
+                    concurrent_pages, max_requests_per_host_per_second, ingestion_mode, product_writer, checkpoint, tracer, readiness_policy,
+                    tab_discovery_cache_path, category_scheduler
+                )
+        except PlaywrightTimeoutError as pte:
+            print(f"A major Playwright timeout occurred during the scraping process: {pte}")
+        except Exception as e:
+            print(f"An critical error occurred during the overall scraping process: {e}")
+        print(f"Pooled run finished. Total new unique products scraped in this session: {len(all_new_products_this_session)}")
+        return all_new_products_this_session
+
+    blocking_policy = resource_blocking_policy if resource_blocking_policy is not None else RESOURCE_BLOCKING_POLICY
+    cache_monitor = None
+    if persistent_profile:
+        # No route-based blocking: the router is only installed if the per-host rate cap is turned on.
+        request_router = request_router or RequestRouter(None)
+        cache_monitor = browser_profile.ProfileCacheMonitor(blocking_policy.get("blocked_url_globs") if blocking_policy.get("enabled") else None, tracer)
+    elif request_router is None:
+        request_router = RequestRouter(blocking_policy)
+
     async with async_playwright() as p:
         proxy_config = None
         if use_proxy:
@@ -753,7 +2276,8 @@ async def scrape_alibaba_new_arrivals(url, output_dir, category_toggles, known_p
             else:
                 print(f"Storage state file '{storage_state_path_for_login}' not found for login.")
 
-            login_success = await perform_manual_login_and_save_state(p, abs_output_dir, storage_state_path_for_login)
+            with tracer.span("login_flow"):
+                login_success = await perform_manual_login_and_save_state(p, abs_output_dir, storage_state_path_for_login)
             if not login_success:
                 print("Manual login failed or was aborted. Exiting scraper.")
                 return []
@@ -762,196 +2286,42 @@ async def scrape_alibaba_new_arrivals(url, output_dir, category_toggles, known_p
             print(f"Found existing login state file: {storage_state_path_for_login}. Attempting to use it.")
 
         try:
-            browser, context, page, general_session_storage_path = await create_enhanced_browser_context(
-                p,
-                abs_output_dir,
-                storage_state_path=storage_state_path_for_login,
-                headless_mode=True, # Set to False for debugging logged-in state
-                proxy_config=proxy_config
+            with tracer.span("browser_start"):
+                if persistent_profile:
+                    context = await launch_persistent_enhanced_context(p, persistent_profile, load_storage_state(storage_state_path_for_login),
+                                                                       headless_mode=True, proxy_config=proxy_config)
+                    await cache_monitor.attach(context)
+                    initial_pages = list(context.pages)
+                    page = await new_enhanced_page(context)
+                    for initial_page in initial_pages:
+                        await initial_page.close()
+                    general_session_storage_path = os.path.join(abs_output_dir, "storage_state.json")
+                else:
+                    browser, context, page, general_session_storage_path = await create_enhanced_browser_context(
+                        p,
+                        abs_output_dir,
+                        storage_state_path=storage_state_path_for_login,
+                        headless_mode=True, # Set to False for debugging logged-in state
+                        proxy_config=proxy_config,
+                        request_router=request_router,
+                        record_har_path=record_har_path
+                    )
+
+            await run_new_arrivals_session(
+                context, page, url, category_toggles, known_product_urls, all_new_products_this_session, request_router,
+                max_products_per_category, scroll_delay, max_scroll_no_new, abs_output_dir,
+                concurrent_pages, max_requests_per_host_per_second, ingestion_mode, product_writer, checkpoint, tracer, readiness_policy,
+                tab_discovery_cache_path, category_scheduler
             )
 
-            print(f"Navigating to {url} with potentially logged-in context...")
-            await page.goto(url, wait_until="domcontentloaded", timeout=90000)
-            print("Page loaded. Waiting for initial dynamic content and potential modals...")
-            await page.wait_for_timeout(random.randint(10000, 18000))
-            
-            # Verification step (optional, can be commented out once confirmed working)
-            print("--- VERIFYING LOGIN STATE ---")
-            login_button_selector_verify = "a:has-text('Sign In')" 
-            account_element_selector_verify = "div.tnh-ma"
-
-            is_login_button_visible = await page.is_visible(login_button_selector_verify, timeout=3000)
-            is_account_element_visible = await page.is_visible(account_element_selector_verify, timeout=3000)
+            if request_router.installed:
+                print(f"Request router: {request_router.summary()}")
+                if persistent_profile:
+                    print("Note: the per-host rate cap routed requests, which bypasses the profile's HTTP cache for this run.")
+            if cache_monitor:
+                print(f"Persistent profile '{persistent_profile.name}': {cache_monitor.summary()}")
 
-            if is_account_element_visible and not is_login_button_visible:
-                print("VERIFICATION: Logged-in state appears CONFIRMED (account element found, Sign In button not found).")
-            elif is_login_button_visible:
-                print("VERIFICATION: Logged-out state detected (Sign In button is visible). Login might have failed or session expired.")
-            else:
-                print("VERIFICATION: Login state UNCERTAIN (neither definitive login nor logout element clearly found by simple check).")
-            print("--- END LOGIN VERIFICATION ---")
-
-            await handle_modal_dialogs(page)
-            await page.wait_for_timeout(random.randint(1500, 3500))
-
-            category_tab_selector = "div.hugo-dotelement.tab-item"
-            initial_category_tabs_elements = await page.query_selector_all(category_tab_selector)
-
-            if not initial_category_tabs_elements:
-                print("No category tabs found using primary selector. Trying alternative selectors...")
-                potential_tab_selectors = [
-                    "div[role='tab']", "li[role='tab']", "a[role='tab']",
-                    "div[class*='tab-item']", "div[class*='category-tab']",
-                    ".scc-tab-item", ".rax-scrollview-horizontal > div > div"
-                ]
-                for sel in potential_tab_selectors:
-                    print(f"  Trying alternative tab selector: {sel}")
-                    candidate_tabs = await page.query_selector_all(sel)
-                    if candidate_tabs:
-                        temp_tabs = []
-                        for tab_el in candidate_tabs:
-                            try:
-                                if not await tab_el.is_visible(timeout=1000): continue
-                                text_content = (await tab_el.text_content() or "").strip()
-                                if text_content and len(text_content) > 1 and len(text_content) < 50:
-                                    bounding_box = await tab_el.bounding_box()
-                                    if bounding_box and bounding_box['width'] > 10 and bounding_box['height'] > 5:
-                                        temp_tabs.append(tab_el)
-                            except Exception: pass
-                        if temp_tabs:
-                            initial_category_tabs_elements = temp_tabs
-                            print(f"Found {len(initial_category_tabs_elements)} potential tabs with selector: {sel}")
-                            category_tab_selector = sel
-                            break
-
-            if not initial_category_tabs_elements:
-                print("Still no category tabs found after trying alternatives. Scraping current view as 'All' category.")
-                if category_toggles.get("All", False):
-                    products_from_page = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, "All", known_product_urls, max_scroll_no_new, abs_output_dir)
-                    all_new_products_this_session.extend(products_from_page)
-                else:
-                    print("Category 'All' is not enabled in toggles. Skipping.")
-            else:
-                print(f"Found {len(initial_category_tabs_elements)} category tabs using selector '{category_tab_selector}'.")
-                category_names_and_indices = []
-                for i, tab_element in enumerate(initial_category_tabs_elements):
-                    try:
-                        cat_name_candidate_element = await tab_element.query_selector(".text") or \
-                                                     await tab_element.query_selector("span") or \
-                                                     tab_element
-                        cat_name = (await cat_name_candidate_element.text_content() or "").strip()
-                        cat_name = re.sub(r"^\d+\s*-\s*", "", cat_name).strip()
-                        cat_name = re.sub(r"\s{2,}", " ", cat_name).strip()
-
-                        if cat_name:
-                            base_name = cat_name
-                            occurrence = 1
-                            temp_check_name = cat_name
-                            while any(c["name_on_page"] == temp_check_name for c in category_names_and_indices):
-                                occurrence += 1
-                                temp_check_name = f"{base_name}_{occurrence}"
-
-                            category_names_and_indices.append({
-                                "name_for_toggle": base_name,
-                                "name_on_page": temp_check_name,
-                                "original_index": i
-                            })
-                            print(f"Identified category tab: '{base_name}' (Unique ID for run: '{temp_check_name}', Original Index: {i})")
-                        else:
-                            print(f"Warning: Tab at original index {i} has no discernible text name. Skipping.")
-                    except Exception as e:
-                        print(f"Error getting name for tab at original index {i}: {e}")
-
-                if not category_names_and_indices:
-                        print("No valid category names extracted from tabs. Scraping current view as 'All' if enabled.")
-                        if category_toggles.get("All", False):
-                            products_from_page = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, "All", known_product_urls, max_scroll_no_new, abs_output_dir)
-                            all_new_products_this_session.extend(products_from_page)
-                        else:
-                            print("Category 'All' is not enabled in toggles. Skipping.")
-                else:
-                    first_category_processed = False
-                    for cat_info in category_names_and_indices:
-                        current_category_name_for_toggle = cat_info["name_for_toggle"]
-                        current_category_name_on_page = cat_info["name_on_page"]
-                        original_tab_index = cat_info["original_index"]
-
-                        is_enabled = category_toggles.get(current_category_name_for_toggle, False)
-                        if not is_enabled:
-                            for toggle_key, toggle_value in category_toggles.items():
-                                if toggle_value and toggle_key.lower().replace('&', 'and') == current_category_name_for_toggle.lower().replace('&', 'and'):
-                                    is_enabled = True
-                                    print(f"Matched '{current_category_name_for_toggle}' to toggle '{toggle_key}' via flexible matching.")
-                                    break
-
-                        if not is_enabled:
-                            print(f"Category '{current_category_name_for_toggle}' (from page: '{current_category_name_on_page}') is not enabled in toggles or no match found. Skipping.")
-                            continue
-
-                        print(f"\nProcessing category: '{current_category_name_on_page}' (Original Tab Index: {original_tab_index})...")
-
-                        await handle_modal_dialogs(page)
-
-                        current_tabs_on_page = await page.query_selector_all(category_tab_selector)
-                        if original_tab_index >= len(current_tabs_on_page):
-                            print(f"Tab for '{current_category_name_on_page}' (index {original_tab_index}) no longer found. DOM might have changed. Skipping.")
-                            continue
-
-                        tab_to_click = current_tabs_on_page[original_tab_index]
-                        try:
-                            await tab_to_click.scroll_into_view_if_needed(timeout=10000)
-                            await page.wait_for_timeout(random.randint(800,1500))
-
-                            class_attr = (await tab_to_click.get_attribute("class") or "").lower()
-                            aria_selected = (await tab_to_click.get_attribute("aria-selected") or "").lower()
-                            is_selected_class_names = ["item-selected", "active", "current", "is-active", "is-selected", "tab-active"]
-                            is_selected = any(sel_class in class_attr for sel_class in is_selected_class_names) or aria_selected == "true"
-
-                            action_taken = False
-                            if not (original_tab_index == 0 and not first_category_processed and is_selected) and not is_selected :
-                                print(f"Attempting to click tab: '{current_category_name_on_page}'")
-                                await tab_to_click.click(timeout=20000, force=True)
-                                print(f"Clicked '{current_category_name_on_page}'. Waiting for content to load...")
-                                action_taken = True
-                            elif is_selected:
-                                print(f"Tab '{current_category_name_on_page}' appears to be already selected.")
-                            else:
-                                print(f"First tab '{current_category_name_on_page}' assumed selected or will be processed without click.")
-
-                            first_category_processed = True
-
-                            if action_taken:
-                                print("Waiting after tab click (networkidle and fixed delay)...")
-                                try:
-                                    await page.wait_for_load_state('networkidle', timeout=35000)
-                                except PlaywrightTimeoutError:
-                                    print("Network idle timed out after tab click, proceeding with fixed wait.")
-                                await page.wait_for_timeout(random.randint(7000, 12000))
-                            else:
-                                print("Tab was pre-selected/first or did not require click. Performing a shorter wait...")
-                                await page.wait_for_timeout(random.randint(4000, 7000))
-
-                            await handle_modal_dialogs(page)
-
-                        except PlaywrightTimeoutError as te:
-                            print(f"Timeout error during tab interaction or loading for '{current_category_name_on_page}': {te}. Attempting page reload.")
-                            try:
-                                await page.reload(wait_until="domcontentloaded", timeout=60000)
-                                await page.wait_for_timeout(random.randint(8000,12000))
-                                await handle_modal_dialogs(page)
-                            except Exception as rle:
-                                print(f"Error during reload/modal handling after tab click timeout: {rle}")
-                            print(f"Skipping category '{current_category_name_on_page}' due to persistent click/load issues.")
-                            continue
-                        except Exception as e:
-                            print(f"Non-timeout error during tab interaction for '{current_category_name_on_page}': {e}. Skipping category.")
-                            continue
-
-                        products_from_category = await scrape_products_from_current_page(page, scroll_delay, max_products_per_category, current_category_name_on_page, known_product_urls, max_scroll_no_new, abs_output_dir)
-                        all_new_products_this_session.extend(products_from_category)
-                        print(f"Total new unique products scraped so far this session: {len(all_new_products_this_session)}")
-
-            if context and general_session_storage_path:
+            if save_session_state and context and general_session_storage_path:
                 print(f"Attempting to save general browser session state to {general_session_storage_path}")
                 try:
                     await context.storage_state(path=general_session_storage_path)
@@ -965,6 +2335,10 @@ async def scrape_alibaba_new_arrivals(url, output_dir, category_toggles, known_p
             print(f"An critical error occurred during the overall scraping process: {e}")
 
         finally:
+            if (record_har_path or persistent_profile) and context:
+                # The HAR file is only written when its context closes; browser.close() alone would drop it.
+                # A persistent-profile context has no browser object: closing it shuts Chromium down.
+                await context.close()
             if browser and browser.is_connected():
                 print("Closing browser...")
                 await browser.close()
@@ -1044,21 +2418,34 @@ CATEGORY_TOGGLES = {
 }
 # --- END: Category Configuration ---
 
-async def main():
-    target_url = "https://sale.alibaba.com/p/db971rh77/index.html"
+# --- START: Output Configuration ---
+TARGET_URL = "https://sale.alibaba.com/p/db971rh77/index.html"
+OUTPUT_DIRECTORY = r"C:\Users\zdoes\Downloads\alibaba_explorer" # !!! ENSURE THIS PATH IS CORRECT FOR YOUR SYSTEM !!!
+JSON_OUTPUT_FILENAME = "scraped_alibaba_new_arrivals_enhanced.json" # Legacy JSON-array archive (read-only)
+JSONL_OUTPUT_FILENAME = "scraped_alibaba_new_arrivals_enhanced.jsonl" # Append-only output, one product per line
+AUTH_STORAGE_STATE_FILENAME = "alibaba_auth_state.json"
+CHECKPOINT_FILENAME = "scrape_checkpoint.json"
+TAB_DISCOVERY_CACHE_FILENAME = "category_tab_cache.json" # Last working tab selector and tab list, per target URL
+KNOWN_PRODUCT_INDEX_FILENAME = "known_products_index.sqlite" # Product-ID index used for dedupe instead of re-reading the outputs
+RUN_REPORTS_DIRNAME = "run_reports" # One JSON run report (phase spans, counters, histograms) per run
+METRICS_FILENAME = "scraper_metrics.prom" # Prometheus text-format metrics of the latest run
+BROWSER_PROFILES_DIRNAME = "browser_profiles" # Managed Chromium user-data dirs for --persistent-profile runs
+CATEGORY_SCHEDULE_FILENAME = "category_schedule.json" # Per-category visit history, refresh intervals and scroll budgets
+# --- END: Output Configuration ---
+
+async def main(browser_pool=None, resume=False, persistent_profile_name=None, ignore_schedule=False):
+    target_url = TARGET_URL
 
-    OUTPUT_DIRECTORY = r"C:\Users\zdoes\Downloads\alibaba_explorer" # !!! ENSURE THIS PATH IS CORRECT FOR YOUR SYSTEM !!!
     abs_output_dir = os.path.abspath(OUTPUT_DIRECTORY)
 
-    json_output_filename = "scraped_alibaba_new_arrivals_enhanced.json"
+    # Legacy JSON-array archive: read for dedupe, never rewritten. New products are appended to the JSONL file.
+    json_output_filename = JSON_OUTPUT_FILENAME
     json_output_path = os.path.join(abs_output_dir, json_output_filename)
+    jsonl_output_path = os.path.join(abs_output_dir, JSONL_OUTPUT_FILENAME)
 
-    auth_storage_state_filename = "alibaba_auth_state.json"
+    auth_storage_state_filename = AUTH_STORAGE_STATE_FILENAME
     auth_storage_state_path = os.path.join(abs_output_dir, auth_storage_state_filename)
 
-    existing_products = []
-    known_product_urls = set()
-
     if not os.path.exists(abs_output_dir):
         try:
             os.makedirs(abs_output_dir)
@@ -1068,20 +2455,15 @@ async def main():
             print("Please ensure the path is correct and you have permissions, or change OUTPUT_DIRECTORY in the script.")
             return
 
-    if os.path.exists(json_output_path):
-        try:
-            with open(json_output_path, "r", encoding="utf-8") as f:
-                existing_products = json.load(f)
-                for product in existing_products:
-                    if isinstance(product, dict) and "product_url" in product and product["product_url"]:
-                        known_product_urls.add(product["product_url"])
-                print(f"Loaded {len(existing_products)} products from {json_output_path}. Found {len(known_product_urls)} unique existing product URLs.")
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from {json_output_path}. Will start with an empty list and overwrite if new data is scraped.")
-            existing_products = []
-            known_product_urls = set()
-    else:
-        print(f"Output file {json_output_path} does not exist. Will create a new one.")
+    # Seeded from the output files on first use only; afterwards the scraper keeps it current as it adds products.
+    # Committed on every add so an interrupted run never forgets products it already appended to the JSONL file.
+    known_product_index_path = os.path.join(abs_output_dir, KNOWN_PRODUCT_INDEX_FILENAME)
+    try:
+        known_product_urls = product_index.open_known_product_index(known_product_index_path, [json_output_path, jsonl_output_path], commit_every=1)
+    except json.JSONDecodeError:
+        print(f"Error decoding JSON from {json_output_path}. The index will be rebuilt on the next run; the file will not be modified.")
+        known_product_urls = product_index.KnownProductIndex(known_product_index_path).open()
+    print(f"Known-product index {known_product_index_path} holds {len(known_product_urls)} products.")
 
     print(f"Starting multi-category scraper with enhanced context for {target_url}")
     print(f"Output files will be saved to: {abs_output_dir}")
@@ -1091,6 +2473,7 @@ async def main():
     selected_categories_to_scrape = [cat for cat, is_selected in CATEGORY_TOGGLES.items() if is_selected]
     if not selected_categories_to_scrape:
         print("No categories are currently selected in CATEGORY_TOGGLES. Please enable at least one.")
+        known_product_urls.close()
         return
     else:
         print(f"Will attempt to scrape the following categories if found on page: {', '.join(selected_categories_to_scrape)}")
@@ -1099,47 +2482,92 @@ async def main():
     FORCE_RELOGIN = False
     # FORCE_RELOGIN = True # Uncomment to force login flow
 
-    scraped_data_current_session = await scrape_alibaba_new_arrivals(
-        url=target_url,
-        output_dir=abs_output_dir,
-        category_toggles=CATEGORY_TOGGLES,
-        known_product_urls=known_product_urls,
-        storage_state_path_for_login=auth_storage_state_path,
-        max_products_per_category=None, 
-        scroll_delay=random.randint(6, 9),
-        max_scroll_no_new=2,
-        use_proxy=False,
-        force_login_flow=FORCE_RELOGIN
-    )
+    # Tracks finished categories and scroll passes so an interrupted run can continue with --resume.
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(os.path.join(abs_output_dir, CHECKPOINT_FILENAME), target_url, resume)
+
+    CONCURRENT_PAGES = 1 # Set >1 to scrape enabled categories on several pages of one browser context at once
+    MAX_REQUESTS_PER_HOST_PER_SECOND = 6 # Politeness cap shared by all pages; only applied when CONCURRENT_PAGES > 1
+
+    tracer = run_tracing.RunTracer()
+
+    # Enabled categories are only scraped when due; busy ones get short refresh intervals and deep scroll budgets.
+    schedule = None if ignore_schedule else category_scheduler.CategoryScheduler.load(os.path.join(abs_output_dir, CATEGORY_SCHEDULE_FILENAME), target_url)
+
+    # A persistent profile keeps Chromium's HTTP cache between runs; profiles unused for two weeks are deleted.
+    persistent_profile = None
+    if persistent_profile_name and not browser_pool:
+        profiles_dir = os.path.join(abs_output_dir, BROWSER_PROFILES_DIRNAME)
+        persistent_profile = browser_profile.ManagedProfile(profiles_dir, persistent_profile_name).prepare()
+        removed_profiles = browser_profile.cleanup_profiles(profiles_dir, keep=[persistent_profile_name])
+        if removed_profiles:
+            print(f"Removed unused browser profiles: {', '.join(removed_profiles)}")
+
+    # Each product is appended (and periodically fsynced) as soon as it is scraped.
+    with known_product_urls, product_store.JsonlProductWriter(jsonl_output_path) as product_writer, tracer.counting_protocol_calls():
+        scraped_data_current_session = await scrape_alibaba_new_arrivals(
+            url=target_url,
+            output_dir=abs_output_dir,
+            category_toggles=CATEGORY_TOGGLES,
+            known_product_urls=known_product_urls,
+            storage_state_path_for_login=auth_storage_state_path,
+            max_products_per_category=None, 
+            scroll_delay=random.randint(6, 9),
+            max_scroll_no_new=2,
+            use_proxy=False,
+            force_login_flow=FORCE_RELOGIN,
+            concurrent_pages=CONCURRENT_PAGES,
+            max_requests_per_host_per_second=MAX_REQUESTS_PER_HOST_PER_SECOND,
+            browser_pool=browser_pool,
+            product_writer=product_writer,
+            checkpoint=checkpoint,
+            tracer=tracer,
+            persistent_profile=persistent_profile,
+            tab_discovery_cache_path=os.path.join(abs_output_dir, TAB_DISCOVERY_CACHE_FILENAME),
+            category_scheduler=schedule
+        )
+
+    tracer.count("products_new_in_run", len(scraped_data_current_session))
+    readiness_totals = {name: round(tracer.counter_total(f"readiness_{name}"), 2) for name in ("wait_seconds", "fixed_budget_seconds", "time_saved_seconds")}
+    schedule_summary = schedule.summary() if schedule else None
+    cache_hit_ratio = None
+    if tracer.counter_total("http_responses"):
+        cache_hit_ratio = tracer.counters.get(("http_responses", (("cache", "hit"),)), 0) / tracer.counter_total("http_responses")
+    report_path = tracer.write_report(os.path.join(abs_output_dir, RUN_REPORTS_DIRNAME), target_url=target_url,
+                                      new_products=len(scraped_data_current_session), concurrent_pages=CONCURRENT_PAGES,
+                                      readiness=readiness_totals, persistent_profile=persistent_profile.name if persistent_profile else None,
+                                      cache_hit_ratio=cache_hit_ratio, category_schedule=schedule_summary)
+    tracer.write_prometheus(os.path.join(abs_output_dir, METRICS_FILENAME))
+    print(f"Run report written to {report_path}")
+    for phase, totals in sorted(tracer.phase_totals().items(), key=lambda item: -item[1]["total_s"]):
+        print(f"  {phase:<15} {totals['count']:>5} spans {totals['total_s']:>9.1f}s  protocol calls: {totals['protocol_calls']}")
+    if readiness_totals["fixed_budget_seconds"]:
+        print(f"Readiness waits took {readiness_totals['wait_seconds']:.1f}s against a fixed-sleep budget of "
+              f"{readiness_totals['fixed_budget_seconds']:.1f}s ({readiness_totals['time_saved_seconds']:.1f}s saved).")
+    if schedule_summary and schedule_summary["skipped"]:
+        print(f"Schedule skipped {len(schedule_summary['skipped'])} categories not yet due "
+              f"(about {schedule_summary['estimated_seconds_saved']:.0f}s of browser time saved): {', '.join(schedule_summary['skipped'])}")
 
     if scraped_data_current_session:
         print(f"\nSuccessfully scraped {len(scraped_data_current_session)} new unique products in this session.")
-        final_product_list = existing_products + scraped_data_current_session
-        try:
-            with open(json_output_path, "w", encoding="utf-8") as f:
-                json.dump(final_product_list, f, indent=2, ensure_ascii=False)
-            print(f"Combined data (total {len(final_product_list)} products) saved to {json_output_path}")
-
-            print(f"\n--- Summary of first 3 newly scraped products this session (if available) ---")
-            for i, product in enumerate(scraped_data_current_session[:3]):
-                print(f"--- New Product {i+1} (Category: {product.get('alibaba_category', 'N/A')}) ---")
-                print(f"  Name: {product.get('name', 'N/A')}")
-                print(f"  URL: {product.get('product_url', 'N/A')}")
-                print(f"  Price: {product.get('price', 'N/A')}")
-                print(f"  Image: {product.get('image_url', 'N/A')}")
-                print("---------------------")
-        except Exception as e:
-            print(f"Error writing to JSON file: {e}")
-    elif not scraped_data_current_session and existing_products:
-         print("\nNo new unique products were scraped in this session.")
-         try:
-            with open(json_output_path, "w", encoding="utf-8") as f:
-                json.dump(existing_products, f, indent=2, ensure_ascii=False)
-            print(f"Existing data (total {len(existing_products)} products) re-saved to {json_output_path} as no new products were found.")
-         except Exception as e:
-            print(f"Error re-writing existing data to JSON file: {e}")
+        print(f"{product_writer.written_count} products appended to {jsonl_output_path}")
+
+        print(f"\n--- Summary of first 3 newly scraped products this session (if available) ---")
+        for i, product in enumerate(scraped_data_current_session[:3]):
+            print(f"--- New Product {i+1} (Category: {product.get('alibaba_category', 'N/A')}) ---")
+            print(f"  Name: {product.get('name', 'N/A')}")
+            print(f"  URL: {product.get('product_url', 'N/A')}")
+            print(f"  Price: {product.get('price', 'N/A')}")
+            print(f"  Image: {product.get('image_url', 'N/A')}")
+            print("---------------------")
     else:
-        print("No products were scraped in this session, and no existing products were loaded.")
+        print("\nNo new unique products were scraped in this session. Output files were left untouched.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape Alibaba New Arrivals into the JSONL output file.")
+    parser.add_argument("--resume", action="store_true", help=f"Continue an interrupted run from {CHECKPOINT_FILENAME}, skipping finished categories.")
+    parser.add_argument("--persistent-profile", metavar="NAME", nargs="?", const="default",
+                        help=f"Run Chromium on a persistent profile under {BROWSER_PROFILES_DIRNAME}/ so its HTTP cache is reused across runs.")
+    parser.add_argument("--all-categories", action="store_true",
+                        help=f"Scrape every enabled category with the full scroll budget, ignoring {CATEGORY_SCHEDULE_FILENAME}.")
+    args = parser.parse_args()
+    asyncio.run(main(resume=args.resume, persistent_profile_name=args.persistent_profile, ignore_schedule=args.all_categories))
\ No newline at end of file
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded scraping. The coordinator splits the enabled categories (for one or more target URLs)
+into shards, runs each shard's scrape_alibaba_new_arrivals in its own worker process (own event loop, own
+Chromium), and merges what the workers stream back over a queue into the one JSONL output, deduping across
+shards against the known-product index.
+
+Workers only read the known-product index; the coordinator is its single writer. Each shard keeps its own
+checkpoint (scrape_checkpoint_shard_<n>_<job>.json) and run report (named after the shard), so --resume works per shard as long as the
+worker count and toggles are unchanged.
+
+Usage: python shard_coordinator.py --workers 8 [--target-url URL ...] [--resume]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import product_index
+import product_store
+import product_urls
+import run_tracing
+import scrape_checkpoint
+import scraper
+
+# Per worker, and only applied with --concurrent-pages > 1. Every worker is a separate client to the site,
+# so keep --workers within what the site tolerates.
+MAX_REQUESTS_PER_HOST_PER_SECOND = 6
+
+
+def normalize_toggle_name(category_name):
+    return category_name.lower().replace("&", "and").strip()
+
+
+def enabled_category_groups(category_toggles):
+    """Enabled toggle names grouped by normalised name, so '&' and 'and' aliases of a tab stay in one shard."""
+    groups = {}
+    for category_name, is_enabled in category_toggles.items():
+        if is_enabled:
+            groups.setdefault(normalize_toggle_name(category_name), []).append(category_name)
+    return [groups[key] for key in sorted(groups)]
+
+
+def plan_shards(target_urls, category_toggles, worker_count):
+    """
+    Returns up to worker_count shards; each is a list of (target_url, toggles) jobs with only the shard's
+    categories enabled. (url, category group) pairs are dealt round-robin, so the plan is deterministic.
+    """
+    jobs = [(url, group) for url in target_urls for group in enabled_category_groups(category_toggles)]
+    shard_count = max(1, min(worker_count, len(jobs)))
+    shards = []
+    for shard_jobs in (jobs[i::shard_count] for i in range(shard_count)):
+        toggles_by_url = {}
+        for url, group in shard_jobs:
+            toggles = toggles_by_url.setdefault(url, {name: False for name in category_toggles})
+            toggles.update({name: True for name in group})
+        shards.append(list(toggles_by_url.items()))
+    return shards
+
+
+class QueueProductWriter:
+    """product_writer for scrape_alibaba_new_arrivals that streams each product to the coordinator."""
+
+    def __init__(self, result_queue, shard_id):
+        self.result_queue = result_queue
+        self.shard_id = shard_id
+        self.written_count = 0
+
+    def write(self, product):
+        self.result_queue.put(("product", self.shard_id, product))
+        self.written_count += 1
+
+
+class ShardKnownProducts:
+    """Known-product lookups for a worker: the shared index (read-only) plus what this shard found itself."""
+
+    def __init__(self, index_path):
+        self.index = product_index.KnownProductIndex(index_path, read_only=True).open() if os.path.exists(index_path) else None
+        self._dedupe_keys_found = set()
+
+    def __contains__(self, product_url):
+        if product_urls.product_dedupe_key(product_url) in self._dedupe_keys_found:
+            return True
+        return self.index is not None and product_url in self.index
+
+    def add(self, product_url):
+        self._dedupe_keys_found.add(product_urls.product_dedupe_key(product_url))
+
+    def __len__(self):
+        return (len(self.index) if self.index is not None else 0) + len(self._dedupe_keys_found)
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+
+
+def run_shard_worker(shard_id, jobs, result_queue, abs_output_dir, resume, concurrent_pages):
+    """Worker process entry point: scrapes each (target_url, toggles) job of the shard and reports back."""
+    try:
+        asyncio.run(_scrape_shard(shard_id, jobs, result_queue, abs_output_dir, resume, concurrent_pages))
+    except Exception as e:
+        result_queue.put(("error", shard_id, str(e)))
+
+
+async def _scrape_shard(shard_id, jobs, result_queue, abs_output_dir, resume, concurrent_pages):
+    known_products = ShardKnownProducts(os.path.join(abs_output_dir, scraper.KNOWN_PRODUCT_INDEX_FILENAME))
+    product_writer = QueueProductWriter(result_queue, shard_id)
+    tracer = run_tracing.RunTracer(run_name=f"new_arrivals_shard_{shard_id}")
+    started_at = time.perf_counter()
+    try:
+        with tracer.counting_protocol_calls():
+            for job_index, (target_url, category_toggles) in enumerate(jobs):
+                checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(
+                    os.path.join(abs_output_dir, f"scrape_checkpoint_shard_{shard_id}_{job_index}.json"), target_url, resume)
+                await scraper.scrape_alibaba_new_arrivals(
+                    url=target_url,
+                    output_dir=abs_output_dir,
+                    category_toggles=category_toggles,
+                    known_product_urls=known_products,
+                    storage_state_path_for_login=os.path.join(abs_output_dir, scraper.AUTH_STORAGE_STATE_FILENAME),
+                    scroll_delay=random.randint(6, 9),
+                    max_scroll_no_new=2,
+                    concurrent_pages=concurrent_pages,
+                    max_requests_per_host_per_second=MAX_REQUESTS_PER_HOST_PER_SECOND,
+                    product_writer=product_writer,
+                    checkpoint=checkpoint,
+                    tracer=tracer,
+                    save_session_state=False # Every worker would rewrite the same storage_state.json at once
+                )
+        tracer.write_report(os.path.join(abs_output_dir, scraper.RUN_REPORTS_DIRNAME), shard_id=shard_id,
+                            jobs=[{"target_url": url, "categories": [name for name, on in toggles.items() if on]} for url, toggles in jobs])
+    finally:
+        known_products.close()
+    result_queue.put(("done", shard_id, {"products": product_writer.written_count, "seconds": time.perf_counter() - started_at}))
+
+
+def run_sharded_scrape(target_urls, category_toggles, worker_count, abs_output_dir, resume=False, concurrent_pages=1):
+    """Runs the shards in worker processes and merges their products into the JSONL output. Returns the stats."""
+    auth_storage_state_path = os.path.join(abs_output_dir, scraper.AUTH_STORAGE_STATE_FILENAME)
+    if not os.path.exists(auth_storage_state_path):
+        # Workers are headless and cannot run the interactive login flow.
+        print(f"No login state at {auth_storage_state_path}. Run scraper.py once to log in before sharding.")
+        return None
+
+    shards = plan_shards(target_urls, category_toggles, worker_count)
+    for shard_id, jobs in enumerate(shards):
+        print(f"Shard {shard_id}: " + "; ".join(f"{url} -> {[name for name, on in toggles.items() if on]}" for url, toggles in jobs))
+
+    # The coordinator owns the index: seed it before the workers open it read-only.
+    known_index = product_index.open_known_product_index(
+        os.path.join(abs_output_dir, scraper.KNOWN_PRODUCT_INDEX_FILENAME),
+        [os.path.join(abs_output_dir, scraper.JSON_OUTPUT_FILENAME), os.path.join(abs_output_dir, scraper.JSONL_OUTPUT_FILENAME)],
+        commit_every=1)
+
+    # spawn, not fork: each worker starts its own Playwright driver and must not inherit the parent's state.
+    mp_context = multiprocessing.get_context("spawn")
+    result_queue = mp_context.Queue()
+    workers = {}
+    for shard_id, jobs in enumerate(shards):
+        worker = mp_context.Process(target=run_shard_worker, name=f"scrape-shard-{shard_id}",
+                                    args=(shard_id, jobs, result_queue, abs_output_dir, resume, concurrent_pages))
+        worker.start()
+        workers[shard_id] = worker
+
+    stats = {"shards": len(shards), "products_received": 0, "products_written": 0, "cross_shard_duplicates": 0,
+             "by_shard": {shard_id: {"status": "running", "products": 0} for shard_id in workers}}
+    started_at = time.perf_counter()
+    pending_shards = set(workers)
+    with known_index, product_store.JsonlProductWriter(os.path.join(abs_output_dir, scraper.JSONL_OUTPUT_FILENAME)) as product_writer:
+        while pending_shards:
+            try:
+                message_type, shard_id, payload = result_queue.get(timeout=1)
+            except queue.Empty:
+                for shard_id in list(pending_shards):
+                    if not workers[shard_id].is_alive() and result_queue.empty():
+                        print(f"Shard {shard_id} exited (code {workers[shard_id].exitcode}) without reporting back.")
+                        stats["by_shard"][shard_id]["status"] = "died"
+                        pending_shards.discard(shard_id)
+                continue
+
+            if message_type == "product":
+                stats["products_received"] += 1
+                stats["by_shard"][shard_id]["products"] += 1
+                if payload["product_url"] in known_index:
+                    stats["cross_shard_duplicates"] += 1
+                    continue
+                known_index.add(payload["product_url"])
+                product_writer.write(payload)
+                stats["products_written"] += 1
+            else:
+                stats["by_shard"][shard_id]["status"] = "done" if message_type == "done" else f"error: {payload}"
+                pending_shards.discard(shard_id)
+
+    for worker in workers.values():
+        worker.join()
+    stats["seconds"] = time.perf_counter() - started_at
+    stats["products_per_second"] = stats["products_written"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--target-url", action="append", dest="target_urls", help="Repeat for several pages (default: scraper.TARGET_URL).")
+    parser.add_argument("--concurrent-pages", type=int, default=1, help="Pages per worker browser.")
+    parser.add_argument("--resume", action="store_true")
+    args = parser.parse_args()
+
+    sharded_stats = run_sharded_scrape(args.target_urls or [scraper.TARGET_URL], scraper.CATEGORY_TOGGLES, args.workers,
+                                       os.path.abspath(scraper.OUTPUT_DIRECTORY), args.resume, args.concurrent_pages)
+    if sharded_stats:
+        print(f"\nSharded run: {sharded_stats['products_written']} new products written "
+              f"({sharded_stats['cross_shard_duplicates']} cross-shard duplicates dropped) from {sharded_stats['shards']} shards "
+              f"in {sharded_stats['seconds']:.1f}s ({sharded_stats['products_per_second']:.2f} products/s).")
+        for shard_id, shard_stats in sharded_stats["by_shard"].items():
+            print(f"  shard {shard_id}: {shard_stats['status']}, {shard_stats['products']} products")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Browserless product extraction from saved HTML pages (diagnose_page_version dumps or any page.content()
+snapshot). The container/link/image/name/price lookups mirror scraper.BATCHED_EXTRACTION_SCRIPT and the raw
+records go through the same scraper.build_product_record cleaning, so a snapshot yields the records the live
+DOM extraction would have produced from that page. Directories of snapshots are parsed in a process pool.
+
+The page URL (for relative links) comes from <snapshot>_metrics.json when diagnose_page_version wrote one,
+otherwise from --page-url; the category name is --category or the snapshot's file name.
+
+Usage: python snapshot_parser.py SNAPSHOT_DIR_OR_FILE [...] [--workers N] [--category NAME] [--page-url URL]
+                                 [--out products.jsonl]
+Needs lxml and cssselect (in requirements.txt).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+import product_store
+import product_urls
+import scraper
+
+SNAPSHOT_EXTENSIONS = (".html", ".htm")
+
+
+def _compile(selectors):
+    return [CSSSelector(selector, translator="html") for selector in selectors]
+
+
+CONTAINER_SELECTOR = CSSSelector(scraper.PRODUCT_CONTAINER_SELECTOR, translator="html")
+LINK_SELECTORS = _compile(scraper.PRODUCT_LINK_SELECTORS)
+IMAGE_SELECTOR = CSSSelector(scraper.PRODUCT_IMAGE_SELECTOR, translator="html")
+NAME_SELECTORS = _compile(scraper.NAME_SELECTORS_RELATIVE)
+PRICE_SELECTORS = _compile(scraper.PRICE_SELECTORS_RELATIVE)
+PRICE_SYMBOLS = "$€£¥"
+
+
+def _first(selector, element):
+    """querySelector: the first matching descendant in document order, or None."""
+    matches = selector(element)
+    return matches[0] if matches else None
+
+
+def extract_raw_records(document):
+    """
+    Raw {product_url, image_url, name, price} records of every product container, looked up exactly as
+    BATCHED_EXTRACTION_SCRIPT does (without the processed-container skip: a snapshot is always read in full).
+    """
+    raw_records = []
+    for container in CONTAINER_SELECTOR(document):
+        link = None
+        for link_selector in LINK_SELECTORS:
+            link = _first(link_selector, container)
+            if link is not None:
+                break
+        if link is None:
+            continue
+
+        img = _first(IMAGE_SELECTOR, container)
+        image_url = (img.get("data-src") or img.get("src")) if img is not None else None
+
+        name = link.get("title")
+        if not name or len(name.strip()) < 5:
+            name = link.text_content()
+        if not name or len(name.strip()) < 10:
+            for name_selector in NAME_SELECTORS:
+                name_el = _first(name_selector, container)
+                if name_el is None:
+                    continue
+                candidate = name_el.get("title") or name_el.text_content()
+                if candidate and len(candidate.strip()) > (len(name or "") or 5):
+                    name = candidate
+                    if len(name.strip()) > 10:
+                        break
+
+        price = None
+        for price_selector in PRICE_SELECTORS:
+            price_el = _first(price_selector, container)
+            if price_el is None:
+                continue
+            candidate = price_el.text_content()
+            if candidate and any(symbol in candidate for symbol in PRICE_SYMBOLS):
+                price = candidate
+                break
+
+        raw_records.append({"product_url": link.get("href"), "image_url": image_url, "name": name, "price": price})
+    return raw_records
+
+
+def parse_snapshot_html(html, page_url, category_name):
+    """Products of one HTML snapshot, cleaned by build_product_record and deduped on the product ID."""
+    document = lxml.html.document_fromstring(html)
+    products = []
+    dedupe_keys_seen = set()
+    for raw_record in extract_raw_records(document):
+        product_data = scraper.build_product_record(raw_record, category_name, page_url)
+        if not product_data:
+            continue
+        dedupe_key = product_urls.product_dedupe_key(product_data["product_url"])
+        if dedupe_key in dedupe_keys_seen:
+            continue
+        dedupe_keys_seen.add(dedupe_key)
+        products.append(product_data)
+    return products
+
+
+def snapshot_page_url(snapshot_path, default_page_url):
+    """The page URL diagnose_page_version recorded next to the snapshot, else default_page_url."""
+    metrics_path = os.path.splitext(snapshot_path)[0] + "_metrics.json"
+    try:
+        with open(metrics_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("url") or default_page_url
+    except (OSError, ValueError):
+        return default_page_url
+
+
+def parse_snapshot_file(snapshot_path, category_name=None, page_url=None):
+    """Returns (snapshot_path, products). Runs in the pool's worker processes."""
+    with open(snapshot_path, "r", encoding="utf-8", errors="replace") as f:
+        html = f.read()
+    category_name = category_name or os.path.splitext(os.path.basename(snapshot_path))[0]
+    return snapshot_path, parse_snapshot_html(html, snapshot_page_url(snapshot_path, page_url or scraper.TARGET_URL), category_name)
+
+
+def iter_snapshot_paths(paths):
+    """Expands directories (recursively) into their .html/.htm files, in sorted order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in sorted(os.walk(path)):
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(SNAPSHOT_EXTENSIONS):
+                        yield os.path.join(directory, file_name)
+        else:
+            yield path
+
+
+def parse_snapshots(paths, workers=None, category_name=None, page_url=None):
+    """Yields (snapshot_path, products) for every snapshot under paths, in path order, parsed by a process pool."""
+    snapshot_paths = list(iter_snapshot_paths(paths))
+    if workers == 1 or len(snapshot_paths) <= 1:
+        for snapshot_path in snapshot_paths:
+            yield parse_snapshot_file(snapshot_path, category_name, page_url)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk_size = max(1, len(snapshot_paths) // ((workers or os.cpu_count() or 1) * 4))
+        yield from pool.map(parse_snapshot_file, snapshot_paths, [category_name] * len(snapshot_paths),
+                            [page_url] * len(snapshot_paths), chunksize=chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Snapshot files or directories of snapshots.")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count).")
+    parser.add_argument("--category", help="alibaba_category for every record (default: the snapshot's file name).")
+    parser.add_argument("--page-url", help=f"Page URL for snapshots without a _metrics.json (default: {scraper.TARGET_URL}).")
+    parser.add_argument("--out", help="Append the products (deduped across snapshots) to this JSONL file.")
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    snapshot_count = record_count = 0
+    dedupe_keys_seen = set()
+    product_writer = product_store.JsonlProductWriter(args.out) if args.out else None
+    try:
+        for snapshot_path, products in parse_snapshots(args.paths, args.workers, args.category, args.page_url):
+            snapshot_count += 1
+            record_count += len(products)
+            print(f"{snapshot_path}: {len(products)} products")
+            for product in products:
+                dedupe_key = product_urls.product_dedupe_key(product["product_url"])
+                if dedupe_key in dedupe_keys_seen:
+                    continue
+                dedupe_keys_seen.add(dedupe_key)
+                if product_writer:
+                    product_writer.write(product)
+    finally:
+        if product_writer:
+            product_writer.close()
+    elapsed = time.perf_counter() - started_at
+    print(f"Parsed {snapshot_count} snapshots in {elapsed:.2f}s: {record_count} products, {len(dedupe_keys_seen)} unique"
+          + (f", appended to {args.out}." if args.out else "."))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Set-based loading of scraped products into the products table.
+
+Records are canonicalised and staged in chunks. Each chunk costs one SELECT, which finds the rows that already
+exist (by alibaba_product_id first, then product_url, like the old per-record lookup), and one executemany
+upsert: INSERT ... ON CONFLICT(product_url) DO UPDATE on SQLite, INSERT ... ON DUPLICATE KEY UPDATE on MySQL.
+New rows get arrival_date; existing rows get the scraped fields, last_scraped_date and is_active=True, and keep
+an alibaba_product_id they already had. The SELECT is also what splits the counts into inserted, updated
+(a scraped field changed, or the row was inactive) and unchanged.
+
+Rows matched by alibaba_product_id under an older stored URL are upserted under that stored URL, so the
+conflict target always hits the existing row.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import mysql, sqlite
+
+import product_urls  # Product URL canonicalisation shared with the scraper (project root)
+from src.models.models import Product
+
+DEFAULT_CHUNK_SIZE = 1000
+CONTENT_COLUMNS = ("name", "price", "image_url", "alibaba_category")
+
+
+def stage_product(prod_data, now):
+    """The products-table row for one scraped record, or None if it lacks a URL or name."""
+    if not prod_data.get("product_url") or not prod_data.get("name"):
+        return None
+    prod_data = product_urls.canonicalize_product(prod_data)
+    return {
+        "name": prod_data.get("name"), "product_url": prod_data["product_url"],
+        "alibaba_product_id": prod_data.get("alibaba_product_id"), "image_url": prod_data.get("image_url"),
+        "price": prod_data.get("price"), "alibaba_category": prod_data.get("alibaba_category"),
+        "arrival_date": now, "last_scraped_date": now, "is_active": True,
+    }
+
+
+def upsert_statement(dialect_name):
+    """Single-row upsert of a staged product, for executemany, in the session's SQL dialect."""
+    table = Product.__table__
+    if dialect_name == "sqlite":
+        statement = sqlite.insert(table)
+        new_values = statement.excluded
+    elif dialect_name == "mysql":
+        statement = mysql.insert(table)
+        new_values = statement.inserted
+    else:
+        raise ValueError(f"Bulk product loading supports SQLite and MySQL, not '{dialect_name}'.")
+    updates = {column: new_values[column] for column in CONTENT_COLUMNS + ("last_scraped_date",)}
+    updates["alibaba_product_id"] = func.coalesce(table.c.alibaba_product_id, new_values.alibaba_product_id)
+    updates["is_active"] = True
+    if dialect_name == "sqlite":
+        return statement.on_conflict_do_update(index_elements=[table.c.product_url], set_=updates)
+    return statement.on_duplicate_key_update(updates)
+
+
+def existing_products(session, rows):
+    """(by alibaba_product_id, by product_url) lookups of the stored rows matching a chunk, from one query."""
+    product_ids = [row["alibaba_product_id"] for row in rows if row["alibaba_product_id"]]
+    condition = Product.product_url.in_([row["product_url"] for row in rows])
+    if product_ids:
+        condition = or_(condition, Product.alibaba_product_id.in_(product_ids))
+    stored_rows = session.execute(select(Product.product_url, Product.alibaba_product_id, Product.is_active,
+                                         *(getattr(Product, column) for column in CONTENT_COLUMNS)).where(condition)).all()
+    by_product_id = {stored.alibaba_product_id: stored for stored in stored_rows if stored.alibaba_product_id}
+    by_url = {stored.product_url: stored for stored in stored_rows}
+    return by_product_id, by_url
+
+
+def apply_chunk(session, statement, rows, stats):
+    by_product_id, by_url = existing_products(session, rows)
+    # Rows that resolve to the same stored product (e.g. one by its ID, one by its legacy URL) are upserted and
+    # counted once, with the last row's fields.
+    upsert_rows = {}
+    for row in rows:
+        stored = by_product_id.get(row["alibaba_product_id"]) or by_url.get(row["product_url"])
+        if stored is not None:
+            row["product_url"] = stored.product_url
+        upsert_rows[row["product_url"]] = (row, stored)
+    for row, stored in upsert_rows.values():
+        if stored is None:
+            stats["inserted"] += 1
+        else:
+            changed = not stored.is_active or any(getattr(stored, column) != row[column] for column in CONTENT_COLUMNS)
+            stats["updated" if changed else "unchanged"] += 1
+    session.execute(statement, [row for row, _ in upsert_rows.values()])
+    session.commit()
+    stats["chunks"] += 1
+
+
+def bulk_load_products(session, products, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Upserts scraped product records (any iterable of dicts) into the products table, committing per chunk.
+    Returns {"inserted", "updated", "unchanged", "skipped", "chunks", "seconds"}.
+    """
+    started_at = time.perf_counter()
+    statement = upsert_statement(session.get_bind().dialect.name)
+    now = datetime.utcnow()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "chunks": 0}
+    chunk = {}
+    for prod_data in products:
+        row = stage_product(prod_data, now)
+        if row is None:
+            print(f"Skipping product due to missing URL or name: {str(prod_data)[:100]}...")
+            stats["skipped"] += 1
+            continue
+        # A product listed twice in the input is loaded once per chunk, from its last record; a later chunk sees it as existing.
+        chunk[product_urls.product_dedupe_key(row["product_url"])] = row
+        if len(chunk) >= chunk_size:
+            apply_chunk(session, statement, list(chunk.values()), stats)
+            chunk = {}
+    if chunk:
+        apply_chunk(session, statement, list(chunk.values()), stats)
+    stats["seconds"] = time.perf_counter() - started_at
+    return stats
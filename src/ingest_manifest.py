@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Change detection for the scheduled product load, kept in a small SQLite file next to the database.
+
+For every scraper output file the manifest stores its identity (size, mtime, inode and a hash of its first
+bytes) and how far it was loaded. For every product it stores a hash of the loaded fields, keyed like the
+scraper's dedupe (product_urls.product_dedupe_key). A load then:
+  - skips a file whose identity is unchanged, so a run with no new scraper output reads nothing;
+  - reads an appended JSONL file from the stored byte offset (a partial last line is left for the next load);
+  - re-reads a rewritten, truncated, compressed or JSON-array file in full (streamed by product_store);
+  - passes on only records whose content hash is new or different.
+Records skipped as unchanged are still listed, so their products get last_scraped_date refreshed with one
+UPDATE per batch (archiving goes by it); ones no longer in the products table (archived or deleted) are passed
+on to be loaded again. The manifest also stores the app database's identity token (DatabaseIdentity) and starts
+over when it finds another one, e.g. after the database file was deleted or replaced.
+New hashes go into the manifest's open transaction as records stream past, so memory stays flat; commit()
+makes them and the file offsets durable once the database load succeeded, discard() rolls them back.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import or_, select, update
+
+import product_store  # Shared JSON/JSONL product reader (project root)
+import product_urls  # Product URL canonicalisation shared with the scraper (project root)
+from src.models.models import DatabaseIdentity, Product
+
+HEAD_HASH_BYTES = 4096
+HASH_LOOKUP_BATCH_SIZE = 500
+HASHED_FIELDS = ("product_url", "name", "price", "image_url", "alibaba_category")
+
+
+def file_identity(path, head_length=HEAD_HASH_BYTES):
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        head = f.read(head_length)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino,
+            "head_length": len(head), "head_hash": hashlib.blake2b(head, digest_size=16).hexdigest()}
+
+
+def content_hash(product):
+    return hashlib.blake2b(json.dumps([product.get(field) for field in HASHED_FIELDS], ensure_ascii=False).encode("utf-8"),
+                           digest_size=16).digest()
+
+
+def database_token(session):
+    """The app database's identity token, created (and committed) on first use."""
+    identity = session.execute(select(DatabaseIdentity).order_by(DatabaseIdentity.id)).scalars().first()
+    if identity is None:
+        identity = DatabaseIdentity(token=uuid.uuid4().hex)
+        session.add(identity)
+        session.commit()
+    return identity.token
+
+
+def iter_jsonl_from_offset(path, offset):
+    """Yields (product, end_offset) for every complete line from byte offset on; stops before a partial last line."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                product = json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable line ending at byte {offset} in {path}.")
+                continue
+            if isinstance(product, dict):
+                yield product, offset
+
+
+class IngestManifest:
+    def __init__(self, path, session):
+        self.path = path
+        self.session = session # The app database's session, which the load runs in
+        self.stats = {"files_unchanged": 0, "files_appended": 0, "files_reread": 0, "records_read": 0, "records_unchanged": 0,
+                      "records_reloaded": 0}
+        self.current_path = None # The file being read, e.g. for reporting a parse error
+        self._pending_sources = {}
+        self._connection = None
+
+    def open(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path)
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS source_files (path TEXT PRIMARY KEY, identity TEXT NOT NULL, loaded_offset INTEGER NOT NULL,
+                                                         loaded_at REAL NOT NULL) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS record_hashes (dedupe_key TEXT PRIMARY KEY, content_hash BLOB NOT NULL) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS manifest_info (name TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+            """)
+            self._check_database()
+        return self
+
+    def _check_database(self):
+        """Starts over if the manifest was recorded against another database than the session's."""
+        token = database_token(self.session)
+        row = self._connection.execute("SELECT value FROM manifest_info WHERE name = 'database_token'").fetchone()
+        if row is not None and row[0] == token:
+            return
+        if row is not None:
+            print("Ingest manifest was recorded against another database; starting over with a full load.")
+        self.clear()
+        self._connection.execute("INSERT OR REPLACE INTO manifest_info (name, value) VALUES ('database_token', ?)", (token,))
+        self._connection.commit()
+
+    def plan_source(self, path):
+        """(start_offset, identity) to load path from, or None if it is unchanged since the last committed load."""
+        row = self._connection.execute("SELECT identity, loaded_offset FROM source_files WHERE path = ?", (path,)).fetchone()
+        identity = file_identity(path)
+        if row is None:
+            return 0, identity
+        stored_identity, loaded_offset = json.loads(row[0]), row[1]
+        if all(identity[key] == stored_identity[key] for key in ("size", "mtime_ns", "inode")):
+            return None
+        # Appended to in place: same file, not shorter, and the bytes loaded last time still start it the same way.
+        appended = (identity["inode"] == stored_identity["inode"] and identity["size"] >= loaded_offset
+                    and file_identity(path, stored_identity["head_length"])["head_hash"] == stored_identity["head_hash"])
+        if appended and not product_store.is_compressed(path) and product_store.detect_format(path) == "jsonl":
+            return loaded_offset, identity
+        return 0, identity
+
+    def iter_changed_products(self, paths):
+        """Yields the new or changed products of the changed files among paths, in file order."""
+        batch = []
+        for path in paths:
+            if not path or not os.path.exists(path):
+                continue
+            plan = self.plan_source(path)
+            if plan is None:
+                self.stats["files_unchanged"] += 1
+                continue
+            start_offset, identity = plan
+            self.current_path = path
+            self.stats["files_appended" if start_offset else "files_reread"] += 1
+            loaded_offset = start_offset
+            if not product_store.is_compressed(path) and product_store.detect_format(path) == "jsonl":
+                records = iter_jsonl_from_offset(path, start_offset)
+            else:
+                records = ((product, identity["size"]) for product in product_store.iter_products(path))
+            for product, loaded_offset in records:
+                batch.append(product)
+                if len(batch) >= HASH_LOOKUP_BATCH_SIZE:
+                    yield from self._changed_in_batch(batch)
+                    batch = []
+            self._pending_sources[path] = (identity, loaded_offset)
+        if batch:
+            yield from self._changed_in_batch(batch)
+
+    def _changed_in_batch(self, products):
+        keyed = []
+        for product in products:
+            self.stats["records_read"] += 1
+            if not product.get("product_url"):
+                continue
+            canonical = product_urls.canonicalize_product(product)
+            keyed.append((str(product_urls.product_dedupe_key(canonical["product_url"])), content_hash(canonical), product, canonical))
+        placeholders = ",".join("?" * len(keyed))
+        stored_hashes = dict(self._connection.execute(
+            f"SELECT dedupe_key, content_hash FROM record_hashes WHERE dedupe_key IN ({placeholders})", [key for key, _, _, _ in keyed]))
+        changed_hashes = {}
+        changed_products = []
+        unchanged = {}
+        for dedupe_key, record_hash, product, canonical in keyed:
+            if changed_hashes.get(dedupe_key, stored_hashes.get(dedupe_key)) == record_hash:
+                if dedupe_key not in changed_hashes: # Not a repeat of a record this batch already passes on
+                    unchanged[dedupe_key] = (product, canonical)
+                continue
+            changed_hashes[dedupe_key] = record_hash
+            changed_products.append(product)
+            unchanged.pop(dedupe_key, None)
+        missing_products = self._refresh_unchanged(list(unchanged.values())) if unchanged else []
+        self.stats["records_unchanged"] += len(keyed) - len(changed_products) - len(missing_products)
+        self.stats["records_reloaded"] += len(missing_products)
+        # Uncommitted until commit(); later batches of this load already see them.
+        self._connection.executemany("INSERT OR REPLACE INTO record_hashes (dedupe_key, content_hash) VALUES (?, ?)", list(changed_hashes.items()))
+        yield from changed_products
+        yield from missing_products
+
+    def _refresh_unchanged(self, unchanged):
+        """
+        Marks the stored products of unchanged (product, canonical) records as scraped now, with one UPDATE in the
+        load's session. Returns the products among them that are no longer stored, which need loading again.
+        """
+        product_ids = [canonical["alibaba_product_id"] for _, canonical in unchanged if canonical.get("alibaba_product_id")]
+        urls = [canonical["product_url"] for _, canonical in unchanged if not canonical.get("alibaba_product_id")]
+        is_listed = or_(Product.alibaba_product_id.in_(product_ids), Product.product_url.in_(urls))
+        refreshed = self.session.execute(update(Product).where(is_listed).values(last_scraped_date=datetime.utcnow(), is_active=True),
+                                         execution_options={"synchronize_session": False}).rowcount
+        if refreshed >= len(unchanged):
+            return []
+        # Only when some are gone: find out which.
+        stored = self.session.execute(select(Product.alibaba_product_id, Product.product_url).where(is_listed)).all()
+        stored_ids = {row.alibaba_product_id for row in stored}
+        stored_urls = {row.product_url for row in stored}
+        return [product for product, canonical in unchanged
+                if canonical.get("alibaba_product_id") not in stored_ids and canonical["product_url"] not in stored_urls]
+
+    def commit(self):
+        """
+        Records the hashes and file positions of everything iterated since the last commit, after committing the
+        session (the refreshed dates of unchanged products). Call once the load succeeded.
+        """
+        self.session.commit()
+        now = time.time()
+        self._connection.executemany("INSERT OR REPLACE INTO source_files (path, identity, loaded_offset, loaded_at) VALUES (?, ?, ?, ?)",
+                                     [(path, json.dumps(identity), loaded_offset, now) for path, (identity, loaded_offset) in self._pending_sources.items()])
+        self._connection.commit()
+        self._pending_sources = {}
+
+    def discard(self):
+        """Forgets what was iterated since the last commit (e.g. after a failed load), so the next load retries it."""
+        self.session.rollback()
+        self._connection.rollback()
+        self._pending_sources = {}
+
+    def clear(self):
+        self._connection.execute("DELETE FROM source_files")
+        self._connection.execute("DELETE FROM record_hashes")
+        self._connection.commit()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
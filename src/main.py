@@ -10,7 +10,12 @@ print(f"DEBUG main.py: Project root '{project_root}' added to sys.path.")
 # --- End of path modification ---
 
 from flask import Flask, render_template, jsonify, request, redirect, url_for
-from src.models.models import db, Product, Category, UserFavorite # Assuming models.py is in src/models/
+from src.models.models import db, Product, ArchivedProduct, Category, UserFavorite # Assuming models.py is in src/models/
+import product_urls # Product URL canonicalisation shared with the scraper (project root)
+from src.bulk_loader import bulk_load_products
+from src.ingest_manifest import IngestManifest
+from src.product_archive import archive_stale_products, compact_database, lookup_archived_products
+from src.sqlite_storage import init_storage, is_database_busy, prepare_storage, read_only_session
 # Assuming nlp_utils.py is in src/ and src/__init__.py exists
 from src.nlp_utils import (
     perform_hybrid_search,
@@ -19,7 +24,11 @@ from src.nlp_utils import (
 )
 
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import wraps
+
+import click
+from sqlalchemy.exc import OperationalError
 
 # APScheduler Imports
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -36,8 +45,18 @@ app = Flask(__name__,
 # --- Database Configuration ---
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///alibaba_explorer.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-db.init_app(app)
+app.config["BULK_LOAD_CHUNK_SIZE"] = 1000 # Products staged per SELECT + upsert round in load_scraped_data_to_db
+# Loaded file positions and per-product content hashes, so scheduled loads only touch new or changed products
+app.config["INGEST_MANIFEST_PATH"] = os.path.join(app.instance_path, "ingest_manifest.sqlite")
+app.config["ARCHIVE_AFTER_DAYS"] = 30 # Products not scraped for this long move to the products_archive table
+app.config["ARCHIVE_VACUUM_FREE_FRACTION"] = 0.2 # VACUUM after archiving once free pages are this share of the DB file
+# "concurrent": WAL, tuned pragmas, pooled per-thread connections and read-only connections for read routes,
+# so page views keep working during a scheduled load. "default" keeps SQLite's stock settings.
+app.config["SQLITE_STORAGE_MODE"] = "concurrent"
+app.config["SQLITE_POOL_SIZE"] = 8 # Pooled connections per engine (request threads plus the scheduler)
+
+# Registers the engines only; the database file is first opened by prepare_storage() at start-up or the first request.
+init_storage(app, db, app.config["SQLITE_STORAGE_MODE"], app.config["SQLITE_POOL_SIZE"])
 
 # --- Initialize NLP resources once on Flask app startup ---
 with app.app_context():
@@ -54,78 +73,99 @@ app.config["MIN_FUZZY_SCORE_THRESHOLD"] = 40   # Min fuzzy score for stage 1
 def archive_old_products():
     # This function now handles its own app_context for database operations
     print("Archiving old products...")
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     with app.app_context():
         try:
-            old_products = Product.query.filter(Product.last_scraped_date < thirty_days_ago, Product.is_active == True).all()
-            if old_products:
-                for product in old_products:
-                    product.is_active = False
-                db.session.commit()
-                print(f"Archived {len(old_products)} products.")
+            archive_stats = archive_stale_products(db.session, app.config["ARCHIVE_AFTER_DAYS"])
+            if archive_stats["archived"] or archive_stats["deactivated"]:
+                print(f"Archived {archive_stats['archived']} products to {ArchivedProduct.__tablename__} and deactivated "
+                      f"{archive_stats['deactivated']} still referenced by favorites or keywords.")
             else:
-                print("No active products found older than 30 days to archive.")
+                print(f"No products found older than {app.config['ARCHIVE_AFTER_DAYS']} days to archive.")
         except Exception as e:
             db.session.rollback()
             print(f"Error archiving old products: {e}")
+            return
+        try:
+            freed_pages = compact_database(db.engine, app.config["ARCHIVE_VACUUM_FREE_FRACTION"])
+            if freed_pages is not None:
+                print(f"Compacted the database, freeing {freed_pages} pages.")
+        except Exception as e:
+            print(f"Error compacting the database: {e}")
 
 def load_scraped_data_to_db():
-    # Note: This function's database operations (Product.query, db.session.add, db.session.commit)
+    # Note: This function's database operations (bulk upserts through db.session)
     # need to be called within an active Flask application context.
     # Callers like scheduled_load_data_job, load_data_command, run_scraper_route,
     # and the initial startup logic are responsible for providing this context.
     print("Attempting to load scraped data into DB...")
     scraper_output_file = r"C:\Users\zdoes\Downloads\alibaba_explorer\scraped_alibaba_new_arrivals_enhanced.json"
-    try:
-        with open(scraper_output_file, "r", encoding="utf-8") as f:
-            products_data = json.load(f)
-        print(f"Loaded {len(products_data)} items from {scraper_output_file}")
-    except FileNotFoundError:
-        print(f"ERROR: Scraper output file '{scraper_output_file}' not found. Skipping DB load.")
-        return
-    except json.JSONDecodeError:
-        print(f"ERROR: Could not decode JSON from '{scraper_output_file}'. Skipping DB load.")
+    scraper_jsonl_output_file = r"C:\Users\zdoes\Downloads\alibaba_explorer\scraped_alibaba_new_arrivals_enhanced.jsonl"
+    if not os.path.exists(scraper_output_file) and not os.path.exists(scraper_jsonl_output_file):
+        print(f"ERROR: Scraper output files '{scraper_output_file}' / '{scraper_jsonl_output_file}' not found. Skipping DB load.")
         return
-    except Exception as e:
-        print(f"ERROR: Unexpected error loading '{scraper_output_file}': {e}")
-        return
-
-    added_count = 0
-    updated_count = 0
-    for prod_data in products_data:
-        if not prod_data.get("product_url") or not prod_data.get("name"):
-            print(f"Skipping product due to missing URL or name: {str(prod_data)[:100]}...")
-            continue
-        existing_product = Product.query.filter_by(product_url=prod_data.get("product_url")).first()
-        if existing_product:
-            existing_product.name = prod_data.get("name", existing_product.name)
-            existing_product.price = prod_data.get("price", existing_product.price)
-            existing_product.image_url = prod_data.get("image_url", existing_product.image_url)
-            existing_product.alibaba_category = prod_data.get("alibaba_category", existing_product.alibaba_category)
-            existing_product.last_scraped_date = datetime.utcnow()
-            existing_product.is_active = True # Ensure re-scraped products are active
-            updated_count += 1
+    with IngestManifest(app.config["INGEST_MANIFEST_PATH"], db.session) as manifest:
+        # The manifest starts over by itself for a deleted or replaced database; clear-products resets it too.
+        # Streamed end to end: the files are parsed incrementally and upserted in fixed-size chunks.
+        try:
+            load_stats = bulk_load_products(db.session, manifest.iter_changed_products([scraper_output_file, scraper_jsonl_output_file]),
+                                            chunk_size=app.config["BULK_LOAD_CHUNK_SIZE"])
+        except json.JSONDecodeError as e:
+            db.session.rollback()
+            manifest.discard()
+            print(f"ERROR: Could not decode JSON from '{manifest.current_path}': {e}. Skipping DB load.")
+            return
+        except Exception as e:
+            db.session.rollback()
+            manifest.discard()
+            # No archiving either: it would run against a partially loaded table.
+            print(f"Error loading product data into the database: {e}")
+            return
         else:
-            new_product = Product(
-                name=prod_data.get("name"), product_url=prod_data.get("product_url"),
-                image_url=prod_data.get("image_url"), price=prod_data.get("price"),
-                alibaba_category=prod_data.get("alibaba_category"),
-                arrival_date=datetime.utcnow(), last_scraped_date=datetime.utcnow(),
-                is_active=True
-            )
-            db.session.add(new_product)
-            added_count +=1
+            manifest.commit()
+            if not manifest.stats["files_appended"] and not manifest.stats["files_reread"]:
+                print("Scraper output unchanged since the last load. Skipping DB load.")
+            else:
+                print(f"Read {manifest.stats['records_read']} items from {scraper_output_file} and {scraper_jsonl_output_file}, "
+                      f"{manifest.stats['records_unchanged']} unchanged since the last load, "
+                      f"{manifest.stats['records_reloaded']} reloaded after leaving the products table.")
+                print(f"DB Load: {load_stats['inserted']} new products added, {load_stats['updated']} products updated, "
+                      f"{load_stats['unchanged']} unchanged ({load_stats['chunks']} chunks, {load_stats['seconds']:.2f}s).")
+    
+    archive_old_products() # This will run within the app_context provided by the caller
+
+storage_prepared = False
+
+@app.before_request
+def prepare_storage_on_first_request():
+    # Covers WSGI servers that import this module without running the start-up block below.
+    global storage_prepared
+    if not storage_prepared:
+        prepare_storage(app, db)
+        storage_prepared = True
+
+def read_only_route(view):
+    # Runs the view's queries on the read-only connections (see sqlite_storage); the session is per request.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        read_only_session(db.session)
+        return view(*args, **kwargs)
+    return wrapper
+
+def commit_or_report_busy(action):
+    # True if committed. A write that waited out the busy timeout behind a load is dropped, not a server error.
     try:
         db.session.commit()
-        print(f"DB Load: {added_count} new products added, {updated_count} products updated.")
-    except Exception as e:
+        return True
+    except OperationalError as e:
         db.session.rollback()
-        print(f"Error committing product data to database: {e}")
-    
-    archive_old_products() # This will run within the app_context provided by the caller
+        if not is_database_busy(e):
+            raise
+        print(f"Database busy (a load or archive is writing); could not {action}. Try again shortly.")
+        return False
 
 # --- Routes ---
 @app.route("/")
+@read_only_route
 def index():
     page = request.args.get("page", 1, type=int)
     per_page_db_query = 20
@@ -192,10 +232,23 @@ def index():
                            selected_cluster=None)
 
 @app.route("/favorites")
+@read_only_route
 def favorites():
     favs = UserFavorite.query.filter_by(user_id=1).join(Product).order_by(UserFavorite.added_date.desc()).all()
     return render_template("favorites.html", favorites=favs)
 
+@app.route("/archive")
+@read_only_route
+def archive_lookup():
+    # On-demand lookup in the cold tier: /archive?query=...&product_url=...&alibaba_product_id=...
+    archived = lookup_archived_products(db.session, query=request.args.get("query", "", type=str).strip(),
+                                        product_url=request.args.get("product_url"), alibaba_product_id=request.args.get("alibaba_product_id"),
+                                        limit=request.args.get("limit", 50, type=int))
+    return jsonify([{"product_id": p.product_id, "alibaba_product_id": p.alibaba_product_id, "name": p.name,
+                     "product_url": p.product_url, "image_url": p.image_url, "price": p.price, "alibaba_category": p.alibaba_category,
+                     "arrival_date": p.arrival_date.isoformat(), "last_scraped_date": p.last_scraped_date.isoformat(),
+                     "archived_date": p.archived_date.isoformat()} for p in archived])
+
 @app.route("/add_favorite/<int:product_id>", methods=["POST"])
 def add_favorite(product_id):
     existing_fav = UserFavorite.query.filter_by(user_id=1, product_id=product_id).first()
@@ -204,8 +257,8 @@ def add_favorite(product_id):
         if product_to_fav:
             fav = UserFavorite(user_id=1, product_id=product_id)
             db.session.add(fav)
-            db.session.commit()
-            print(f"Added product ID {product_id} to favorites.")
+            if commit_or_report_busy(f"add product ID {product_id} to favorites"):
+                print(f"Added product ID {product_id} to favorites.")
         else:
             print(f"Could not add favorite: Product ID {product_id} not found or inactive.")
     return redirect(request.referrer or url_for("index"))
@@ -215,8 +268,8 @@ def remove_favorite(product_id):
     fav = UserFavorite.query.filter_by(user_id=1, product_id=product_id).first()
     if fav:
         db.session.delete(fav)
-        db.session.commit()
-        print(f"Removed product ID {product_id} from favorites.")
+        if commit_or_report_busy(f"remove product ID {product_id} from favorites"):
+            print(f"Removed product ID {product_id} from favorites.")
     return redirect(request.referrer or url_for("favorites"))
 
 @app.route("/run_scraper", methods=["POST"])
@@ -247,14 +300,70 @@ def archive_data_command():
     archive_old_products() 
     print("CLI: Manual archival process finished.")
 
+@app.cli.command("archive-lookup")
+@click.argument("query", required=False)
+@click.option("--url", "product_url", help="Exact (canonical) product URL.")
+@click.option("--product-id", "alibaba_product_id", help="Alibaba product ID.")
+@click.option("--limit", default=50, show_default=True)
+def archive_lookup_command(query, product_url, alibaba_product_id, limit):
+    with app.app_context():
+        archived = lookup_archived_products(db.session, query=query, product_url=product_url, alibaba_product_id=alibaba_product_id, limit=limit)
+        for p in archived:
+            print(f"{p.archived_date:%Y-%m-%d} {p.product_id:>8} {p.price or '':>14}  {p.name[:70]}  {p.product_url}")
+        print(f"CLI: {len(archived)} archived products found.")
+
+@app.cli.command("compact-db")
+def compact_db_command():
+    with app.app_context():
+        freed_pages = compact_database(db.engine, min_free_fraction=0)
+        print(f"CLI: Compacted the database, freeing {freed_pages} pages." if freed_pages is not None else "CLI: Nothing to compact.")
+
+@app.cli.command("canonicalize-products")
+def canonicalize_products_command():
+    # One-off backfill: canonical URLs and alibaba_product_id for existing rows. Later rows for an already seen
+    # product are deactivated (not deleted, so favorites keep working) and drop out of search.
+    with app.app_context():
+        seen_product_ids = set()
+        seen_urls = set()
+        canonicalized_count = 0
+        deactivated_count = 0
+        all_products = Product.query.order_by(Product.id).all()
+        stored_urls = {product.product_url for product in all_products}
+        for product in all_products:
+            canonical = product_urls.canonicalize_product({"product_url": product.product_url})
+            product_id = canonical.get("alibaba_product_id") or product.alibaba_product_id
+            if (product_id and product_id in seen_product_ids) or canonical["product_url"] in seen_urls:
+                if product.is_active:
+                    product.is_active = False
+                    deactivated_count += 1
+                continue
+            if product_id:
+                seen_product_ids.add(product_id)
+            seen_urls.add(canonical["product_url"])
+            if product.product_url != canonical["product_url"] or product.alibaba_product_id != product_id:
+                # Keep the old URL if a (duplicate) row already holds the canonical one; product_url is unique.
+                if canonical["product_url"] not in stored_urls:
+                    product.product_url = canonical["product_url"]
+                product.alibaba_product_id = product_id
+                canonicalized_count += 1
+        try:
+            db.session.commit()
+            print(f"Canonicalised {canonicalized_count} products and deactivated {deactivated_count} duplicates.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error canonicalising products: {e}")
+
 @app.cli.command("clear-products")
 def clear_products_command():
     with app.app_context():
         try:
             num_favs = UserFavorite.query.delete()
             num_prods = Product.query.delete()
+            num_archived = ArchivedProduct.query.delete()
             db.session.commit()
-            print(f"Cleared {num_prods} products and {num_favs} favorites from the database.")
+            with IngestManifest(app.config["INGEST_MANIFEST_PATH"], db.session) as manifest:
+                manifest.clear()
+            print(f"Cleared {num_prods} products, {num_archived} archived products and {num_favs} favorites from the database.")
         except Exception as e:
             db.session.rollback()
             print(f"Error clearing database: {e}")
@@ -277,6 +386,8 @@ if __name__ == "__main__":
         try: os.makedirs(instance_path)
         except OSError as e: print(f"Could not create instance folder at {instance_path}: {e}")
 
+    prepare_storage(app, db)
+    storage_prepared = True
     with app.app_context():
         print("Creating database tables if they don't exist (on app startup)...")
         db.create_all()
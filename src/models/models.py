@@ -3,8 +3,10 @@ import os
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-# This db object will be initialized in main.py
-db = SQLAlchemy()
+from src.sqlite_storage import ReadRoutingSession
+
+# This db object will be initialized in main.py (via sqlite_storage.init_storage)
+db = SQLAlchemy(session_options={"class_": ReadRoutingSession})
 
 class Product(db.Model):
     __tablename__ = "products"
@@ -31,6 +33,39 @@ class Product(db.Model):
     def __repr__(self):
         return f"<Product {self.id}: {self.name[:50]}>"
 
+class ArchivedProduct(db.Model):
+    # Cold tier: products moved out of the products table after the archive window (see src/product_archive.py)
+    __tablename__ = "products_archive"
+
+    archive_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_id = db.Column(db.Integer, nullable=False, index=True) # products.id at the time of archiving
+    alibaba_product_id = db.Column(db.String(255), nullable=True, index=True)
+    name = db.Column(db.Text, nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    product_url = db.Column(db.Text, nullable=False, unique=True)
+    image_url = db.Column(db.Text, nullable=True)
+    price = db.Column(db.String(100), nullable=True)
+    alibaba_category = db.Column(db.Text, nullable=True)
+    smart_category_id = db.Column(db.Integer, nullable=True)
+    cluster_id = db.Column(db.Integer, nullable=True)
+    arrival_date = db.Column(db.TIMESTAMP, nullable=False)
+    last_scraped_date = db.Column(db.TIMESTAMP, nullable=False)
+    archived_date = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArchivedProduct {self.product_id}: {self.name[:50]}>"
+
+class DatabaseIdentity(db.Model):
+    # Random token naming this database, so the ingest manifest (its own file) notices a deleted or replaced database
+    __tablename__ = "database_identity"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    token = db.Column(db.String(32), unique=True, nullable=False)
+    created_date = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DatabaseIdentity {self.token}>"
+
 class Category(db.Model):
     __tablename__ = "categories"
 
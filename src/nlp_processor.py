@@ -1,4 +1,4 @@
-import json
+import heapq
 import openai  # For interacting with Ollama's OpenAI-compatible API
 import re
 import os
@@ -9,9 +9,17 @@ import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 
+# Project root on the path for the shared product reader
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+import product_store # Streaming JSON/JSONL product reader (project root)
+
 # --- Configuration ---
 # Path to your scraped product data
-PRODUCT_DATA_FILE = r"C:\Users\zdoes\Downloads\alibaba_explorer\scraped_alibaba_new_arrivals_enhanced.json"
+PRODUCT_DATA_FILE = r"C:\Users\zdoes\Downloads\alibaba_explorer\scraped_alibaba_new_arrivals_enhanced.json" # Legacy JSON archive
+PRODUCT_JSONL_DATA_FILE = r"C:\Users\zdoes\Downloads\alibaba_explorer\scraped_alibaba_new_arrivals_enhanced.jsonl" # Where the scraper appends new products
+PRODUCT_DATA_FILES = [PRODUCT_DATA_FILE, PRODUCT_JSONL_DATA_FILE] # Read in this order, like src/main.py
 # The model name you have pulled and are running in Ollama
 OLLAMA_MODEL_NAME = "llama3:8b"  # <<< TRY A SMALL, FAST MODEL FIRST (e.g., gemma3:1b or llama3.2)
 # Ollama API endpoint
@@ -107,7 +115,8 @@ def parse_llm_score(llm_response_text):
     return 0
 
 def hybrid_product_search(user_query, products_data, llm_model_name):
-    if not products_data: return []
+    # products_data may be a list or a stream (e.g. product_store.iter_products); it is read once.
+    if products_data is None: return []
     print(f"\nStarting Hybrid Search for query: '{user_query}'")
     print("-" * 40)
     start_time_total = time.time()
@@ -118,18 +127,18 @@ def hybrid_product_search(user_query, products_data, llm_model_name):
         print("Query empty after preprocessing for fuzzy search. No results."); return []
     print(f"  NLTK-Processed query for fuzzy matching: '{processed_query_for_fuzzy}'")
 
-    fuzzy_candidates = []
-    for product in products_data:
-        product_name = product.get("name")
-        if not product_name: continue
-        processed_name = preprocess_text_for_fuzzy(product_name)
-        if not processed_name: continue
-        fuzzy_score = fuzz.token_set_ratio(processed_query_for_fuzzy, processed_name)
-        if fuzzy_score >= MIN_FUZZY_SCORE_THRESHOLD:
-            fuzzy_candidates.append({"product_data": product, "fuzzy_score": fuzzy_score})
+    def iter_fuzzy_candidates():
+        for product in products_data:
+            product_name = product.get("name")
+            if not product_name: continue
+            processed_name = preprocess_text_for_fuzzy(product_name)
+            if not processed_name: continue
+            fuzzy_score = fuzz.token_set_ratio(processed_query_for_fuzzy, processed_name)
+            if fuzzy_score >= MIN_FUZZY_SCORE_THRESHOLD:
+                yield {"product_data": product, "fuzzy_score": fuzzy_score}
 
-    fuzzy_candidates.sort(key=lambda x: x["fuzzy_score"], reverse=True)
-    top_fuzzy_candidates = fuzzy_candidates[:FUZZY_SEARCH_CANDIDATES_COUNT]
+    # Only the best FUZZY_SEARCH_CANDIDATES_COUNT are kept while scoring (same order as a stable sort).
+    top_fuzzy_candidates = heapq.nlargest(FUZZY_SEARCH_CANDIDATES_COUNT, iter_fuzzy_candidates(), key=lambda x: x["fuzzy_score"])
 
     if not top_fuzzy_candidates:
         print(f"No candidates found after fuzzy matching (threshold: {MIN_FUZZY_SCORE_THRESHOLD})."); return []
@@ -179,14 +188,9 @@ if __name__ == "__main__":
     if not client:
         print("Exiting: Ollama client not initialized. Please check if Ollama is running."); sys.exit(1)
 
-    try:
-        with open(PRODUCT_DATA_FILE, "r", encoding="utf-8") as f:
-            all_products = json.load(f)
-        print(f"Successfully loaded {len(all_products)} products from {PRODUCT_DATA_FILE}")
-    except Exception as e:
-        print(f"Error loading product data from {PRODUCT_DATA_FILE}: {e}"); all_products = []
-
-    if not all_products: print("No products loaded. Exiting."); sys.exit(1)
+    if not any(os.path.exists(path) for path in PRODUCT_DATA_FILES):
+        print(f"Product data files {PRODUCT_DATA_FILE} / {PRODUCT_JSONL_DATA_FILE} not found. Exiting."); sys.exit(1)
+    print(f"Products will be streamed from {' and '.join(path for path in PRODUCT_DATA_FILES if os.path.exists(path))} during the search.")
 
     print("\n" + "="*70)
     print("Hybrid Product Search Engine (Fuzzy Filter + LLM Re-ranking)")
@@ -200,7 +204,7 @@ if __name__ == "__main__":
         if not user_search_query:
             print("No search query entered. Exiting.")
         else:
-            results = hybrid_product_search(user_search_query, all_products, OLLAMA_MODEL_NAME)
+            results = hybrid_product_search(user_search_query, product_store.iter_products_from_files(PRODUCT_DATA_FILES), OLLAMA_MODEL_NAME)
 
             print(f"\n--- Search Results for '{user_search_query}' (Showing reasonably related items) ---")
             if not results:
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Hot/cold tiering of the products table.
+
+archive_stale_products() moves every product not scraped within the archive window into products_archive with
+set-based statements in one transaction: drop older archive copies of the same URLs, INSERT ... SELECT the stale
+rows into the archive, DELETE them from products. Stale rows that favorites or keywords still reference stay in
+products (their foreign keys point there) and are only deactivated, with one UPDATE. So the products table that
+page views and searches scan holds just the live catalogue.
+
+A product that is scraped again after being archived is loaded as a new arrival; its archive copy stays until
+the product is archived again, which replaces it. lookup_archived_products() answers on-demand lookups in
+the archive. Deleting rows leaves free pages in the SQLite file, so compact_database() VACUUMs it once they
+make up a configurable share of it.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, literal, or_, select, text, update
+
+from src.models.models import ArchivedProduct, Product, UserFavorite, product_keywords
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+DEFAULT_VACUUM_FREE_FRACTION = 0.2
+ARCHIVED_COLUMNS = ("alibaba_product_id", "name", "description", "product_url", "image_url", "price",
+                    "alibaba_category", "smart_category_id", "cluster_id", "arrival_date", "last_scraped_date")
+
+
+def archive_stale_products(session, archive_after_days=DEFAULT_ARCHIVE_AFTER_DAYS, now=None):
+    """
+    Moves products last scraped more than archive_after_days ago to products_archive and commits.
+    Returns {"archived", "deactivated"}: rows moved, and referenced rows only marked inactive.
+    """
+    now = now or datetime.utcnow()
+    is_stale = Product.last_scraped_date < now - timedelta(days=archive_after_days)
+    is_referenced = or_(Product.id.in_(select(UserFavorite.product_id)), Product.id.in_(select(product_keywords.c.product_id)))
+    # Conditions on products itself rather than an id subquery: MySQL cannot DELETE from a table it selects from.
+    is_movable = (is_stale, ~is_referenced)
+
+    session.execute(delete(ArchivedProduct).where(ArchivedProduct.product_url.in_(select(Product.product_url).where(*is_movable))))
+    archived = session.execute(insert(ArchivedProduct).from_select(
+        ("product_id",) + ARCHIVED_COLUMNS + ("archived_date",),
+        select(Product.id, *(getattr(Product, column) for column in ARCHIVED_COLUMNS), literal(now, ArchivedProduct.archived_date.type))
+        .where(*is_movable))).rowcount
+    session.execute(delete(Product).where(*is_movable), execution_options={"synchronize_session": False})
+    # Kept in place for their references; is_active hides them from the listing and search like before.
+    deactivated = session.execute(update(Product).where(is_stale, Product.is_active == True).values(is_active=False),
+                                  execution_options={"synchronize_session": False}).rowcount
+    session.commit()
+    return {"archived": archived, "deactivated": deactivated}
+
+
+def lookup_archived_products(session, query=None, product_url=None, alibaba_product_id=None, limit=50):
+    """Archived products matching every given filter (query is a case-insensitive name substring), newest archived first."""
+    statement = select(ArchivedProduct)
+    if query:
+        statement = statement.where(ArchivedProduct.name.ilike(f"%{query}%"))
+    if product_url:
+        statement = statement.where(ArchivedProduct.product_url == product_url)
+    if alibaba_product_id:
+        statement = statement.where(ArchivedProduct.alibaba_product_id == alibaba_product_id)
+    return session.execute(statement.order_by(ArchivedProduct.archived_date.desc()).limit(limit)).scalars().all()
+
+
+def compact_database(engine, min_free_fraction=DEFAULT_VACUUM_FREE_FRACTION):
+    """
+    VACUUMs a SQLite database once free pages make up at least min_free_fraction of it (0 compacts whenever there are any).
+    Returns the pages freed, or None if nothing was done. Other databases manage their own space and are left alone.
+    """
+    if engine.dialect.name != "sqlite":
+        return None
+    # VACUUM cannot run inside a transaction, so it gets its own autocommit connection.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        page_count = connection.execute(text("PRAGMA page_count")).scalar()
+        free_pages = connection.execute(text("PRAGMA freelist_count")).scalar()
+        if not page_count or not free_pages or free_pages / page_count < min_free_fraction:
+            return None
+        connection.execute(text("VACUUM"))
+        return page_count - connection.execute(text("PRAGMA page_count")).scalar()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+SQLite storage modes for the Flask app.
+
+"default" leaves SQLite as it is: a rollback journal, so a scheduled load or archive commit locks the file and
+page views wait on it. "concurrent" sets every connection up for readers alongside one writer:
+  - journal_mode=WAL, so readers see the last committed state while a load writes;
+  - synchronous=NORMAL (durable at WAL checkpoints, safe against corruption), a larger page cache and mmap reads;
+  - busy_timeout on every connection, so a writer waiting for another writer retries instead of failing at once;
+  - a QueuePool sized for the request threads plus the scheduler, so each thread checks out its own warm
+    connection (page cache and mmap are per connection);
+  - a second "read_only" engine (mode=ro, query_only) that sessions flagged by read_only_session() run on, so
+    read-only routes keep their own connections and cannot write.
+A write that still hits a lock after the busy timeout raises OperationalError; is_database_busy() tells it apart.
+"""
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+READ_ONLY_BIND = "read_only"
+DEFAULT_POOL_SIZE = 8
+CONCURRENT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,      # KiB, i.e. about 64 MB per connection
+    "mmap_size": 268435456,    # 256 MB of the file read through the OS page cache
+    "busy_timeout": 5000,      # ms
+    "temp_store": "MEMORY",
+}
+# Settings the read-only connections cannot change (the journal mode is a property of the file, set by writers).
+WRITER_ONLY_PRAGMAS = ("journal_mode",)
+STORAGE_MODES = {"default": None, "concurrent": CONCURRENT_PRAGMAS}
+
+
+class ReadRoutingSession(Session):
+    """Flask-SQLAlchemy session that runs on the read-only engine while read_only_session() flagged it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(READ_ONLY_BIND) and READ_ONLY_BIND in self._db.engines:
+            return self._db.engines[READ_ONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only_session(session):
+    """Routes the (request-scoped) session to the read-only engine until it is removed at the end of the request."""
+    session.info[READ_ONLY_BIND] = True
+    return session
+
+
+def read_only_uri(database_uri):
+    """The SQLite URI database_uri opened read-only (mode=ro), or None for in-memory and non-SQLite databases."""
+    url = make_url(database_uri)
+    if not url.drivername.startswith("sqlite") or url.database in (None, "", ":memory:") or url.query.get("uri"):
+        return None
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+
+def is_database_busy(error):
+    return isinstance(error, OperationalError) and any(message in str(error.orig) for message in ("database is locked", "database is busy"))
+
+
+def apply_pragmas(engine, pragmas, read_only=False):
+    """Runs pragmas on every new connection of engine; read-only connections also get query_only."""
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if not (read_only and name in WRITER_ONLY_PRAGMAS):
+                cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def init_storage(app, db, mode="default", pool_size=DEFAULT_POOL_SIZE):
+    """
+    db.init_app(app) with the engines set up for the given storage mode (see STORAGE_MODES). Only configures:
+    no connection is opened until prepare_storage() or the first query.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown SQLite storage mode '{mode}'; expected one of {', '.join(STORAGE_MODES)}.")
+    pragmas = STORAGE_MODES[mode]
+    ro_uri = read_only_uri(app.config["SQLALCHEMY_DATABASE_URI"]) if pragmas else None
+    if ro_uri:
+        engine_options = {"pool_size": pool_size, "max_overflow": pool_size,
+                          "connect_args": {"timeout": pragmas["busy_timeout"] / 1000}}
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options, **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+        app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), READ_ONLY_BIND: {"url": ro_uri, **engine_options}}
+    db.init_app(app)
+    if not ro_uri:
+        return
+    with app.app_context():
+        apply_pragmas(db.engine, pragmas)
+        apply_pragmas(db.engines[READ_ONLY_BIND], pragmas, read_only=True)
+
+
+def prepare_storage(app, db):
+    """
+    Opens one writer connection, which creates the database file and switches it to WAL, so read-only connections
+    (which cannot do either) can open it. Call at start-up, before the first read-only query; repeating it is harmless.
+    """
+    with app.app_context():
+        with db.engine.connect():
+            pass
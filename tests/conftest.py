@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The scraper modules live at the project root and src/ imports them as top-level modules, as the app does.
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from flask import Flask
+
+from src.models.models import db
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """db.session of a Flask app on a fresh SQLite file with all tables created."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'products.db'}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.engine.dispose()
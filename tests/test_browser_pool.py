@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+import browser_pool
+from browser_pool import BrowserPool, PooledBrowser
+
+
+class FakeBrowser:
+    def __init__(self, connected=True):
+        self.connected = connected
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePage:
+    def is_closed(self):
+        return False
+
+    async def evaluate(self, expression):
+        return 1
+
+
+class FakeRouter:
+    installed = False
+    rate_limiter = None
+
+
+class FakeContext:
+    def __init__(self, page):
+        self.pages = [page]
+
+
+def pooled_browser(browser_id, connected=True):
+    page = FakePage()
+    return PooledBrowser(browser_id, FakeBrowser(connected), FakeContext(page), page, FakeRouter())
+
+
+def failing_pool(size, max_runs_per_browser=25, connected=True):
+    """A started pool of fake browsers whose relaunches always fail."""
+    pool = BrowserPool("unused.json", size=size, max_runs_per_browser=max_runs_per_browser)
+    for browser_id in range(1, size + 1):
+        pool._idle.put_nowait(pooled_browser(browser_id, connected))
+
+    async def launch():
+        raise RuntimeError("Chromium did not start")
+
+    pool._launch = launch
+    return pool
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(browser_pool, "RELAUNCH_BACKOFF_SECONDS", 0)
+
+
+def test_failed_replacement_of_an_unhealthy_browser_raises_instead_of_hanging():
+    async def run():
+        pool = failing_pool(size=1, connected=False)
+        with pytest.raises(RuntimeError, match="could not replace"):
+            async with pool.lease():
+                pass
+        with pytest.raises(RuntimeError, match="no browsers left"):
+            await asyncio.wait_for(pool.lease().__aenter__(), timeout=1)
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.size == 0
+    assert pool.stats["relaunch_failures"] == browser_pool.RELAUNCH_ATTEMPTS
+    assert pool.stats["slots_dropped"] == 1
+
+
+def test_failed_recycle_wakes_leases_waiting_on_the_emptied_pool():
+    async def run():
+        pool = failing_pool(size=1, max_runs_per_browser=1)
+        waiter_errors = []
+
+        async def waiting_lease():
+            try:
+                async with pool.lease():
+                    pass
+            except RuntimeError as e:
+                waiter_errors.append(str(e))
+
+        async with pool.lease():
+            waiter = asyncio.create_task(waiting_lease())
+            await asyncio.sleep(0)
+        await asyncio.wait_for(waiter, timeout=1)
+        return pool, waiter_errors
+
+    pool, waiter_errors = asyncio.run(run())
+    assert pool.size == 0
+    assert waiter_errors == ["BrowserPool has no browsers left; every relaunch failed."]
+
+
+def test_failed_recycle_shrinks_the_pool_and_keeps_serving_from_the_rest():
+    async def run():
+        pool = failing_pool(size=2, max_runs_per_browser=1)
+        async with pool.lease() as first:
+            pass
+        async with pool.lease() as second:
+            pass
+        return pool, first, second
+
+    pool, first, second = asyncio.run(run())
+    assert first.browser_id != second.browser_id
+    assert pool.size == 0
+    assert pool.stats["slots_dropped"] == 2
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from src.bulk_loader import bulk_load_products
+from src.models.models import Product
+
+
+def scraped(product_id, price="$1.00", **fields):
+    return {"name": f"Product {product_id}", "product_url": f"https://www.alibaba.com/product-detail/Item_{product_id}.html?spm=x",
+            "image_url": f"https://s.alicdn.com/{product_id}.jpg", "price": price, "alibaba_category": "Tools", **fields}
+
+
+def test_initial_load_then_reload_counts_inserted_updated_unchanged(db_session):
+    stats = bulk_load_products(db_session, [scraped(1600000000001), scraped(1600000000002), scraped(1600000000003)], chunk_size=2)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"], stats["chunks"]) == (3, 0, 0, 2)
+
+    stats = bulk_load_products(db_session, [scraped(1600000000001), scraped(1600000000002, price="$2.00"), scraped(1600000000004)], chunk_size=2)
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 1)
+    assert db_session.query(Product).count() == 4
+    assert db_session.query(Product).filter_by(alibaba_product_id="1600000000002").one().price == "$2.00"
+
+
+def test_rows_are_stored_canonical_and_duplicates_in_one_load_are_collapsed(db_session):
+    stats = bulk_load_products(db_session, [scraped(1600000000001), scraped(1600000000001, price="$9.00"), {"name": "No URL"}])
+    assert (stats["inserted"], stats["skipped"]) == (1, 1)
+    product = db_session.query(Product).one()
+    assert product.product_url == "https://www.alibaba.com/product-detail/Item_1600000000001.html"
+    assert product.alibaba_product_id == "1600000000001"
+    assert product.price == "$9.00"  # The last record wins
+
+
+def test_rows_resolving_to_one_stored_product_are_counted_once(db_session):
+    legacy_url = "https://www.alibaba.com/showroom/desk-lamp.html"
+    db_session.add(Product(name="Legacy", product_url=legacy_url, alibaba_product_id="1600000000001", price="$1.00"))
+    db_session.commit()
+
+    # Different dedupe keys (the product ID, the ID-less legacy URL), same stored row.
+    by_url = {"name": "Desk lamp", "product_url": legacy_url, "image_url": "https://s.alicdn.com/1.jpg", "price": "$3.00"}
+    stats = bulk_load_products(db_session, [scraped(1600000000001, price="$2.00"), by_url])
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 1, 0)
+    product = db_session.query(Product).one()
+    assert (product.product_url, product.price) == (legacy_url, "$3.00")
+
+
+def test_existing_row_under_an_older_url_is_updated_in_place(db_session):
+    old = datetime.utcnow() - timedelta(days=3)
+    db_session.add(Product(name="Legacy", product_url="https://www.alibaba.com/product-detail/Old-Slug_1600000000001.html?spm=1",
+                           alibaba_product_id="1600000000001", price="$1.00", arrival_date=old, last_scraped_date=old, is_active=False))
+    db_session.commit()
+
+    stats = bulk_load_products(db_session, [scraped(1600000000001)])
+    assert (stats["inserted"], stats["updated"]) == (0, 1)
+    product = db_session.query(Product).one()
+    assert product.product_url.endswith("Old-Slug_1600000000001.html?spm=1")
+    assert product.is_active
+    assert product.arrival_date == old
+    assert product.last_scraped_date > old
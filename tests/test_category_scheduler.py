@@ -0,0 +1,79 @@
+import pytest
+
+from category_scheduler import DEFAULT_SCHEDULE_POLICY, CategoryScheduler, plan_next_visit
+
+T0 = 1_760_000_000.0
+HOUR = 3600
+TARGET_URL = "https://www.alibaba.com/new-arrivals"
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return CategoryScheduler.load(str(tmp_path / "schedule.json"), TARGET_URL)
+
+
+def two_visits(scheduler, new_products, hours_apart, records_seen=100, reached_budget=False):
+    """A first visit at T0 and a second one hours_apart later that found new_products; returns the category state."""
+    scheduler.record_visit("Lamps", 10, 50, records_seen, 30, now=T0)
+    scheduler.record_visit("Lamps", 10, new_products, records_seen, 30, reached_budget=reached_budget, now=T0 + hours_apart * HOUR)
+    return scheduler.state["categories"]["Lamps"]
+
+
+def test_first_visit_gets_max_passes_and_the_min_interval(scheduler):
+    assert scheduler.scroll_budget("Lamps") == DEFAULT_SCHEDULE_POLICY["max_scroll_passes"]
+    scheduler.record_visit("Lamps", 10, 50, 100, 30, now=T0)
+    category = scheduler.state["categories"]["Lamps"]
+    assert category["arrival_rate_per_hour"] is None
+    assert category["interval_hours"] == DEFAULT_SCHEDULE_POLICY["min_interval_hours"]
+    assert scheduler.scroll_budget("Lamps") == DEFAULT_SCHEDULE_POLICY["max_scroll_passes"]
+
+
+def test_zero_arrival_rate_gets_the_max_interval_and_min_passes(scheduler):
+    category = two_visits(scheduler, new_products=0, hours_apart=10)
+    assert category["arrival_rate_per_hour"] == 0
+    assert category["interval_hours"] == DEFAULT_SCHEDULE_POLICY["max_interval_hours"]
+    assert category["scroll_budget"] == DEFAULT_SCHEDULE_POLICY["min_scroll_passes"]
+
+
+def test_interval_targets_the_new_products_per_visit(scheduler):
+    category = two_visits(scheduler, new_products=40, hours_apart=10)  # 4 new per hour
+    assert category["interval_hours"] == 10
+    assert category["scroll_budget"] == 4 + DEFAULT_SCHEDULE_POLICY["pass_margin"]  # 40 arrivals at 10 records per pass
+
+
+def test_reaching_the_budget_halves_the_interval_and_restores_max_passes(scheduler):
+    category = two_visits(scheduler, new_products=40, hours_apart=10, reached_budget=True)
+    assert category["interval_hours"] == 5
+    assert category["scroll_budget"] == DEFAULT_SCHEDULE_POLICY["max_scroll_passes"]
+    assert category["visits"][-1]["reached_budget"] is True
+
+
+def test_interval_and_budget_are_clamped():
+    policy = DEFAULT_SCHEDULE_POLICY
+    assert plan_next_visit(4000, 10, False, policy) == (policy["min_interval_hours"], policy["max_scroll_passes"])
+    assert plan_next_visit(0.01, 10, False, policy) == (policy["max_interval_hours"], policy["min_scroll_passes"])
+    # Halving never goes below the min interval.
+    assert plan_next_visit(4000, 10, True, policy)[0] == policy["min_interval_hours"]
+
+
+def test_is_due_follows_the_interval_and_summary_reports_skips(scheduler):
+    scheduler.record_visit("Lamps", 10, 50, 100, 30, now=T0)
+    scheduler.record_visit("Cups", 10, 50, 100, 90, now=T0)
+
+    assert scheduler.is_due("Lamps", now=T0 + 1 * HOUR) is False
+    assert scheduler.is_due("Cups", now=T0 + 2 * HOUR) is True
+    assert scheduler.is_due("Never visited", now=T0) is True
+    assert scheduler.next_due_in_hours("Lamps", now=T0 + 1 * HOUR) == 1
+
+    summary = scheduler.summary()
+    assert summary["due"] == ["Cups", "Never visited"]
+    assert summary["skipped"] == ["Lamps"]
+    assert summary["estimated_seconds_saved"] == 30
+    assert summary["categories"]["Lamps"]["interval_hours"] == DEFAULT_SCHEDULE_POLICY["min_interval_hours"]
+
+
+def test_schedule_is_saved_per_target_url(scheduler, tmp_path):
+    scheduler.record_visit("Lamps", 10, 50, 100, 30, now=T0)
+    reloaded = CategoryScheduler.load(str(tmp_path / "schedule.json"), TARGET_URL)
+    assert reloaded.state == scheduler.state
+    assert CategoryScheduler.load(str(tmp_path / "schedule.json"), "https://www.alibaba.com/other").state["categories"] == {}
@@ -0,0 +1,38 @@
+import json
+import os
+
+import scraper
+
+FEED_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "feed", "category_0_page_1.json")
+
+
+def test_parse_feed_payload_json_and_jsonp():
+    assert scraper.parse_feed_payload('{"a": 1}') == {"a": 1}
+    assert scraper.parse_feed_payload('mtopjsonp3({"a": [1, 2]});') == {"a": [1, 2]}
+    assert scraper.parse_feed_payload("<html></html>") is None
+    assert scraper.parse_feed_payload("") is None
+
+
+def test_find_feed_products_maps_aliases_and_skips_non_products():
+    payload = {"data": {"items": [
+        {"title": "Lamp", "detailUrl": "//www.alibaba.com/product-detail/Lamp_1600000000001.html", "picUrl": ["//s.alicdn.com/a.jpg"],
+         "price": {"formatPrice": "US$1.50"}},
+        {"title": "Banner", "url": "https://www.alibaba.com/promotion.html"},
+        {"nested": [{"subject": "Cup", "productUrl": "https://www.alibaba.com/product-detail/Cup_1600000000002.html", "price": 3}]},
+    ]}}
+    records = scraper.find_feed_products(payload)
+    assert [record["name"] for record in records] == ["Lamp", "Cup"]
+    assert records[0]["image_url"] == "//s.alicdn.com/a.jpg"
+    assert records[0]["price"] == "US$1.50"
+    assert records[1]["price"] == "$3"
+
+
+def test_feed_fixture_builds_canonical_product_records():
+    with open(FEED_FIXTURE, "r", encoding="utf-8") as f:
+        raw_records = scraper.find_feed_products(json.load(f))
+    assert raw_records
+    product = scraper.build_product_record(raw_records[0], "Consumer Electronics", scraper.TARGET_URL)
+    assert product["product_url"] == "https://www.alibaba.com/product-detail/5000mah-10000mah-20W-Wireless-Magnetic-Power_11000023994216.html"
+    assert product["alibaba_product_id"] == "11000023994216"
+    assert product["image_url"].startswith("https://")
+    assert product["alibaba_category"] == "Consumer Electronics"
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+
+import product_urls
+from src.bulk_loader import bulk_load_products
+from src.ingest_manifest import IngestManifest
+from src.models.models import DatabaseIdentity, Product
+
+
+def product(product_id, price="$1.00"):
+    return {"name": f"Product {product_id}", "product_url": f"https://www.alibaba.com/product-detail/Item_{product_id}.html", "price": price}
+
+
+def write_jsonl(path, products, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for item in products:
+            f.write(json.dumps(item) + "\n")
+
+
+def load(session, manifest_path, paths, commit=True):
+    """Loads the changed products of paths like load_scraped_data_to_db; returns their product IDs and the manifest stats."""
+    with IngestManifest(str(manifest_path), session) as manifest:
+        products = list(manifest.iter_changed_products([str(path) for path in paths]))
+        if commit:
+            bulk_load_products(session, products)
+            manifest.commit()
+        else:
+            manifest.discard()
+        return [product_urls.extract_product_id(item["product_url"]) for item in products], manifest.stats
+
+
+def test_unchanged_file_is_skipped(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001), product(1600000000002)])
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000001, 1600000000002]
+
+    loaded, stats = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path, tmp_path / "missing.json"])
+    assert loaded == []
+    assert stats["files_unchanged"] == 1
+
+
+def test_appended_jsonl_is_read_from_the_stored_offset_and_a_partial_line_waits(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001)])
+    load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+
+    write_jsonl(jsonl_path, [product(1600000000002)], mode="a")
+    with open(jsonl_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(product(1600000000003))[:20])  # A write still in progress
+    loaded, stats = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000002]
+    assert (stats["files_appended"], stats["records_read"]) == (1, 1)
+
+    with open(jsonl_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(product(1600000000003))[20:] + "\n")
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000003]
+
+
+def test_rewritten_json_array_only_passes_on_changed_records(db_session, tmp_path):
+    json_path = tmp_path / "products.json"
+    json_path.write_text(json.dumps([product(1600000000001), product(1600000000002)]), encoding="utf-8")
+    load(db_session, tmp_path / "manifest.sqlite", [json_path])
+
+    json_path.write_text(json.dumps([product(1600000000001), product(1600000000002, price="$22.00"), product(1600000000003)]), encoding="utf-8")
+    loaded, stats = load(db_session, tmp_path / "manifest.sqlite", [json_path])
+    assert loaded == [1600000000002, 1600000000003]
+    assert (stats["files_reread"], stats["records_unchanged"]) == (1, 1)
+
+
+def test_discarded_load_is_retried(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001)])
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path], commit=False)
+    assert loaded == [1600000000001]
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000001]
+
+
+def test_clear_forgets_everything(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001)])
+    load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    with IngestManifest(str(tmp_path / "manifest.sqlite"), db_session) as manifest:
+        manifest.clear()
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000001]
+
+
+def test_manifest_of_another_database_starts_over(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001)])
+    load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+
+    # A deleted or replaced database file: new identity, no products.
+    db_session.query(Product).delete()
+    db_session.query(DatabaseIdentity).delete()
+    db_session.commit()
+    loaded, stats = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000001]
+    assert stats["files_reread"] == 1
+
+
+def test_unchanged_record_no_longer_stored_is_reloaded(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001), product(1600000000002)])
+    load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    db_session.query(Product).filter_by(alibaba_product_id="1600000000001").delete()  # e.g. archived
+    db_session.commit()
+
+    write_jsonl(jsonl_path, [product(1600000000002), product(1600000000001)])  # Rewritten by the next scrape
+    loaded, stats = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000001]
+    assert (stats["records_unchanged"], stats["records_reloaded"]) == (1, 1)
+    assert db_session.query(Product).count() == 2
+
+
+def test_unchanged_records_refresh_last_scraped_date(db_session, tmp_path):
+    jsonl_path = tmp_path / "products.jsonl"
+    write_jsonl(jsonl_path, [product(1600000000001)])
+    load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    stale = datetime.utcnow() - timedelta(days=40)
+    db_session.query(Product).update({"last_scraped_date": stale})
+    db_session.commit()
+
+    write_jsonl(jsonl_path, [product(1600000000002)], mode="a")
+    write_jsonl(jsonl_path, [product(1600000000001)], mode="a")  # Listed again, unchanged
+    loaded, _ = load(db_session, tmp_path / "manifest.sqlite", [jsonl_path])
+    assert loaded == [1600000000002]
+    assert db_session.query(Product).filter_by(alibaba_product_id="1600000000001").one().last_scraped_date > stale
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timedelta
+
+from src.bulk_loader import bulk_load_products
+from src.ingest_manifest import IngestManifest
+from src.models.models import ArchivedProduct, Product, UserFavorite
+from src.product_archive import archive_stale_products, compact_database, lookup_archived_products
+
+NOW = datetime(2026, 1, 31)
+
+
+def add_product(session, product_id, days_since_scraped):
+    scraped_at = NOW - timedelta(days=days_since_scraped)
+    product = Product(name=f"Lamp {product_id} " + "x" * 500, product_url=f"https://www.alibaba.com/product-detail/Lamp_{product_id}.html",
+                      alibaba_product_id=str(product_id), arrival_date=scraped_at, last_scraped_date=scraped_at)
+    session.add(product)
+    session.flush()
+    return product
+
+
+def test_stale_products_move_and_referenced_ones_are_only_deactivated(db_session):
+    fresh = add_product(db_session, 1600000000001, 2)
+    add_product(db_session, 1600000000002, 40)
+    favorited = add_product(db_session, 1600000000003, 40)
+    db_session.add(UserFavorite(product_id=favorited.id))
+    db_session.commit()
+
+    assert archive_stale_products(db_session, 30, now=NOW) == {"archived": 1, "deactivated": 1}
+    assert {product.id for product in db_session.query(Product)} == {fresh.id, favorited.id}
+    assert db_session.get(Product, favorited.id).is_active is False
+    archived = db_session.query(ArchivedProduct).one()
+    assert (archived.alibaba_product_id, archived.archived_date) == ("1600000000002", NOW)
+
+    assert archive_stale_products(db_session, 30, now=NOW) == {"archived": 0, "deactivated": 0}
+
+
+def test_rearchiving_a_url_replaces_its_archive_copy(db_session):
+    add_product(db_session, 1600000000001, 40)
+    db_session.commit()
+    archive_stale_products(db_session, 30, now=NOW)
+    add_product(db_session, 1600000000001, 35)  # Scraped again, then gone stale again
+    db_session.commit()
+
+    assert archive_stale_products(db_session, 30, now=NOW)["archived"] == 1
+    archived = db_session.query(ArchivedProduct).one()
+    assert archived.last_scraped_date == NOW - timedelta(days=35)
+
+
+def test_product_still_listed_unchanged_is_not_archived(db_session, tmp_path):
+    listing = tmp_path / "products.jsonl"
+    lamp = json.dumps({"name": "Desk lamp", "product_url": "https://www.alibaba.com/product-detail/Lamp_1600000000001.html", "price": "$1.00"})
+
+    def scrape_and_load():
+        with open(listing, "a", encoding="utf-8") as f:
+            f.write(lamp + "\n")
+        with IngestManifest(str(tmp_path / "manifest.sqlite"), db_session) as manifest:
+            bulk_load_products(db_session, manifest.iter_changed_products([str(listing)]))
+            manifest.commit()
+
+    scrape_and_load()
+    db_session.query(Product).update({"last_scraped_date": datetime.utcnow() - timedelta(days=40)})
+    db_session.commit()
+    scrape_and_load()  # Listed again, unchanged: skipped by the manifest
+
+    assert archive_stale_products(db_session, 30) == {"archived": 0, "deactivated": 0}
+    assert db_session.query(Product).count() == 1
+
+
+def test_lookup_archived_products(db_session):
+    for product_id in (1600000000001, 1600000000002, 1600000000003):
+        add_product(db_session, product_id, 40)
+    db_session.commit()
+    archive_stale_products(db_session, 30, now=NOW)
+
+    assert len(lookup_archived_products(db_session, query="LAMP 16")) == 3
+    assert [p.alibaba_product_id for p in lookup_archived_products(db_session, alibaba_product_id="1600000000002")] == ["1600000000002"]
+    assert lookup_archived_products(db_session, product_url="https://www.alibaba.com/product-detail/Lamp_1600000000001.html")
+    assert len(lookup_archived_products(db_session, limit=2)) == 2
+
+
+def test_compact_database_vacuums_once_enough_pages_are_free(db_session):
+    for product_id in range(1600000000000, 1600000002000):
+        add_product(db_session, product_id, 40)
+    db_session.commit()
+    assert compact_database(db_session.get_bind()) is None  # Nothing freed yet
+
+    for product_id in range(1600000000000, 1600000002000):
+        add_product(db_session, product_id + 10000, 1)
+    db_session.commit()
+    archive_stale_products(db_session, 30, now=NOW)
+    db_session.query(ArchivedProduct).delete()
+    db_session.commit()
+    assert compact_database(db_session.get_bind()) > 0
+    assert compact_database(db_session.get_bind()) is None
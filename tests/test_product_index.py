@@ -0,0 +1,108 @@
+import json
+import sqlite3
+
+import pytest
+
+from product_index import BloomFilter, KnownProductIndex, open_known_product_index
+
+
+def product_url(product_id, slug="Item"):
+    return f"https://www.alibaba.com/product-detail/{slug}_{product_id}.html"
+
+
+def test_seeds_from_json_and_jsonl_once(tmp_path):
+    json_path, jsonl_path = tmp_path / "products.json", tmp_path / "products.jsonl"
+    json_path.write_text(json.dumps([{"product_url": product_url(1600000000001)}, {"name": "No URL"}]), encoding="utf-8")
+    jsonl_path.write_text(json.dumps({"product_url": "https://www.alibaba.com/showroom/lamp.html"}) + "\n", encoding="utf-8")
+
+    index = open_known_product_index(str(tmp_path / "index.sqlite"), [str(json_path), str(jsonl_path)])
+    assert index.is_seeded()
+    assert len(index) == 2
+    assert product_url(1600000000001) in index
+    assert "https://www.alibaba.com/showroom/lamp.html" in index
+    index.close()
+
+    jsonl_path.write_text(json.dumps({"product_url": product_url(1600000000002)}) + "\n", encoding="utf-8")
+    with open_known_product_index(str(tmp_path / "index.sqlite"), [str(json_path), str(jsonl_path)]) as index:
+        assert len(index) == 2  # Already seeded: kept current by the scraper, not re-read
+
+
+def test_failed_seed_closes_the_index_and_is_retried(tmp_path, monkeypatch):
+    json_path = tmp_path / "products.json"
+    json_path.write_text('[{"product_url": "' + product_url(1600000000001) + '"}, {"product_url": ', encoding="utf-8")
+    closed = []
+    original_close = KnownProductIndex.close
+
+    def recording_close(self):
+        closed.append(self.path)
+        original_close(self)
+
+    monkeypatch.setattr(KnownProductIndex, "close", recording_close)
+
+    with pytest.raises(json.JSONDecodeError):
+        open_known_product_index(str(tmp_path / "index.sqlite"), [str(json_path)])
+    assert closed == [str(tmp_path / "index.sqlite")]
+
+    json_path.write_text(json.dumps([{"product_url": product_url(1600000000001)}]), encoding="utf-8")
+    with open_known_product_index(str(tmp_path / "index.sqlite"), [str(json_path)]) as index:
+        assert index.is_seeded() and len(index) == 1
+
+
+def test_membership_uses_the_dedupe_key(tmp_path):
+    with KnownProductIndex(str(tmp_path / "index.sqlite")) as index:
+        index.add(product_url(1600000000001) + "?spm=a2700.new_arrivals")
+        index.add("https://www.alibaba.com/showroom/lamp.html?spm=1")
+        assert "//m.alibaba.com/product-detail/Other-Slug_1600000000001.html" in index
+        assert "https://www.alibaba.com/showroom/lamp.html#reviews" in index
+        assert product_url(1600000000002) not in index
+        assert len(index) == 2
+        assert index.stats["hits"] == 2
+
+
+def test_read_only_index_answers_lookups_but_cannot_write(tmp_path):
+    with KnownProductIndex(str(tmp_path / "index.sqlite")) as index:
+        index.add(product_url(1600000000001))
+
+    with KnownProductIndex(str(tmp_path / "index.sqlite"), read_only=True) as index:
+        assert product_url(1600000000001) in index
+        with pytest.raises(sqlite3.OperationalError):
+            index.add(product_url(1600000000002))
+
+
+def test_adds_are_committed_every_commit_every(tmp_path):
+    index = KnownProductIndex(str(tmp_path / "index.sqlite"), commit_every=2).open()
+    reader = KnownProductIndex(str(tmp_path / "index.sqlite"), read_only=True).open()
+    index.add(product_url(1600000000001))
+    assert product_url(1600000000001) not in reader
+    index.add(product_url(1600000000002))
+    assert product_url(1600000000001) in reader and product_url(1600000000002) in reader
+    reader.close()
+    index.close()
+
+
+def test_bloom_filter_is_persisted_on_close_and_rebuilt_after_a_crash(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    with KnownProductIndex(path, use_bloom_filter=True, bloom_capacity=1000) as index:
+        index.add(product_url(1600000000001))
+        assert product_url(1600000000002) not in index
+        assert index.stats["bloom_negatives"] == 1
+
+    crashed = KnownProductIndex(path, use_bloom_filter=True, bloom_capacity=1000).open()
+    assert product_url(1600000000001) in crashed  # From the stored bits
+    crashed.add(product_url(1600000000002))
+    crashed.commit()
+    crashed._connection.close()  # Never closed cleanly: the stored bits lack the second product
+
+    with KnownProductIndex(path, use_bloom_filter=True, bloom_capacity=1000) as index:
+        assert product_url(1600000000002) in index
+        assert index.stats["bloom_negatives"] == 0
+
+
+def test_bloom_filter_has_no_false_negatives_and_rejects_foreign_bits():
+    bloom = BloomFilter(1000)
+    for product_id in range(1000):
+        bloom.add(product_id)
+    assert all(product_id in bloom for product_id in range(1000))
+    assert sum(product_id in bloom for product_id in range(1000, 11000)) < 100
+    with pytest.raises(ValueError):
+        BloomFilter(1000, bits=bytearray(16))
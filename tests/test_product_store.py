@@ -0,0 +1,45 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import product_store
+
+MIXED_ARRAY = '[1, 2.5, {"c":[1,2]}, "s", true, null, -3e-2, [], {"d": "x]"}]'
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 5, 6, 7, 16, 4096])
+def test_iter_json_array_matches_json_loads_across_chunk_sizes(chunk_chars):
+    assert list(product_store.iter_json_array(io.StringIO(MIXED_ARRAY), chunk_chars)) == json.loads(MIXED_ARRAY)
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 2, 3, 4096])
+@pytest.mark.parametrize("text", ['[{"a":1},]', "[1 2]", "[1,,2]", "[,1]", "[1", "{}", "[1.]"])
+def test_iter_json_array_rejects_malformed_arrays(text, chunk_chars):
+    with pytest.raises(json.JSONDecodeError):
+        list(product_store.iter_json_array(io.StringIO(text), chunk_chars))
+
+
+def test_iter_json_array_caps_the_pending_buffer():
+    small, large = '{"name": "%s"}' % ("x" * 50), '{"name": "%s"}' % ("x" * 500)
+    assert len(list(product_store.iter_json_array(io.StringIO(f"[{small}, {small}]"), 16, max_pending_chars=100))) == 2
+    with pytest.raises(json.JSONDecodeError, match="longer than 100 characters"):
+        list(product_store.iter_json_array(io.StringIO(f"[{small}, {large}]"), 16, max_pending_chars=100))
+    # An unterminated string never completes an element: fails at the cap, not at the end of a huge file.
+    unterminated = io.StringIO('[{"name": "' + "x" * 10000)
+    with pytest.raises(json.JSONDecodeError):
+        list(product_store.iter_json_array(unterminated, 16, max_pending_chars=100))
+    assert unterminated.tell() < 200
+
+
+def test_iter_json_array_empty_array():
+    assert list(product_store.iter_json_array(io.StringIO(" [ ]\n"), 1)) == []
+
+
+def test_iter_products_reads_gzip_json_array(tmp_path):
+    products = [{"product_url": f"https://www.alibaba.com/product-detail/Item_{i}.html", "name": f"Item {i}"} for i in range(50)]
+    path = tmp_path / "products.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(products, f, indent=2)
+    assert list(product_store.iter_products(str(path))) == products
@@ -0,0 +1,40 @@
+import pytest
+
+import product_urls
+
+CANONICAL = "https://www.alibaba.com/product-detail/Wireless-Charger_1600123456789.html"
+
+
+@pytest.mark.parametrize("url", [
+    CANONICAL,
+    "//www.alibaba.com/product-detail/Wireless-Charger_1600123456789.html",
+    "http://www.alibaba.com/product-detail/Wireless-Charger_1600123456789.html?spm=a2700.1&s=p#reviews",
+    "https://m.alibaba.com/product-detail/Wireless-Charger_1600123456789.html",
+    "  https://WWW.ALIBABA.COM//product-detail/Wireless-Charger_1600123456789.html  ",
+])
+def test_product_detail_urls_canonicalise_to_one_form(url):
+    assert product_urls.canonicalize_product_url(url) == CANONICAL
+    assert product_urls.product_dedupe_key(url) == 1600123456789
+
+
+def test_urls_without_an_id_keep_path_and_non_tracking_query():
+    url = "https://sale.alibaba.com/p/new-arrivals?spm=x&utm_source=mail&tab=3"
+    assert product_urls.canonicalize_product_url(url) == "https://sale.alibaba.com/p/new-arrivals?tab=3"
+    assert product_urls.product_dedupe_key(url) == "https://sale.alibaba.com/p/new-arrivals?tab=3"
+
+
+def test_different_slugs_of_one_product_share_a_dedupe_key():
+    assert product_urls.product_dedupe_key("https://www.alibaba.com/product-detail/Old-Title_1600123456789.html") == \
+        product_urls.product_dedupe_key("https://www.alibaba.com/product-detail/New-Title_1600123456789.html?spm=1")
+
+
+def test_canonicalize_product_fills_in_the_product_id():
+    product = {"name": "Charger", "product_url": "//www.alibaba.com/product-detail/Wireless-Charger_1600123456789.html?spm=1"}
+    canonical = product_urls.canonicalize_product(product)
+    assert canonical == {"name": "Charger", "product_url": CANONICAL, "alibaba_product_id": "1600123456789"}
+    assert product["product_url"].startswith("//")  # The input is not modified
+
+
+def test_empty_urls():
+    assert product_urls.canonicalize_product_url("") is None
+    assert product_urls.extract_product_id(None) is None
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+import scraper
+
+
+@pytest.fixture
+def router():
+    return scraper.RequestRouter(scraper.RESOURCE_BLOCKING_POLICY)
+
+
+def request(url, resource_type="script"):
+    return SimpleNamespace(url=url, resource_type=resource_type)
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.googletagmanager.com/gtm.js?id=GTM-XXXX",
+    "https://www.google-analytics.com/analytics.js",
+    "https://g.alicdn.com/alilog/mlog/aplus/beacon/aplus.js",
+])
+def test_tracking_scripts_are_blocked_even_though_they_are_js(router, url):
+    assert router.should_block(request(url))
+
+
+@pytest.mark.parametrize("url", [
+    "https://s.alicdn.com/@g/code/npm/@alife/new-arrivals/index.js",
+    "https://assets.alibaba.com/app/main.js?v=3",
+])
+def test_alibaba_scripts_are_allowed(router, url):
+    assert not router.should_block(request(url))
+
+
+def test_allowlist_overrides_blocked_resource_types_for_the_product_feed_only(router):
+    assert not router.should_block(request("https://acs.h.alibaba.com/h5/mtop.alibaba.newarrivals/1.0/", resource_type="media"))
+    assert router.should_block(request("https://s.alicdn.com/@img/H1.jpg", resource_type="image"))
+    assert router.should_block(request("https://cdn.example.com/fonts/icons.js.woff2", resource_type="font"))
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+import run_tracing
+from run_tracing import RunTracer
+
+
+class FakeConnection:
+    def _send_message_to_server(self, method, params):
+        return method
+
+
+@pytest.fixture
+def fake_connection(monkeypatch):
+    monkeypatch.setattr(run_tracing, "_PlaywrightConnection", FakeConnection)
+    monkeypatch.setattr(run_tracing, "_original_send_message", None)
+    monkeypatch.setattr(FakeConnection, "_send_message_to_server", FakeConnection._send_message_to_server)
+    return FakeConnection()
+
+
+def test_protocol_calls_are_counted_per_span(fake_connection):
+    tracer = RunTracer("test")
+    with tracer.counting_protocol_calls():
+        fake_connection._send_message_to_server("Page.navigate", {})
+        with tracer.span("scroll"):
+            fake_connection._send_message_to_server("Runtime.evaluate", {})
+            fake_connection._send_message_to_server("Runtime.evaluate", {})
+    fake_connection._send_message_to_server("Runtime.evaluate", {})  # After the block: not counted
+
+    report = tracer.report()
+    assert report["protocol_calls"] == 3
+    assert report["phases"]["scroll"]["protocol_calls"] == 2
+    assert report["spans"][0]["protocol_calls"] == 2
+
+
+def test_protocol_calls_are_null_when_the_connection_cannot_be_hooked(monkeypatch):
+    monkeypatch.setattr(run_tracing, "_PlaywrightConnection", type("MovedConnection", (), {}))
+    monkeypatch.setattr(run_tracing, "_original_send_message", None)
+    tracer = RunTracer("test")
+    with tracer.counting_protocol_calls():
+        with tracer.span("scroll"):
+            pass
+
+    report = json.loads(json.dumps(tracer.report()))
+    assert tracer.protocol_calls_counted is False
+    assert report["protocol_calls"] is None
+    assert report["phases"]["scroll"]["protocol_calls"] is None
+    assert report["spans"][0]["protocol_calls"] is None
+
+
+def test_prometheus_text_has_types_escaped_labels_and_inf_buckets():
+    tracer = RunTracer('shard "1"', histogram_buckets=(1, 5))
+    with tracer.span("scroll"):
+        pass
+    tracer.count("products_new", 3, category='Home & "Garden"\\Tools\nOutdoor')
+    tracer.observe("settle_seconds", 0.5, phase="scroll")
+    tracer.observe("settle_seconds", 7, phase="scroll")
+    lines = tracer.prometheus_text().splitlines()
+
+    assert "# TYPE scraper_run_duration_seconds gauge" in lines
+    assert "# TYPE scraper_products_new_total counter" in lines
+    assert "# TYPE scraper_settle_seconds histogram" in lines
+    assert 'scraper_products_new_total{run="shard \\"1\\"",category="Home & \\"Garden\\"\\\\Tools\\nOutdoor"} 3' in lines
+    assert 'scraper_settle_seconds_bucket{run="shard \\"1\\"",phase="scroll",le="1"} 1' in lines
+    assert 'scraper_settle_seconds_bucket{run="shard \\"1\\"",phase="scroll",le="5"} 1' in lines
+    assert 'scraper_settle_seconds_bucket{run="shard \\"1\\"",phase="scroll",le="+Inf"} 2' in lines
+    assert 'scraper_settle_seconds_count{run="shard \\"1\\"",phase="scroll"} 2' in lines
+    assert any(line.startswith('scraper_phase_seconds{run="shard \\"1\\"",phase="scroll"} ') for line in lines)
+    # Every sample follows the TYPE line of its metric family.
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(families) == len(set(families))
+
+
+def test_report_and_metrics_files_are_written(tmp_path):
+    tracer = RunTracer("shard_2")
+    report_path = tracer.write_report(str(tmp_path / "reports"))
+    assert os.path.basename(report_path).startswith("run_report_")
+    assert json.loads(open(report_path, encoding="utf-8").read())["run_name"] == "shard_2"
+    metrics_path = tracer.write_prometheus(str(tmp_path / "metrics.prom"))
+    assert open(metrics_path, encoding="utf-8").read().startswith("# TYPE scraper_run_duration_seconds gauge\n")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["metrics.prom", "reports"]  # No temp files left behind
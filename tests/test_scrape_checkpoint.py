@@ -0,0 +1,51 @@
+import json
+
+import scrape_checkpoint
+
+TARGET_URL = "https://www.alibaba.com/new-arrivals"
+
+
+def test_resume_skips_done_categories_and_fast_forwards_the_partial_one(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL)
+    checkpoint.mark_category_done("Home", 12)
+    checkpoint.record_pass("Tools", 4, 7)
+    checkpoint.record_pass("Tools", 3, 7)  # A late, lower pass count never moves progress back
+
+    resumed = scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL, resume=True)
+    assert resumed.is_category_done("Home")
+    assert not resumed.is_category_done("Tools")
+    assert resumed.passes_completed("Tools") == 4
+    assert resumed.passes_completed("Home") == 0
+    assert resumed.passes_completed("Toys") == 0
+
+
+def test_run_is_only_complete_without_categories_in_progress(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL)
+    checkpoint.record_pass("Tools", 2, 3)
+    assert not checkpoint.mark_run_complete()
+    checkpoint.mark_category_done("Tools", 5)
+    assert checkpoint.mark_run_complete()
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["status"] == "complete"
+
+
+def test_complete_or_foreign_checkpoints_start_fresh(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL)
+    checkpoint.mark_category_done("Home", 1)
+    checkpoint.mark_run_complete()
+    assert scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL, resume=True).state["categories"] == {}
+
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(path, TARGET_URL)
+    checkpoint.mark_category_done("Home", 1)
+    assert scrape_checkpoint.ScrapeCheckpoint.start(path, "https://www.alibaba.com/other", resume=True).state["categories"] == {}
+
+
+def test_unreadable_checkpoint_starts_fresh(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("{not json", encoding="utf-8")
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint.start(str(path), TARGET_URL, resume=True)
+    assert checkpoint.state["status"] == "running"
+    assert checkpoint.state["categories"] == {}
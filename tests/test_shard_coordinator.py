@@ -0,0 +1,39 @@
+from shard_coordinator import enabled_category_groups, plan_shards
+
+URLS = ["https://www.alibaba.com/new-arrivals", "https://www.alibaba.com/new-arrivals?tab=home"]
+TOGGLES = {"All": False, "Home & Garden": True, "Home and Garden": True, "Consumer Electronics": True, "Sports & Entertainment": True,
+           "Beauty": False}
+
+
+def enabled_jobs(shards):
+    """(url, enabled category) pairs across all shards, with repeats."""
+    return [(url, name) for shard in shards for url, toggles in shard for name, enabled in toggles.items() if enabled]
+
+
+def test_aliases_stay_in_one_shard():
+    assert enabled_category_groups(TOGGLES) == [["Consumer Electronics"], ["Home & Garden", "Home and Garden"], ["Sports & Entertainment"]]
+    for shard in plan_shards(URLS, TOGGLES, worker_count=6):
+        for _, toggles in shard:
+            assert toggles["Home & Garden"] == toggles["Home and Garden"]
+
+
+def test_each_enabled_category_appears_exactly_once_per_url():
+    shards = plan_shards(URLS, TOGGLES, worker_count=4)
+    jobs = enabled_jobs(shards)
+    assert len(jobs) == len(set(jobs))
+    assert set(jobs) == {(url, name) for url in URLS for name, enabled in TOGGLES.items() if enabled}
+    assert all(set(toggles) == set(TOGGLES) for shard in shards for _, toggles in shard)
+
+
+def test_worker_count_is_capped_at_the_number_of_jobs():
+    assert len(plan_shards(URLS[:1], TOGGLES, worker_count=10)) == 3
+    assert len(plan_shards(URLS, TOGGLES, worker_count=0)) == 1
+    assert plan_shards(URLS, {"Beauty": False}, worker_count=4) == [[]]
+
+
+def test_plan_is_deterministic():
+    shuffled = dict(reversed(list(TOGGLES.items())))
+    assert plan_shards(URLS, TOGGLES, worker_count=4) == plan_shards(URLS, TOGGLES, worker_count=4)
+    # Toggle order does not move categories between shards.
+    assert ([set(enabled_jobs([shard])) for shard in plan_shards(URLS, shuffled, worker_count=4)]
+            == [set(enabled_jobs([shard])) for shard in plan_shards(URLS, TOGGLES, worker_count=4)])
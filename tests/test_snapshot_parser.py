@@ -0,0 +1,57 @@
+import os
+import re
+
+import lxml.html
+
+import scraper
+import snapshot_parser
+
+GRID_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "new_arrivals_grid.html")
+PAGE_URL = "https://www.alibaba.com/new-arrivals"
+
+EXPECTED_PRODUCTS = [
+    {"name": "Solar charging5000mah 10000mah 20W Wireless Magnetic Power Banks for iPhone Powerbank",
+     "product_url": "https://www.alibaba.com/product-detail/5000mah-10000mah-20W-Wireless-Magnetic-Power_11000023994216.html",
+     "image_url": "https://s.alicdn.com/@sc04/kf/H7243fcf61cf94fc2b228252a5355ce50l.jpg_350x350.jpg",
+     "price": "$3.77", "alibaba_category": "Consumer Electronics", "alibaba_product_id": "11000023994216"},
+    {"name": "Quick charge 3.0 25W 45W Super Fast Type C Cell Phone Charger for Samsung S21 Plus",
+     "product_url": "https://www.alibaba.com/product-detail/25W-45W-Super-Fast-Type-C_1601418825598.html",
+     "image_url": "https://s.alicdn.com/@sc04/kf/H5d618cd8a4104fe6abbba4158bdd807bd.jpg_350x350.jpg",
+     "price": "$0.40", "alibaba_category": "Consumer Electronics", "alibaba_product_id": "1601418825598"},
+    {"name": "Portable Mini Bluetooth Speaker Waterproof Outdoor Wireless",
+     "product_url": "https://www.alibaba.com/product-detail/Portable-Mini-Bluetooth-Speaker-Waterproof_1601402219381.html",
+     "image_url": "https://www.alibaba.com/kf/Hf1d9a8c7e2b14c4ba2b4b4d3d6c1a0b1Q.jpg_350x350.jpg",
+     "price": "$5.20", "alibaba_category": "Consumer Electronics", "alibaba_product_id": "1601402219381"},
+    {"name": "Smart Watch Fitness Tracker Heart Rate Blood Oxygen Monitor 1.85 Inch",
+     "product_url": "https://www.alibaba.com/product-detail/Smart-Watch-Fitness-Tracker-Heart-Rate_1601399876543.html",
+     "image_url": "https://s.alicdn.com/@sc04/kf/Ha3b9e0a7c1d54b2f9a6e8d7c5b4a3210X.jpg_350x350.jpg",
+     "price": "€12.85", "alibaba_category": "Consumer Electronics", "alibaba_product_id": "1601399876543"},
+]
+
+
+def read_fixture():
+    with open(GRID_FIXTURE, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_grid_fixture_yields_the_expected_products():
+    assert snapshot_parser.parse_snapshot_html(read_fixture(), PAGE_URL, "Consumer Electronics") == EXPECTED_PRODUCTS
+
+
+def test_raw_records_have_the_live_extractors_fields():
+    live_record = re.search(r"records\.push\(\{(.*?)\}\);", scraper.BATCHED_EXTRACTION_SCRIPT, re.DOTALL).group(1)
+    live_fields = set(re.findall(r"(\w+):", live_record))
+    raw_records = snapshot_parser.extract_raw_records(lxml.html.document_fromstring(read_fixture()))
+    assert len(raw_records) == 6  # Every container with a link, non-products included, like the live script
+    assert all(set(raw_record) == live_fields for raw_record in raw_records)
+
+
+def test_snapshot_file_uses_recorded_page_url_and_file_name_as_category(tmp_path):
+    snapshot_path = tmp_path / "Home Decor.html"
+    snapshot_path.write_text(read_fixture(), encoding="utf-8")
+    (tmp_path / "Home Decor_metrics.json").write_text('{"url": "https://www.alibaba.com/new-arrivals?tab=home"}', encoding="utf-8")
+
+    path, products = snapshot_parser.parse_snapshot_file(str(snapshot_path))
+    assert path == str(snapshot_path)
+    assert {product["alibaba_category"] for product in products} == {"Home Decor"}
+    assert products[2]["image_url"] == EXPECTED_PRODUCTS[2]["image_url"]